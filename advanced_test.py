@@ -5,11 +5,14 @@
 ทดสอบกับภาพจริงและสถานการณ์ต่างๆ
 """
 
+import argparse
 import cv2
 import numpy as np
 import os
 import time
 from homography_matcher import HomographyMatcher
+from image_transforms import adjust_photometric, corners_homography, rotation_homography, warp_image
+from parallel_runner import run_parallel
 
 
 def create_realistic_test_images():
@@ -162,9 +165,12 @@ def create_realistic_test_images():
     print("   📁 test_images/street_view.jpg")
 
 
-def benchmark_detectors():
+def benchmark_detectors(workers: int = 1):
     """
     วัดประสิทธิภาพของ feature detectors ต่างๆ
+
+    Args:
+        workers (int): จำนวน processes ที่ใช้รัน detectors พร้อมกัน (1 = ทีละตัว)
     """
     print("\n" + "="*60)
     print("⏱️  การทดสอบประสิทธิภาพ Feature Detectors")
@@ -173,27 +179,43 @@ def benchmark_detectors():
     detectors = ['SIFT', 'ORB', 'AKAZE']
     results = {}
 
-    for detector in detectors:
-        print(f"\n🔍 ทดสอบ {detector}...")
+    if workers > 1:
+        # รัน detectors พร้อมกันใน process pool (เวลาวัดภายในแต่ละ worker)
+        tasks = {detector: ({'feature_detector': detector, 'min_match_count': 15},
+                            "test_images/street_view.jpg", "test_images/detailed_map.jpg",
+                            f"test_output/{detector.lower()}_benchmark")
+                 for detector in detectors}
 
-        start_time = time.time()
-        try:
-            matcher = HomographyMatcher(feature_detector=detector, min_match_count=15)
-            result = matcher.compare_images(
-                "test_images/street_view.jpg",
-                "test_images/detailed_map.jpg",
-                f"test_output/{detector.lower()}_benchmark"
-            )
-            end_time = time.time()
-
-            result['processing_time'] = end_time - start_time
+        for detector, result, error in run_parallel(tasks, workers):
+            if error is not None:
+                print(f"\n🔍 {detector}: ❌ ข้อผิดพลาด: {error}")
+            else:
+                print(f"\n🔍 {detector}: ⏱️  เวลาในการประมวลผล: {result['processing_time']:.2f} วินาที")
             results[detector] = result
 
-            print(f"   ⏱️  เวลาในการประมวลผล: {result['processing_time']:.2f} วินาที")
+        results = {detector: results[detector] for detector in detectors}
+    else:
+        for detector in detectors:
+            print(f"\n🔍 ทดสอบ {detector}...")
 
-        except Exception as e:
-            print(f"   ❌ ข้อผิดพลาด: {str(e)}")
-            results[detector] = None
+            start_time = time.time()
+            try:
+                matcher = HomographyMatcher(feature_detector=detector, min_match_count=15)
+                result = matcher.compare_images(
+                    "test_images/street_view.jpg",
+                    "test_images/detailed_map.jpg",
+                    f"test_output/{detector.lower()}_benchmark"
+                )
+                end_time = time.time()
+
+                result['processing_time'] = end_time - start_time
+                results[detector] = result
+
+                print(f"   ⏱️  เวลาในการประมวลผล: {result['processing_time']:.2f} วินาที")
+
+            except Exception as e:
+                print(f"   ❌ ข้อผิดพลาด: {str(e)}")
+                results[detector] = None
 
     # แสดงผลสรุป
     print("\n" + "="*80)
@@ -211,6 +233,19 @@ def benchmark_detectors():
         else:
             print(f"{detector:<10} {'Error':<10} {'---':<8} {'---':<8} {'---':<10} {'❌ No':<10} {'0.00':<8}")
 
+    # เวลาแต่ละขั้นตอน (มิลลิวินาที)
+    stages = ['load', 'preprocess', 'detect_eye', 'detect_top', 'match', 'ratio_filter',
+              'ransac', 'refine', 'warp', 'render', 'write']
+    print("\n⏱️  เวลาแต่ละขั้นตอน (ms)")
+    print("-" * 120)
+    print(f"{'Detector':<10} " + " ".join(f"{stage:>9}" for stage in stages) + f" {'RANSAC est':>10}")
+    print("-" * 120)
+    for detector, result in results.items():
+        if result and 'timings' in result:
+            timings = result['timings']
+            print(f"{detector:<10} " + " ".join(f"{timings.get(stage, 0.0) * 1000:>9.1f}" for stage in stages)
+                  + f" {result['counters'].get('estimated_ransac_iterations', 0):>10}")
+
     return results
 
 
@@ -245,33 +280,26 @@ def test_with_transformations():
 
         if transform_name == 'rotated':
             # หมุนภาพ
-            center = (w//2, h//2)
-            rotation_matrix = cv2.getRotationMatrix2D(center, params['angle'], 1.0)
-            transformed = cv2.warpAffine(base_img, rotation_matrix, (w, h))
+            H = rotation_homography((w//2, h//2), params['angle'])
+            transformed = warp_image(base_img, H, (w, h))
 
         elif transform_name == 'scaled':
-            # ย่อขนาด
-            new_w, new_h = int(w * params['scale']), int(h * params['scale'])
-            scaled = cv2.resize(base_img, (new_w, new_h))
-            transformed = np.zeros_like(base_img)
-            offset_x, offset_y = (w - new_w) // 2, (h - new_h) // 2
-            transformed[offset_y:offset_y+new_h, offset_x:offset_x+new_w] = scaled
+            # ย่อขนาด (รอบจุดกึ่งกลาง)
+            H = rotation_homography((w/2, h/2), 0, params['scale'])
+            transformed = warp_image(base_img, H, (w, h))
 
         elif transform_name == 'perspective':
             # เปลี่ยน perspective
-            src_pts = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
             dst_pts = np.float32([[50, 30], [w-30, 50], [w-80, h-30], [80, h-50]])
-            perspective_matrix = cv2.getPerspectiveTransform(src_pts, dst_pts)
-            transformed = cv2.warpPerspective(base_img, perspective_matrix, (w, h))
+            transformed = warp_image(base_img, corners_homography((w, h), dst_pts), (w, h))
 
         elif transform_name == 'noisy':
             # เพิ่ม noise
-            noise = np.random.normal(0, 25, base_img.shape).astype(np.uint8)
-            transformed = cv2.add(base_img, noise)
+            transformed = adjust_photometric(base_img, noise_sigma=25)
 
         elif transform_name == 'bright':
             # เพิ่มความสว่าง
-            transformed = cv2.convertScaleAbs(base_img, alpha=1.0, beta=params['brightness'])
+            transformed = adjust_photometric(base_img, beta=params['brightness'])
 
         # บันทึกภาพ
         transform_path = f"test_images/transforms/{transform_name}_street.jpg"
@@ -295,7 +323,7 @@ def test_with_transformations():
             print(f"   ❌ ข้อผิดพลาด: {str(e)}")
 
 
-def main():
+def main(workers: int = 1):
     """ฟังก์ชันหลักสำหรับการทดสอบขั้นสูง"""
 
     print("🧪 OpenCV Homography Matcher - การทดสอบขั้นสูง")
@@ -305,7 +333,7 @@ def main():
     create_realistic_test_images()
 
     # ทดสอบประสิทธิภาพ
-    benchmark_results = benchmark_detectors()
+    benchmark_results = benchmark_detectors(workers)
 
     # ทดสอบกับการ transform
     test_with_transformations()
@@ -325,4 +353,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='การทดสอบขั้นสูงสำหรับ HomographyMatcher')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='จำนวน processes สำหรับการทดสอบประสิทธิภาพ (default: 1)')
+    main(parser.parse_args().workers)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การเขียนภาพผลลัพธ์ (artifacts) ใน background threads
+วาดภาพ, encode JPEG และเขียนไฟล์นอกเส้นทางหลักของการจับคู่
+โดยจำกัดจำนวนงานที่ค้างอยู่เพื่อไม่ให้ใช้หน่วยความจำมากเกินไป
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+
+# ระดับของ artifacts ที่บันทึก
+ARTIFACT_POLICIES = ('none', 'minimal', 'full')
+
+
+class ArtifactWriter:
+    """
+    Thread pool ขนาดจำกัดสำหรับงานวาดและเขียนภาพผลลัพธ์
+
+    submit จะรอ (block) เมื่อมีงานค้างครบ max_pending งาน เพื่อจำกัดจำนวนภาพที่ค้างในหน่วยความจำ
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        """
+        Initialize the ArtifactWriter
+
+        Args:
+            max_workers (int): จำนวน threads ที่เขียนไฟล์
+            max_pending (int): จำนวนงานสูงสุดที่ค้างอยู่ (รวมงานที่กำลังทำ)
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='artifact-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        ส่งงาน (เช่น วาดและบันทึกภาพ) ไปทำใน background
+
+        Args:
+            fn (Callable): ฟังก์ชันที่ต้องการรัน
+            *args, **kwargs: arguments ของฟังก์ชัน
+
+        Returns:
+            Future: ผลลัพธ์ของงาน
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        with self._lock:
+            # เก็บงานที่ล้มเหลวไว้จนกว่าจะ flush เพื่อให้ flush แจ้ง error ได้
+            self._pending = [f for f in self._pending if not f.done() or f.exception() is not None]
+            self._pending.append(future)
+        return future
+
+    def write_image(self, path: str, image: np.ndarray) -> Future:
+        """
+        encode และเขียนภาพลงไฟล์ใน background
+
+        Args:
+            path (str): path ของไฟล์ปลายทาง
+            image (np.ndarray): ภาพ (ต้องไม่ถูกแก้ไขหลังจากส่งมา)
+
+        Returns:
+            Future: ผลลัพธ์ของงาน
+        """
+        return self.submit(write_image, path, image)
+
+    def flush(self):
+        """
+        รอให้งานที่ส่งมาแล้วทั้งหมดเสร็จ
+
+        Raises:
+            Exception: error แรกที่เกิดขึ้นในงานที่ค้างอยู่
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        first_error = None
+        for future in pending:
+            error = future.exception()
+            if error is not None and first_error is None:
+                first_error = error
+        if first_error is not None:
+            raise first_error
+
+    def close(self):
+        """รอให้งานทั้งหมดเสร็จแล้วปิด thread pool"""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ArtifactWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_image(path: str, image: np.ndarray):
+    """
+    เขียนภาพลงไฟล์ (แจ้ง error ถ้าเขียนไม่สำเร็จ)
+
+    Args:
+        path (str): path ของไฟล์ปลายทาง
+        image (np.ndarray): ภาพ
+    """
+    if not cv2.imwrite(path, image):
+        raise IOError(f"ไม่สามารถบันทึกภาพได้: {path}")
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ชุดทดสอบประสิทธิภาพที่ทำซ้ำได้สำหรับ HomographyMatcher
+สร้างคู่ภาพสังเคราะห์ที่รู้ Homography จริง (ground truth) หลายความละเอียดและหลายความหนาแน่นของ features
+รันแต่ละ detector พร้อม warmup และทำซ้ำหลายรอบ แล้วบันทึกผลเป็น JSON
+(latency percentiles, throughput, หน่วยความจำสูงสุด และความคลาดเคลื่อนของมุมภาพเทียบกับ ground truth)
+และเปรียบเทียบกับ baseline ที่บันทึกไว้เพื่อหา regressions
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from create_realistic_examples import draw_building, draw_label, draw_lane_marks, draw_park, draw_road
+from homography_matcher import ESTIMATORS, HomographyMatcher
+from image_transforms import adjust_photometric, corners_homography, rotation_homography, warp_image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# จำนวนวัตถุ (อาคาร, สวน, ป้าย) ต่อล้านพิกเซลของแผนที่
+DENSITIES = {'sparse': 60, 'medium': 150, 'dense': 400}
+DEFAULT_RESOLUTIONS = ['640x480', '1280x960', '2560x1920']
+DEFAULT_DETECTORS = ['SIFT', 'ORB', 'AKAZE']
+
+# ขั้นตอนที่สรุปเวลาไว้ในผลลัพธ์ (ดู instrumentation.StageTimer)
+STAGES = ['load', 'preprocess', 'detect_eye', 'detect_top', 'index_build', 'match',
+          'ratio_filter', 'ransac', 'refine']
+
+RESULTS_VERSION = 1
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    """
+    แปลงข้อความ 'WIDTHxHEIGHT' เป็น (width, height)
+
+    Args:
+        text (str): ความละเอียด เช่น '1280x960'
+
+    Returns:
+        Tuple[int, int]: (width, height)
+
+    Raises:
+        ValueError: ถ้ารูปแบบไม่ถูกต้อง
+    """
+    try:
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"ความละเอียดไม่ถูกต้อง: {text} (ตัวอย่าง: 1280x960)")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"ความละเอียดไม่ถูกต้อง: {text}")
+    return width, height
+
+
+def draw_synthetic_map(width: int, height: int, density: str, rng: np.random.Generator) -> np.ndarray:
+    """
+    วาดแผนที่ Top-Down สังเคราะห์ (ถนน อาคารพร้อมหน้าต่าง สวน และป้าย)
+    ด้วย primitives ชุดเดียวกับ create_realistic_examples.py แต่สุ่มตำแหน่งด้วย seed ที่กำหนด
+
+    วัตถุมีขนาดคงที่ในหน่วยพิกเซล จำนวนวัตถุจึงแปรตามพื้นที่ภาพ ทำให้ความหนาแน่นของ
+    features ใกล้เคียงกันทุกความละเอียด
+
+    Args:
+        width, height (int): ขนาดแผนที่
+        density (str): ความหนาแน่น ('sparse', 'medium', 'dense')
+        rng (np.random.Generator): ตัวสุ่ม
+
+    Returns:
+        np.ndarray: ภาพแผนที่ BGR
+    """
+    map_img = np.full((height, width, 3), 225, dtype=np.uint8)
+
+    # ถนนแนวนอนและแนวตั้งพร้อมเส้นกลางถนน
+    road_width = 36
+    roads = [(0, y, width, y + road_width)
+             for y in range(int(rng.integers(100, 250)), height, int(rng.integers(300, 450)))]
+    roads += [(x, 0, x + road_width, height)
+              for x in range(int(rng.integers(100, 250)), width, int(rng.integers(300, 450)))]
+    for road in roads:
+        draw_road(map_img, *road, color=(110, 110, 110))
+        draw_lane_marks(map_img, *road, start=20, period=80, length=35, thickness=6)
+
+    num_objects = max(8, int(DENSITIES[density] * width * height / 1e6))
+    letters = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+    for _ in range(num_objects):
+        kind = rng.random()
+        color = tuple(int(c) for c in rng.integers(60, 220, 3))
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+
+        if kind < 0.6:
+            # อาคารพร้อมหน้าต่าง
+            w, h = int(rng.integers(50, 160)), int(rng.integers(50, 160))
+            x2, y2 = x1 + w, y1 + h
+            windows = [(wx, wy)
+                       for wy in range(y1 + 10, y2 - 18, 24)
+                       for wx in range(x1 + 10, x2 - 14, 20)
+                       if rng.random() < 0.8]
+            draw_building(map_img, x1, y1, x2, y2, color, windows, (10, 12))
+        elif kind < 0.85:
+            # สวนพร้อมต้นไม้
+            radius = int(rng.integers(25, 70))
+            trees = []
+            for _ in range(int(rng.integers(3, 9))):
+                offset = rng.integers(-radius // 2, radius // 2 + 1, 2)
+                trees.append((x1 + int(offset[0]), y1 + int(offset[1])))
+            draw_park(map_img, (x1, y1), radius, trees=trees)
+        else:
+            # ป้ายข้อความ
+            label = ''.join(rng.choice(list(letters), int(rng.integers(3, 7))))
+            draw_label(map_img, label, (x1, y1), float(rng.uniform(0.6, 1.2)))
+
+    return map_img
+
+
+def generate_pair(width: int, height: int, density: str, seed: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    สร้างคู่ภาพ (eye-level, top-down) ที่รู้ Homography จริง
+
+    ภาพ eye-level คือบริเวณหนึ่งของแผนที่ที่ถูกมองแบบ perspective (หมุน ย่อ/ขยาย และเอียง)
+    แล้วปรับความสว่างและเพิ่ม noise (transforms ชุดเดียวกับ advanced_test.test_with_transformations)
+
+    Args:
+        width, height (int): ขนาดแผนที่ (ภาพ eye-level มีขนาด 3/4 ของแผนที่)
+        density (str): ความหนาแน่น ('sparse', 'medium', 'dense')
+        seed (int): seed ของการสุ่ม
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: ภาพ eye-level, ภาพ top-down
+            และ Homography จริง (eye-level -> top-down)
+    """
+    rng = np.random.default_rng([seed, width, height, list(DENSITIES).index(density)])
+    top_img = draw_synthetic_map(width, height, density, rng)
+
+    eye_w, eye_h = width * 3 // 4, height * 3 // 4
+
+    # บริเวณของแผนที่ที่ปรากฏในภาพ eye-level: สี่เหลี่ยมรอบ center ที่ถูกหมุนแล้วเลื่อนมุมแบบสุ่ม
+    region = float(rng.uniform(0.5, 0.7))
+    half = np.float32([width, height]) * region / 2
+    center = np.float32([width, height]) / 2 + rng.uniform(-0.1, 0.1, 2) * np.float32([width, height])
+    quad = np.float32([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * half + center
+    # มุมแบบตามเข็มนาฬิกาในภาพ (rotation_homography ใช้ค่าบวกเป็นทวนเข็ม)
+    rotation = rotation_homography(tuple(float(c) for c in center), -float(rng.uniform(-20, 20)))
+    quad = cv2.perspectiveTransform(quad.reshape(-1, 1, 2), rotation).reshape(-1, 2)
+    quad += rng.uniform(-0.12, 0.12, (4, 2)).astype(np.float32) * half  # perspective
+
+    H_gt = corners_homography((eye_w, eye_h), quad)
+    eye_img = warp_image(top_img, np.linalg.inv(H_gt), (eye_w, eye_h), cv2.BORDER_REFLECT)
+
+    # ความสว่าง/contrast และ noise
+    alpha, beta = rng.uniform(0.8, 1.2), rng.uniform(-30, 30)
+    eye_img = adjust_photometric(eye_img, alpha, beta, noise_sigma=6, rng=rng)
+
+    return eye_img, top_img, H_gt
+
+
+def corner_error(H: Optional[np.ndarray], H_gt: np.ndarray, eye_shape: Tuple[int, int]) -> Optional[float]:
+    """
+    ความคลาดเคลื่อนเฉลี่ย (พิกเซลบนแผนที่) ของมุมทั้งสี่ของภาพ eye-level เมื่อ project ด้วย H เทียบกับ H_gt
+
+    Args:
+        H (np.ndarray): Homography ที่ประมาณได้ หรือ None
+        H_gt (np.ndarray): Homography จริง
+        eye_shape (Tuple[int, int]): (height, width) ของภาพ eye-level
+
+    Returns:
+        Optional[float]: ความคลาดเคลื่อนเฉลี่ย หรือ None ถ้าไม่พบ Homography
+    """
+    if H is None:
+        return None
+    h, w = eye_shape
+    corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]]).reshape(-1, 1, 2)
+    projected = cv2.perspectiveTransform(corners, H)
+    expected = cv2.perspectiveTransform(corners, H_gt)
+    return float(np.linalg.norm(projected - expected, axis=2).mean())
+
+
+def prepare_pairs(data_dir: str, resolutions: List[str], densities: List[str], seed: int) -> list:
+    """
+    สร้างและบันทึกคู่ภาพสังเคราะห์ (ใช้ไฟล์เดิมถ้ามีอยู่แล้ว)
+
+    ภาพบันทึกเป็น PNG เพื่อไม่ให้การบีบอัดทำให้ผลลัพธ์ต่างกันระหว่างรอบ
+
+    Args:
+        data_dir (str): โฟลเดอร์สำหรับเก็บคู่ภาพ
+        resolutions (List[str]): ความละเอียด เช่น ['640x480', '1280x960']
+        densities (List[str]): ความหนาแน่น
+        seed (int): seed ของการสุ่ม
+
+    Returns:
+        list: dict ของแต่ละคู่ ('name', 'resolution', 'density', 'eye', 'top', 'H_gt', 'eye_shape')
+    """
+    pairs = []
+    for resolution in resolutions:
+        width, height = parse_resolution(resolution)
+        for density in densities:
+            name = f"{width}x{height}_{density}_seed{seed}"
+            pair_dir = os.path.join(data_dir, name)
+            eye_path = os.path.join(pair_dir, 'eye.png')
+            top_path = os.path.join(pair_dir, 'top.png')
+            gt_path = os.path.join(pair_dir, 'ground_truth.json')
+
+            if os.path.exists(gt_path) and os.path.exists(eye_path) and os.path.exists(top_path):
+                with open(gt_path, 'r', encoding='utf-8') as f:
+                    gt = json.load(f)
+            else:
+                eye_img, top_img, H_gt = generate_pair(width, height, density, seed)
+                os.makedirs(pair_dir, exist_ok=True)
+                cv2.imwrite(eye_path, eye_img)
+                cv2.imwrite(top_path, top_img)
+                gt = {'homography': H_gt.tolist(), 'eye_shape': list(eye_img.shape[:2])}
+                with open(gt_path, 'w', encoding='utf-8') as f:
+                    json.dump(gt, f, indent=2)
+
+            pairs.append({
+                'name': name,
+                'resolution': f"{width}x{height}",
+                'density': density,
+                'eye': eye_path,
+                'top': top_path,
+                'H_gt': np.array(gt['homography']),
+                'eye_shape': tuple(gt['eye_shape']),
+            })
+    return pairs
+
+
+def max_rss_bytes() -> Optional[int]:
+    """หน่วยความจำสูงสุดของ process จนถึงตอนนี้ (bytes) หรือ None ถ้าไม่รองรับ"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux รายงานเป็น KB, macOS เป็น bytes
+    return int(rss) if platform.system() == 'Darwin' else int(rss) * 1024
+
+
+def run_case(detector: str, pair: dict, trials: int, warmup: int, matcher_kwargs: dict) -> dict:
+    """
+    วัดประสิทธิภาพของ detector หนึ่งตัวกับคู่ภาพหนึ่งคู่
+
+    ไม่บันทึกภาพผลลัพธ์ (artifacts='none') และไม่ใช้ feature cache เพื่อให้เวลาที่วัดได้เป็นเวลาของ
+    การจับคู่เท่านั้น หน่วยความจำสูงสุดวัดด้วย tracemalloc ในรอบแยกต่างหากหลังรอบที่จับเวลา
+    เพื่อไม่ให้ overhead ของ tracemalloc ปนกับ latency
+
+    Args:
+        detector (str): ชื่อ detector
+        pair (dict): คู่ภาพจาก prepare_pairs
+        trials (int): จำนวนรอบที่จับเวลา
+        warmup (int): จำนวนรอบ warmup (ไม่นับ)
+        matcher_kwargs (dict): arguments เพิ่มเติมของ HomographyMatcher
+
+    Returns:
+        dict: สรุปผลของกรณีนี้
+    """
+    matcher = HomographyMatcher(feature_detector=detector, artifacts='none', **matcher_kwargs)
+
+    def run_once() -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return matcher.compare_images(pair['eye'], pair['top'], output_dir=None)
+
+    for _ in range(warmup):
+        run_once()
+
+    latencies, errors, stage_times = [], [], {stage: [] for stage in STAGES}
+    successes = 0
+    result = None
+    for _ in range(trials):
+        start_time = time.perf_counter()
+        result = run_once()
+        latencies.append(time.perf_counter() - start_time)
+
+        successes += result['homography_found']
+        error = corner_error(result.get('homography'), pair['H_gt'], pair['eye_shape'])
+        if error is not None:
+            errors.append(error)
+        for stage in STAGES:
+            stage_times[stage].append(result['timings'].get(stage, 0.0))
+
+    tracemalloc.start()
+    try:
+        run_once()
+        peak_traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'detector': detector,
+        'pair': pair['name'],
+        'resolution': pair['resolution'],
+        'density': pair['density'],
+        'trials': trials,
+        'warmup': warmup,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'mean': float(latencies_ms.mean()),
+            'min': float(latencies_ms.min()),
+            'max': float(latencies_ms.max()),
+        },
+        'throughput_pairs_per_s': trials / max(sum(latencies), 1e-9),
+        'stage_ms': {stage: float(np.median(times)) * 1000 for stage, times in stage_times.items()
+                     if any(times)},
+        'peak_traced_bytes': int(peak_traced),
+        'max_rss_bytes': max_rss_bytes(),
+        'success_rate': successes / trials,
+        'corner_error_px': {
+            'median': float(np.median(errors)),
+            'max': float(np.max(errors)),
+        } if errors else None,
+        'eye_level_keypoints': result['eye_level_keypoints'],
+        'top_down_keypoints': result['top_down_keypoints'],
+        'total_matches': result['total_matches'],
+        'inlier_matches': result.get('inlier_matches', 0),
+    }
+
+
+def run_suite(detectors: List[str], resolutions: List[str], densities: List[str],
+              trials: int = 5, warmup: int = 1, seed: int = 0, data_dir: str = 'benchmark_data',
+              matcher_kwargs: Optional[dict] = None) -> dict:
+    """
+    รันชุดทดสอบประสิทธิภาพทุกกรณี (detector × ความละเอียด × ความหนาแน่น)
+
+    Args:
+        detectors (List[str]): detectors ที่ทดสอบ
+        resolutions (List[str]): ความละเอียดของแผนที่
+        densities (List[str]): ความหนาแน่นของ features
+        trials (int): จำนวนรอบที่จับเวลาต่อกรณี
+        warmup (int): จำนวนรอบ warmup ต่อกรณี
+        seed (int): seed ของการสร้างคู่ภาพ
+        data_dir (str): โฟลเดอร์สำหรับเก็บคู่ภาพสังเคราะห์
+        matcher_kwargs (dict): arguments เพิ่มเติมของ HomographyMatcher (optional)
+
+    Returns:
+        dict: ผลลัพธ์ทั้งหมด ('version', 'environment', 'config', 'cases')
+            โดย 'cases' มี key เป็น '<detector>/<resolution>/<density>'
+    """
+    matcher_kwargs = dict(matcher_kwargs or {})
+    pairs = prepare_pairs(data_dir, resolutions, densities, seed)
+
+    cases = {}
+    for pair in pairs:
+        for detector in detectors:
+            key = f"{detector}/{pair['resolution']}/{pair['density']}"
+            print(f"⏱️  {key} ...", end=' ', flush=True)
+            case = run_case(detector, pair, trials, warmup, matcher_kwargs)
+            cases[key] = case
+
+            error = case['corner_error_px']
+            error_text = f"{error['median']:.2f}px" if error else "---"
+            print(f"p50 {case['latency_ms']['p50']:.1f}ms, p95 {case['latency_ms']['p95']:.1f}ms, "
+                  f"error {error_text}, success {case['success_rate']:.0%}")
+
+    return {
+        'version': RESULTS_VERSION,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count(),
+            'opencv_threads': cv2.getNumThreads(),
+        },
+        'config': {
+            'detectors': detectors,
+            'resolutions': resolutions,
+            'densities': densities,
+            'trials': trials,
+            'warmup': warmup,
+            'seed': seed,
+            'matcher_kwargs': matcher_kwargs,
+        },
+        'cases': cases,
+    }
+
+
+def compare_to_baseline(current: dict, baseline: dict, latency_tolerance: float = 0.2,
+                        memory_tolerance: float = 0.2, error_tolerance: float = 1.0) -> List[str]:
+    """
+    เปรียบเทียบผลลัพธ์กับ baseline และรายงาน regressions
+
+    Args:
+        current (dict): ผลลัพธ์จาก run_suite
+        baseline (dict): ผลลัพธ์ที่บันทึกไว้ก่อนหน้า
+        latency_tolerance (float): สัดส่วนที่ latency (p50, p95) เพิ่มได้ เช่น 0.2 = 20%
+        memory_tolerance (float): สัดส่วนที่หน่วยความจำสูงสุด (tracemalloc) เพิ่มได้
+        error_tolerance (float): จำนวนพิกเซลที่ความคลาดเคลื่อนของมุม (median) เพิ่มได้
+
+    Returns:
+        List[str]: คำอธิบายของแต่ละ regression (ว่าง = ไม่มี regression)
+    """
+    regressions = []
+    for key, case in current['cases'].items():
+        base = baseline.get('cases', {}).get(key)
+        if base is None:
+            continue
+
+        for percentile in ('p50', 'p95'):
+            now, before = case['latency_ms'][percentile], base['latency_ms'][percentile]
+            if now > before * (1 + latency_tolerance):
+                regressions.append(f"{key}: latency {percentile} {before:.1f}ms -> {now:.1f}ms "
+                                   f"(+{(now / before - 1) * 100:.0f}%)")
+
+        now, before = case['peak_traced_bytes'], base['peak_traced_bytes']
+        if before and now > before * (1 + memory_tolerance):
+            regressions.append(f"{key}: peak memory {before / 1e6:.1f}MB -> {now / 1e6:.1f}MB")
+
+        if case['success_rate'] < base['success_rate']:
+            regressions.append(f"{key}: success rate {base['success_rate']:.0%} -> {case['success_rate']:.0%}")
+
+        now, before = case['corner_error_px'], base['corner_error_px']
+        if before is not None:
+            if now is None:
+                regressions.append(f"{key}: ไม่พบ Homography (เดิม error {before['median']:.2f}px)")
+            elif now['median'] > before['median'] + error_tolerance:
+                regressions.append(f"{key}: corner error {before['median']:.2f}px -> {now['median']:.2f}px")
+
+    return regressions
+
+
+def main():
+    """ฟังก์ชันหลักสำหรับชุดทดสอบประสิทธิภาพ"""
+    parser = argparse.ArgumentParser(
+        description='⏱️  Benchmark Suite - วัดความเร็ว หน่วยความจำ และความแม่นยำด้วยคู่ภาพสังเคราะห์')
+    parser.add_argument('--detectors', nargs='+', choices=DEFAULT_DETECTORS, default=DEFAULT_DETECTORS,
+                        help='🔎 Feature detectors ที่ทดสอบ (default: ทั้งหมด)')
+    parser.add_argument('--resolutions', nargs='+', default=DEFAULT_RESOLUTIONS,
+                        help='📏 ความละเอียดของแผนที่ เช่น 640x480 1280x960')
+    parser.add_argument('--densities', nargs='+', choices=list(DENSITIES), default=['medium'],
+                        help='🌳 ความหนาแน่นของ features (default: medium)')
+    parser.add_argument('--trials', type=int, default=5,
+                        help='🔁 จำนวนรอบที่จับเวลาต่อกรณี (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='🔥 จำนวนรอบ warmup ต่อกรณี (default: 1)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='🎲 seed ของการสร้างคู่ภาพ (default: 0)')
+    parser.add_argument('--data-dir', default='benchmark_data',
+                        help='📁 โฟลเดอร์สำหรับเก็บคู่ภาพสังเคราะห์ (default: benchmark_data)')
+    parser.add_argument('--min-matches', type=int, default=10,
+                        help='🔢 จำนวนการจับคู่ขั้นต่ำ (default: 10)')
+    parser.add_argument('--pyramid-max-dim', type=int, default=None,
+                        help='🔭 หา features บนภาพย่อ แล้ว refine ที่ความละเอียดเต็ม')
+    parser.add_argument('--estimator', choices=list(ESTIMATORS), default='RANSAC',
+                        help='🎲 Robust estimator ของ Homography (default: RANSAC)')
+    parser.add_argument('--guided', action='store_true',
+                        help='🧭 เปิด guided matching หลังพบ Homography แรก')
+    parser.add_argument('--output', '-o', default='benchmark_results.json',
+                        help='💾 ไฟล์ผลลัพธ์ JSON (default: benchmark_results.json)')
+    parser.add_argument('--baseline', default=None,
+                        help='📊 ไฟล์ผลลัพธ์ก่อนหน้าสำหรับเปรียบเทียบหา regressions')
+    parser.add_argument('--latency-tolerance', type=float, default=0.2,
+                        help='⏱️  สัดส่วนที่ latency เพิ่มได้ก่อนนับเป็น regression (default: 0.2)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2,
+                        help='🧠 สัดส่วนที่หน่วยความจำเพิ่มได้ก่อนนับเป็น regression (default: 0.2)')
+    parser.add_argument('--error-tolerance', type=float, default=1.0,
+                        help='🎯 จำนวนพิกเซลที่ corner error เพิ่มได้ก่อนนับเป็น regression (default: 1.0)')
+    args = parser.parse_args()
+
+    try:
+        for resolution in args.resolutions:
+            parse_resolution(resolution)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    matcher_kwargs = {'min_match_count': args.min_matches, 'estimator': args.estimator}
+    if args.guided:
+        matcher_kwargs['guided_matching'] = True
+    if args.pyramid_max_dim:
+        matcher_kwargs['pyramid_max_dim'] = args.pyramid_max_dim
+
+    print("⏱️  Benchmark Suite")
+    print("=" * 60)
+    results = run_suite(args.detectors, args.resolutions, args.densities, args.trials,
+                        args.warmup, args.seed, args.data_dir, matcher_kwargs)
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.latency_tolerance,
+                                          args.memory_tolerance, args.error_tolerance)
+        results['baseline'] = args.baseline
+        results['regressions'] = regressions
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 บันทึกผลลัพธ์ใน: {args.output}")
+
+    if regressions is None:
+        return 0
+    if regressions:
+        print(f"\n❌ พบ regressions {len(regressions)} รายการเทียบกับ {args.baseline}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"\n✅ ไม่พบ regressions เทียบกับ {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -6,20 +6,314 @@ Command Line Interface สำหรับ OpenCV Homography Matcher
 """
 
 import argparse
+import json
 import sys
 import os
-from homography_matcher import HomographyMatcher
+from typing import TYPE_CHECKING, Callable, List, Optional
 
+from image_files import collect_images
 
-def main():
-    """ฟังก์ชันหลักสำหรับ CLI"""
+# modules ที่ใช้ OpenCV ถูก import ภายในฟังก์ชัน เพื่อให้โหมด client (--daemon-socket)
+# เริ่มทำงานได้เร็วโดยไม่ต้อง import OpenCV
+if TYPE_CHECKING:
+    from homography_matcher import HomographyMatcher
+
+
+# matchers และดัชนีที่โหลดไว้แล้ว ใช้ซ้ำระหว่างคำสั่ง (None = ไม่เก็บไว้, เปิดด้วย keep_warm)
+_warm_matchers = None
+_warm_indexes = None
+
+
+def keep_warm():
+    """
+    เก็บ matchers (detectors, feature caches) และดัชนีที่โหลดแล้ว (แผนที่อ้างอิง, คลังภาพ)
+    ไว้ใช้ซ้ำในคำสั่งถัดไปของโปรเซสเดียวกัน (ใช้โดย matcher_daemon)
+    """
+    global _warm_matchers, _warm_indexes
+    _warm_matchers = {}
+    _warm_indexes = {}
+
+
+def create_matcher(options: dict) -> 'HomographyMatcher':
+    """
+    สร้าง HomographyMatcher หรือใช้ตัวที่สร้างไว้แล้ว (เมื่อเปิด keep_warm)
+
+    Args:
+        options (dict): keyword arguments สำหรับ HomographyMatcher
+
+    Returns:
+        HomographyMatcher: matcher ตามการตั้งค่า
+    """
+    from homography_matcher import HomographyMatcher
+
+    if _warm_matchers is None:
+        return HomographyMatcher(**options)
+
+    # path แบบ relative (เช่น cache_dir) ขึ้นกับโฟลเดอร์ปัจจุบันของคำสั่ง
+    key = json.dumps([os.getcwd(), options], sort_keys=True, default=str)
+    if key not in _warm_matchers:
+        _warm_matchers[key] = HomographyMatcher(**options)
+    return _warm_matchers[key]
+
+
+def _directory_stamp(directory: str) -> Optional[int]:
+    """เวลาแก้ไขล่าสุดของไฟล์ในโฟลเดอร์ (None ถ้ายังไม่มีโฟลเดอร์)"""
+    try:
+        with os.scandir(directory) as entries:
+            return max((entry.stat().st_mtime_ns for entry in entries if entry.is_file()), default=None)
+    except FileNotFoundError:
+        return None
+
+
+def cached_index(matcher: 'HomographyMatcher', directory: str, load: Callable[[], object]):
+    """
+    โหลดดัชนีจากโฟลเดอร์ด้วย load() หรือใช้ตัวที่โหลดไว้แล้ว (เมื่อเปิด keep_warm)
+    ดัชนีที่เก็บไว้จะถูกโหลดใหม่ถ้าไฟล์ในโฟลเดอร์เปลี่ยน
+
+    Args:
+        matcher (HomographyMatcher): matcher ที่ใช้กับดัชนี
+        directory (str): โฟลเดอร์ของดัชนี
+        load (Callable[[], object]): ฟังก์ชันที่โหลดหรือสร้างดัชนี
+
+    Returns:
+        ดัชนี (ReferenceMap, TiledReferenceMap หรือ ImageRetrieval)
+    """
+    if _warm_indexes is None:
+        return load()
+
+    key = (id(matcher), os.path.abspath(directory))
+    cached = _warm_indexes.get(key)
+    if cached is not None and cached[0] == _directory_stamp(directory):
+        return cached[1]
+
+    index = load()
+    if index is not None:
+        _warm_indexes[key] = (_directory_stamp(directory), index)
+    return index
+
+
+def matcher_options(args, detector: Optional[str] = None) -> dict:
+    """
+    สร้าง arguments สำหรับ HomographyMatcher จากตัวเลือกของ CLI
+
+    Args:
+        args: arguments จาก argparse
+        detector (str): detector ที่ใช้แทน args.detector (optional)
+
+    Returns:
+        dict: keyword arguments สำหรับ HomographyMatcher
+    """
+    return {
+        'feature_detector': detector or args.detector,
+        'min_match_count': args.min_matches,
+        'cache_dir': args.cache_dir,
+        'pyramid_max_dim': args.pyramid_max_dim,
+        'artifacts': args.artifacts,
+        'artifact_threads': args.artifact_threads,
+        'decode_mode': args.decode_mode,
+        'max_keypoints': args.max_keypoints,
+        'keypoint_selection': args.keypoint_selection,
+        'estimator': args.estimator,
+        'ransac_threshold': args.ransac_threshold,
+        'ransac_confidence': args.ransac_confidence,
+        'ransac_max_iters': args.ransac_max_iters,
+        'guided_matching': args.guided,
+        'guided_radius': args.guided_radius,
+        'first_pass_keypoints': args.first_pass_keypoints,
+        'binary_matching': args.binary_matching,
+        'lsh_params': {
+            'table_number': args.lsh_tables,
+            'key_size': args.lsh_key_size,
+            'multi_probe_level': args.lsh_probe_level,
+        },
+        'match_chunk_size': args.match_chunk_size,
+        'match_threads': args.match_threads,
+        'memory_cache_bytes': int(args.memory_cache_mb * 1024 * 1024),
+        'warp_interpolation': args.warp_interpolation,
+        'remap_cache_bytes': int(args.remap_cache_mb * 1024 * 1024),
+    }
+
+
+def get_reference(matcher: 'HomographyMatcher', args):
+    """
+    โหลดแผนที่อ้างอิงจาก --reference หรือสร้างจาก --top แล้วบันทึกไว้ใช้ครั้งต่อไป
+    (สร้างแบบ tiles เมื่อระบุ --tile-size)
+
+    Args:
+        matcher (HomographyMatcher): matcher ที่ใช้
+        args: arguments จาก argparse
+
+    Returns:
+        ReferenceMap หรือ TiledReferenceMap: แผนที่อ้างอิง
+    """
+    from reference_map import ReferenceMap
+    from tiled_reference import TiledReferenceMap
+
+    if os.path.exists(os.path.join(args.reference, TiledReferenceMap.META_FILE)):
+        print(f"🗺️  โหลดแผนที่อ้างอิงแบบ tiles จาก: {args.reference}")
+        return TiledReferenceMap.load(args.reference, matcher)
+
+    if os.path.exists(os.path.join(args.reference, ReferenceMap.META_FILE)):
+        print(f"🗺️  โหลดแผนที่อ้างอิงจาก: {args.reference}")
+        return ReferenceMap.load(args.reference, matcher)
+
+    if args.tile_size:
+        print(f"🗺️  สร้างแผนที่อ้างอิงแบบ tiles ({args.tile_size}px) จาก {args.top_down} "
+              f"และบันทึกไว้ที่: {args.reference}")
+        return TiledReferenceMap.build(matcher, args.top_down, args.reference,
+                                       tile_size=args.tile_size, overlap=args.tile_overlap)
+
+    print(f"🗺️  สร้างแผนที่อ้างอิงจาก {args.top_down} และบันทึกไว้ที่: {args.reference}")
+    reference = ReferenceMap.build(matcher, args.top_down)
+    reference.save(args.reference)
+    return reference
+
+
+def get_gallery(matcher: 'HomographyMatcher', args):
+    """
+    โหลดดัชนีของคลังภาพจาก --gallery หรือสร้างจากภาพใน --top แล้วบันทึกไว้ใช้ครั้งต่อไป
+
+    Args:
+        matcher (HomographyMatcher): matcher ที่ใช้
+        args: arguments จาก argparse
+
+    Returns:
+        Optional[ImageRetrieval]: ดัชนีของคลังภาพ หรือ None ถ้าไม่พบไฟล์ภาพ
+    """
+    from image_retrieval import ImageRetrieval
+
+    if os.path.exists(os.path.join(args.gallery, ImageRetrieval.META_FILE)):
+        print(f"🗂️  โหลดดัชนีของคลังภาพจาก: {args.gallery}")
+        return ImageRetrieval.load(args.gallery, matcher)
+
+    top_images = collect_images(args.top_down)
+    if not top_images:
+        return None
+    print(f"🗂️  สร้างดัชนีของคลังภาพ ({len(top_images)} ภาพ) และบันทึกไว้ที่: {args.gallery}")
+    retrieval = ImageRetrieval.build(matcher, top_images)
+    retrieval.save(args.gallery)
+    return retrieval
+
+
+def run_gallery(args) -> int:
+    """
+    ค้นหาภาพ top-down ที่ตรงกับภาพ eye-level จากคลังภาพ (--top เป็นโฟลเดอร์)
+    แล้วยืนยันเฉพาะ top-K ภาพด้วยการจับคู่ features และ RANSAC
+
+    Args:
+        args: arguments จาก argparse
+
+    Returns:
+        int: exit code
+    """
+    matcher = create_matcher(matcher_options(args))
+
+    retrieval = cached_index(matcher, args.gallery, lambda: get_gallery(matcher, args))
+    if retrieval is None:
+        print("❌ ไม่พบไฟล์ภาพในคลังภาพ Top-Down")
+        return 1
+
+    results = matcher.compare_with_gallery(args.eye_level, retrieval, args.top_k, args.output)
+    matcher.flush_artifacts()
+
+    print(f"\n📊 ผลการค้นหา (ยืนยัน {len(results)} ภาพ)")
+    print("-" * 70)
+    print(f"{'Top-Down':<30} {'Retrieval':<10} {'Matches':<10} {'Inliers':<10} {'Score':<8}")
+    print("-" * 70)
+    for result in results:
+        top_name = os.path.basename(result['top_down_path'])
+        print(f"{top_name:<30} {result['retrieval_score']:<10.3f} {result['total_matches']:<10} "
+              f"{result.get('inlier_matches', 0):<10} {result['confidence_score']:<8.2f}")
+    print("-" * 70)
+
+    if results and results[0]['homography_found']:
+        print(f"✅ ภาพที่ตรงที่สุด: {results[0]['top_down_path']}")
+    else:
+        print("❌ ไม่พบภาพ Top-Down ที่ตรงกับภาพ Eye-Level")
+    return 0
+
+
+def run_batch(args) -> int:
+    """
+    เปรียบเทียบภาพแบบ N×M ในครั้งเดียว (features ของแต่ละภาพคำนวณครั้งเดียว)
+
+    Args:
+        args: arguments จาก argparse
+
+    Returns:
+        int: exit code
+    """
+    eye_images = collect_images(args.eye_level)
+    top_images = collect_images(args.top_down)
+
+    if not eye_images or not top_images:
+        print("❌ ไม่พบไฟล์ภาพสำหรับการทำงานแบบ batch")
+        return 1
+
+    print(f"📦 Batch: {len(eye_images)} Eye-Level × {len(top_images)} Top-Down "
+          f"= {len(eye_images) * len(top_images)} คู่\n")
+
+    if args.workers > 1:
+        from parallel_runner import compare_many_parallel
+
+        # กระจายงานไปยังหลาย processes และแสดงผลตามลำดับที่เสร็จ
+        results = []
+        for result in compare_many_parallel(matcher_options(args), eye_images, top_images,
+                                            args.output, workers=args.workers):
+            status = "✅" if result['homography_found'] else "❌"
+            print(f"   {status} {os.path.basename(result['eye_level_path'])} ↔ "
+                  f"{os.path.basename(result['top_down_path'])}")
+            results.append(result)
+
+        # เรียงผลลัพธ์กลับตามลำดับของภาพ
+        order = {(eye, top): k for k, (eye, top) in
+                 enumerate((eye, top) for eye in eye_images for top in top_images)}
+        results.sort(key=lambda r: order[(r['eye_level_path'], r['top_down_path'])])
+    else:
+        matcher = create_matcher(matcher_options(args))
+
+        results = matcher.compare_many(eye_images, top_images, args.output)
+        matcher.flush_artifacts()
+
+    # สรุปผลของทุกคู่
+    print("\n📊 สรุปผลการเปรียบเทียบแบบ batch")
+    print("-" * 90)
+    print(f"{'Eye-Level':<30} {'Top-Down':<30} {'Matches':<10} {'Inliers':<10} {'Score':<8}")
+    print("-" * 90)
+
+    success_count = 0
+    for result in results:
+        eye_name = os.path.basename(result['eye_level_path'])
+        top_name = os.path.basename(result['top_down_path'])
+        inliers = result.get('inlier_matches', 0)
+        if result['homography_found']:
+            success_count += 1
+        print(f"{eye_name:<30} {top_name:<30} {result['total_matches']:<10} "
+              f"{inliers:<10} {result['confidence_score']:<8.2f}")
+
+    print("-" * 90)
+    print(f"✅ สำเร็จ {success_count}/{len(results)} คู่")
+    print(f"📁 ผลลัพธ์ถูกบันทึกใน: {args.output}/pair_<i>_<j>")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    สร้าง argument parser ของ CLI
+
+    Returns:
+        argparse.ArgumentParser: parser ของทุกตัวเลือก
+    """
+    from homography_matcher import BINARY_MATCHING_METHODS, DEFAULT_LSH_PARAMS, ESTIMATORS
+    from instrumentation import RANSAC_CONFIDENCE, RANSAC_MAX_ITERS
 
-    # สร้าง argument parser
     parser = argparse.ArgumentParser(
+        prog='cli.py',
         description='🔍 OpenCV Homography Matcher - เปรียบเทียบภาพ Eye-Level กับ Top-Down',
         epilog='ตัวอย่างการใช้งาน:\n'
                '  python cli.py --eye eye_level.jpg --top top_down.jpg\n'
-               '  python cli.py --eye street.jpg --top map.jpg --detector ORB --output results',
+               '  python cli.py --eye street.jpg --top map.jpg --detector ORB --output results\n'
+               '  python cli.py --batch --eye my_images/eye_level --top my_images/top_down',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
@@ -49,6 +343,146 @@ def main():
                        default='results',
                        help='📁 โฟลเดอร์สำหรับบันทึกผลลัพธ์ (default: results)')
 
+    parser.add_argument('--cache-dir',
+                       default=None,
+                       help='💾 โฟลเดอร์สำหรับ cache ของ features (ไม่ต้องคำนวณซ้ำกับภาพเดิม)')
+
+    parser.add_argument('--pyramid-max-dim',
+                       type=int,
+                       default=None,
+                       help='🔭 หา features บนภาพย่อ (ด้านยาวสุดไม่เกินค่านี้) แล้ว refine ที่ความละเอียดเต็ม')
+
+    parser.add_argument('--reference',
+                       default=None,
+                       help='🧭 โฟลเดอร์ของแผนที่อ้างอิง (features + FLANN index ของ --top) '
+                            'ถ้ายังไม่มีจะสร้างและบันทึกไว้ใช้ซ้ำ')
+
+    parser.add_argument('--gallery',
+                       default=None,
+                       help='🗂️  โฟลเดอร์ของดัชนีคลังภาพ (Bag-of-Visual-Words) ของภาพใน --top '
+                            'ค้นหาภาพที่ตรงที่สุดแล้วยืนยันเฉพาะ --top-k ภาพ')
+
+    parser.add_argument('--top-k',
+                       type=int,
+                       default=5,
+                       help='🏅 จำนวนภาพจากการค้นหาที่นำมายืนยัน (default: 5)')
+
+    parser.add_argument('--tile-size',
+                       type=int,
+                       default=None,
+                       help='🧩 สร้าง --reference แบบแบ่ง tiles ขนาดนี้ (สำหรับแผนที่ขนาดใหญ่มาก)')
+
+    parser.add_argument('--tile-overlap',
+                       type=int,
+                       default=256,
+                       help='🧩 ระยะซ้อนทับระหว่าง tiles (default: 256)')
+
+    parser.add_argument('--artifacts',
+                       choices=['none', 'minimal', 'full'],
+                       default='full',
+                       help='🖼️  ภาพผลลัพธ์ที่บันทึก: none, minimal (เฉพาะภาพการจับคู่) หรือ full (default: full)')
+
+    parser.add_argument('--artifact-threads',
+                       type=int,
+                       default=2,
+                       help='🖼️  จำนวน threads ที่วาดและเขียนภาพผลลัพธ์ใน background (0 = เขียนทันที, default: 2)')
+
+    parser.add_argument('--max-keypoints',
+                       type=int,
+                       default=None,
+                       help='🎯 จำนวน keypoints สูงสุดต่อภาพ เลือกให้กระจายทั่วภาพ (default: ไม่จำกัด)')
+
+    parser.add_argument('--keypoint-selection',
+                       choices=['grid', 'anms'],
+                       default='grid',
+                       help='🎯 วิธีเลือก keypoints เมื่อเกิน --max-keypoints: grid หรือ anms (default: grid)')
+
+    parser.add_argument('--estimator',
+                       choices=list(ESTIMATORS),
+                       default='RANSAC',
+                       help='🎲 Robust estimator ของ Homography เช่น RANSAC, RHO, USAC_MAGSAC, USAC_PROSAC (default: RANSAC)')
+
+    parser.add_argument('--ransac-threshold',
+                       type=float,
+                       default=5.0,
+                       help='🎲 ระยะ reprojection สูงสุดของ inliers เป็น pixels (default: 5.0)')
+
+    parser.add_argument('--ransac-confidence',
+                       type=float,
+                       default=RANSAC_CONFIDENCE,
+                       help=f'🎲 ความเชื่อมั่นที่ใช้หยุดการสุ่ม (default: {RANSAC_CONFIDENCE})')
+
+    parser.add_argument('--ransac-max-iters',
+                       type=int,
+                       default=RANSAC_MAX_ITERS,
+                       help=f'🎲 จำนวนรอบสูงสุดของการสุ่ม (default: {RANSAC_MAX_ITERS})')
+
+    parser.add_argument('--guided',
+                       action='store_true',
+                       help='🧭 จับคู่ใหม่รอบตำแหน่งที่ Homography แรกทำนาย แล้วหา Homography ใหม่')
+
+    parser.add_argument('--guided-radius',
+                       type=float,
+                       default=10.0,
+                       help='🧭 รัศมีการค้นหาของ --guided เป็น pixels ในภาพ top-down (default: 10)')
+
+    parser.add_argument('--first-pass-keypoints',
+                       type=int,
+                       default=None,
+                       help='🧭 จำนวน keypoints ของภาพ eye-level ที่ใช้จับคู่รอบแรกเมื่อใช้ --guided (default: ทั้งหมด)')
+
+    parser.add_argument('--binary-matching',
+                       choices=list(BINARY_MATCHING_METHODS),
+                       default='bruteforce',
+                       help='🔗 วิธีจับคู่ descriptors แบบ binary ของ ORB/AKAZE: bruteforce (แม่นยำ) '
+                            'หรือ lsh (FLANN LSH เร็วกว่าเมื่อมี keypoints มาก) (default: bruteforce)')
+
+    parser.add_argument('--lsh-tables',
+                       type=int,
+                       default=DEFAULT_LSH_PARAMS['table_number'],
+                       help=f"🔗 จำนวน hash tables ของ LSH (default: {DEFAULT_LSH_PARAMS['table_number']})")
+
+    parser.add_argument('--lsh-key-size',
+                       type=int,
+                       default=DEFAULT_LSH_PARAMS['key_size'],
+                       help=f"🔗 จำนวน bits ของ hash key (default: {DEFAULT_LSH_PARAMS['key_size']})")
+
+    parser.add_argument('--lsh-probe-level',
+                       type=int,
+                       default=DEFAULT_LSH_PARAMS['multi_probe_level'],
+                       help=f"🔗 ระดับ multi-probe ของ LSH (default: {DEFAULT_LSH_PARAMS['multi_probe_level']})")
+
+    parser.add_argument('--match-chunk-size',
+                       type=int,
+                       default=None,
+                       help='🧱 จับคู่ descriptors ทีละช่วงขนาดนี้เพื่อจำกัดหน่วยความจำ (default: ทั้งหมดในครั้งเดียว)')
+
+    parser.add_argument('--match-threads',
+                       type=int,
+                       default=1,
+                       help='🧱 จำนวน threads ที่จับคู่ช่วงต่างๆ พร้อมกันเมื่อใช้ --match-chunk-size (default: 1)')
+
+    parser.add_argument('--memory-cache-mb',
+                       type=float,
+                       default=0,
+                       help='🧠 เก็บภาพ, features และผลการจับคู่ไว้ในหน่วยความจำไม่เกินขนาดนี้ (MB) ใช้ร่วมกับ --daemon-socket (default: 0 = ปิด)')
+
+    parser.add_argument('--warp-interpolation',
+                       choices=['nearest', 'linear', 'cubic', 'lanczos'],
+                       default='linear',
+                       help='🖼️  วิธี interpolate ของภาพ eye-level ที่ถูก warp (nearest เร็วที่สุด, lanczos ละเอียดที่สุด) (default: linear)')
+
+    parser.add_argument('--remap-cache-mb',
+                       type=float,
+                       default=0,
+                       help='🗺️  เก็บตาราง remap ของ Homography ที่ใช้ซ้ำไว้ไม่เกินขนาดนี้ (MB) (default: 0 = ปิด)')
+
+    parser.add_argument('--decode-mode',
+                       choices=['grayscale', 'color'],
+                       default='grayscale',
+                       help='🎨 decode ภาพ grayscale โดยตรง (ภาพสีโหลดเฉพาะตอนบันทึกผลลัพธ์) หรือ decode ภาพสีแล้วแปลง '
+                            'ให้ผลลัพธ์ตรงกับเวอร์ชันก่อน (default: grayscale)')
+
     parser.add_argument('--verbose', '-v',
                        action='store_true',
                        help='📝 แสดงข้อมูลรายละเอียดเพิ่มเติม')
@@ -57,8 +491,68 @@ def main():
                        action='store_true',
                        help='⏱️  ทดสอบประสิทธิภาพของ detectors ทั้งหมด')
 
+    parser.add_argument('--batch',
+                       action='store_true',
+                       help='📦 เปรียบเทียบทุกคู่ภาพ (--eye/--top เป็นโฟลเดอร์ได้) โดยคำนวณ features ครั้งเดียวต่อภาพ')
+
+    parser.add_argument('--workers', '-j',
+                       type=int,
+                       default=1,
+                       help='🧵 จำนวน processes สำหรับ --benchmark และ --batch (default: 1)')
+
+    parser.add_argument('--daemon-socket',
+                       default=None,
+                       help='⚡ ส่งคำสั่งให้ matcher_daemon.py ที่ทำงานค้างไว้ผ่าน Unix socket นี้ '
+                            '(ถ้าเชื่อมต่อไม่ได้จะทำงานในโปรเซสนี้แทน)')
+
+    return parser
+
+
+def forward_to_daemon(argv: List[str]) -> Optional[int]:
+    """
+    ส่งคำสั่งให้ daemon ถ้าระบุ --daemon-socket (ไม่ต้อง import OpenCV ในโปรเซสนี้)
+
+    Args:
+        argv (List[str]): arguments ของคำสั่ง
+
+    Returns:
+        Optional[int]: exit code จาก daemon หรือ None ถ้าต้องทำงานในโปรเซสนี้
+    """
+    daemon_parser = argparse.ArgumentParser(add_help=False)
+    daemon_parser.add_argument('--daemon-socket', default=None)
+    daemon_args, forwarded = daemon_parser.parse_known_args(argv)
+    if not daemon_args.daemon_socket:
+        return None
+
+    from matcher_daemon import connect, forward_command
+
+    try:
+        connection = connect(daemon_args.daemon_socket)
+    except OSError as e:
+        print(f"⚠️  เชื่อมต่อ daemon ไม่ได้ ({e}) ทำงานในโปรเซสนี้แทน", file=sys.stderr)
+        return None
+    with connection:
+        return forward_command(connection, forwarded)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    ฟังก์ชันหลักสำหรับ CLI
+
+    Args:
+        argv (List[str]): arguments ของคำสั่ง (default: sys.argv[1:])
+
+    Returns:
+        int: exit code
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    exit_code = forward_to_daemon(argv)
+    if exit_code is not None:
+        return exit_code
+
     # Parse arguments
-    args = parser.parse_args()
+    args = build_parser().parse_args(argv)
 
     # ตรวจสอบไฟล์ input
     if not os.path.exists(args.eye_level):
@@ -80,6 +574,12 @@ def main():
     print("=" * 50)
 
     try:
+        if args.batch:
+            return run_batch(args)
+
+        if args.gallery:
+            return run_gallery(args)
+
         if args.benchmark:
             # ทดสอบทุก detectors
             print("⏱️  กำลังทดสอบประสิทธิภาพของ detectors ทั้งหมด...\n")
@@ -87,33 +587,51 @@ def main():
             detectors = ['SIFT', 'ORB', 'AKAZE']
             results = {}
 
-            for detector in detectors:
-                print(f"🔍 ทดสอบ {detector}...")
-
-                try:
-                    matcher = HomographyMatcher(
-                        feature_detector=detector,
-                        min_match_count=args.min_matches
-                    )
+            if args.workers > 1:
+                from parallel_runner import run_parallel
 
-                    result = matcher.compare_images(
-                        args.eye_level,
-                        args.top_down,
-                        f"{args.output}/{detector.lower()}_results"
-                    )
+                # รันทุก detectors พร้อมกัน แสดงผลตามลำดับที่เสร็จ
+                tasks = {detector: (matcher_options(args, detector), args.eye_level, args.top_down,
+                                    f"{args.output}/{detector.lower()}_results")
+                         for detector in detectors}
 
+                for detector, result, error in run_parallel(tasks, args.workers):
+                    if error is not None:
+                        print(f"🔍 {detector}: ❌ ข้อผิดพลาด: {error}")
+                    elif result['homography_found']:
+                        print(f"🔍 {detector}: ✅ สำเร็จ! Score: {result['confidence_score']:.2f}")
+                    else:
+                        print(f"🔍 {detector}: ❌ ล้มเหลว (Matches: {result['total_matches']})")
                     results[detector] = result
 
-                    if result['homography_found']:
-                        print(f"   ✅ สำเร็จ! Score: {result['confidence_score']:.2f}")
-                    else:
-                        print(f"   ❌ ล้มเหลว (Matches: {result['total_matches']})")
+                results = {detector: results[detector] for detector in detectors}
+                print()
+            else:
+                for detector in detectors:
+                    print(f"🔍 ทดสอบ {detector}...")
 
-                except Exception as e:
-                    print(f"   ❌ ข้อผิดพลาด: {str(e)}")
-                    results[detector] = None
+                    try:
+                        matcher = create_matcher(matcher_options(args, detector))
 
-                print()
+                        result = matcher.compare_images(
+                            args.eye_level,
+                            args.top_down,
+                            f"{args.output}/{detector.lower()}_results"
+                        )
+                        matcher.flush_artifacts()
+
+                        results[detector] = result
+
+                        if result['homography_found']:
+                            print(f"   ✅ สำเร็จ! Score: {result['confidence_score']:.2f}")
+                        else:
+                            print(f"   ❌ ล้มเหลว (Matches: {result['total_matches']})")
+
+                    except Exception as e:
+                        print(f"   ❌ ข้อผิดพลาด: {str(e)}")
+                        results[detector] = None
+
+                    print()
 
             # สรุปผลการทดสอบ
             print("📊 สรุปผลการทดสอบ")
@@ -134,16 +652,25 @@ def main():
             # ใช้ detector ที่ระบุ
             print(f"🚀 เริ่มการเปรียบเทียบด้วย {args.detector}...\n")
 
-            matcher = HomographyMatcher(
-                feature_detector=args.detector,
-                min_match_count=args.min_matches
-            )
+            matcher = create_matcher(matcher_options(args))
 
-            result = matcher.compare_images(
-                args.eye_level,
-                args.top_down,
-                args.output
-            )
+            if args.reference:
+                from tiled_reference import TiledReferenceMap
+
+                reference = cached_index(matcher, args.reference, lambda: get_reference(matcher, args))
+                if isinstance(reference, TiledReferenceMap):
+                    result = matcher.compare_with_tiled_reference(args.eye_level, reference, args.output)
+                    print(f"🧩 Candidate Tiles: {result['candidate_tiles']}")
+                    print(f"🧩 Selected Tile: {result['tile']}")
+                else:
+                    result = matcher.compare_with_reference(args.eye_level, reference, args.output)
+            else:
+                result = matcher.compare_images(
+                    args.eye_level,
+                    args.top_down,
+                    args.output
+                )
+            matcher.flush_artifacts()
 
             # แสดงผลสรุป
             print("\n" + "=" * 50)
@@ -158,7 +685,8 @@ def main():
                 print(f"✅ Inlier Matches: {result['inlier_matches']}")
                 print(f"🎯 Confidence Score: {result['confidence_score']:.2f}")
                 print("\n🎉 การเปรียบเทียบสำเร็จ!")
-                print(f"📁 ผลลัพธ์ถูกบันทึกใน: {args.output}")
+                if args.artifacts != 'none':
+                    print(f"📁 ผลลัพธ์ถูกบันทึกใน: {args.output}")
 
                 # แนะนำการตีความผล
                 if result['confidence_score'] >= 0.7:
@@ -177,6 +705,9 @@ def main():
                 print("   - ลดจำนวน min matches (--min-matches 5)")
                 print("   - ตรวจสอบว่าภาพทั้งสองมีวัตถุหรือพื้นที่ที่ตรงกันหรือไม่")
 
+        if args.artifacts == 'none':
+            return 0
+
         print(f"\n📂 ไฟล์ผลลัพธ์:")
         print(f"   • matches_visualization.jpg - การแสดงผลการจับคู่ features")
         print(f"   • comparison.jpg - การเปรียบเทียบภาพที่ถูก transform")
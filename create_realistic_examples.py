@@ -8,6 +8,102 @@
 import cv2
 import numpy as np
 import os
+from typing import Iterable, Optional, Tuple
+
+
+# สีของวัตถุที่ใช้ร่วมกันระหว่างภาพตัวอย่างและแผนที่สังเคราะห์ของ benchmark_suite.py
+WINDOW_COLOR = (255, 255, 0)
+LAWN_COLOR = (100, 200, 100)
+TREE_COLOR = (50, 150, 50)
+
+
+def draw_building(img: np.ndarray, x1: int, y1: int, x2: int, y2: int, color: tuple,
+                  windows: Iterable[Tuple[int, int]] = (), window_size: Tuple[int, int] = (12, 15),
+                  name: Optional[str] = None):
+    """
+    วาดอาคารแบบมองจากด้านบน (สี่เหลี่ยมขอบดำ) พร้อมหน้าต่างและชื่ออาคาร
+
+    Args:
+        img (np.ndarray): ภาพที่วาดลงไป
+        x1, y1, x2, y2 (int): กรอบของอาคาร
+        color (tuple): สีของอาคาร (BGR)
+        windows (Iterable[Tuple[int, int]]): มุมบนซ้ายของหน้าต่างแต่ละบาน
+        window_size (Tuple[int, int]): ขนาดหน้าต่าง (width, height)
+        name (str): ชื่ออาคารที่เขียนไว้กลางอาคาร (optional)
+    """
+    cv2.rectangle(img, (x1, y1), (x2, y2), color, -1)
+    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 0, 0), 2)
+
+    if name:
+        text_x = x1 + (x2 - x1) // 2 - len(name) * 4
+        text_y = y1 + (y2 - y1) // 2
+        cv2.putText(img, name, (text_x, text_y),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+
+    ww, wh = window_size
+    for wx, wy in windows:
+        cv2.rectangle(img, (wx, wy), (wx + ww, wy + wh), WINDOW_COLOR, -1)
+        cv2.rectangle(img, (wx, wy), (wx + ww, wy + wh), (0, 0, 0), 1)
+
+
+def draw_road(img: np.ndarray, x1: int, y1: int, x2: int, y2: int, color: tuple = (100, 100, 100)):
+    """วาดผิวถนน (สี่เหลี่ยม) จาก (x1, y1) ถึง (x2, y2)"""
+    cv2.rectangle(img, (x1, y1), (x2, y2), color, -1)
+
+
+def draw_lane_marks(img: np.ndarray, x1: int, y1: int, x2: int, y2: int,
+                    start: int, period: int, length: int, thickness: int):
+    """
+    วาดเส้นประสีขาวตรงกลางถนน (แนวนอนถ้าถนนกว้างกว่าสูง ไม่เช่นนั้นแนวตั้ง)
+
+    Args:
+        img (np.ndarray): ภาพที่วาดลงไป
+        x1, y1, x2, y2 (int): กรอบของถนน
+        start (int): ตำแหน่งของเส้นประแรกตามแนวถนน
+        period (int): ระยะห่างระหว่างจุดเริ่มของเส้นประ
+        length (int): ความยาวของเส้นประ
+        thickness (int): ความหนาของเส้นประ
+    """
+    half = thickness // 2
+    if x2 - x1 > y2 - y1:
+        mid = (y1 + y2) // 2
+        for x in range(start, x2, period):
+            cv2.rectangle(img, (x, mid - half), (x + length, mid + thickness - half), (255, 255, 255), -1)
+    else:
+        mid = (x1 + x2) // 2
+        for y in range(start, y2, period):
+            cv2.rectangle(img, (mid - half, y), (mid + thickness - half, y + length), (255, 255, 255), -1)
+
+
+def draw_tree(img: np.ndarray, center: Tuple[int, int], radius: int, outline: bool = True):
+    """วาดต้นไม้แบบมองจากด้านบน (วงกลมสีเขียว พร้อมขอบสีอ่อน)"""
+    cv2.circle(img, center, radius, TREE_COLOR, -1)
+    if outline:
+        cv2.circle(img, center, radius, LAWN_COLOR, 2)
+
+
+def draw_park(img: np.ndarray, center: Tuple[int, int], radius: int, border: int = 2,
+              trees: Iterable[Tuple[int, int]] = ()):
+    """
+    วาดสวน (สนามหญ้าวงกลมขอบขาว) พร้อมต้นไม้เล็กๆ
+
+    Args:
+        img (np.ndarray): ภาพที่วาดลงไป
+        center (Tuple[int, int]): จุดศูนย์กลาง
+        radius (int): รัศมี
+        border (int): ความหนาของขอบสีขาว
+        trees (Iterable[Tuple[int, int]]): ตำแหน่งของต้นไม้
+    """
+    cv2.circle(img, center, radius, LAWN_COLOR, -1)
+    cv2.circle(img, center, radius, (255, 255, 255), border)
+    for tree in trees:
+        draw_tree(img, tree, 6, outline=False)
+
+
+def draw_label(img: np.ndarray, text: str, org: Tuple[int, int], scale: float,
+               color: tuple = (0, 0, 0), thickness: int = 2):
+    """เขียนป้ายข้อความ (ให้ features แบบมุมและขอบคมที่ detectors หาได้ง่าย)"""
+    cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness, cv2.LINE_AA)
 
 
 def create_university_campus():
@@ -35,46 +131,32 @@ def create_university_campus():
     ]
 
     for x1, y1, x2, y2, color, name in buildings:
-        # วาดอาคาร
-        cv2.rectangle(campus_map, (x1, y1), (x2, y2), color, -1)
-        cv2.rectangle(campus_map, (x1, y1), (x2, y2), (0, 0, 0), 2)
-
-        # เพิ่มชื่ออาคาร
-        text_x = x1 + (x2 - x1) // 2 - len(name) * 4
-        text_y = y1 + (y2 - y1) // 2
-        cv2.putText(campus_map, name, (text_x, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
-
-        # เพิ่มหน้าต่างอาคาร
+        # หน้าต่างอาคารเรียงเป็นตาราง
         window_rows = max(2, (y2 - y1) // 80)
         window_cols = max(3, (x2 - x1) // 60)
-
+        windows = []
         for i in range(window_rows):
             for j in range(window_cols):
                 wx = x1 + 15 + j * ((x2 - x1 - 30) // window_cols)
                 wy = y1 + 20 + i * ((y2 - y1 - 40) // window_rows)
                 if wx + 12 < x2 and wy + 15 < y2:
-                    cv2.rectangle(campus_map, (wx, wy), (wx + 12, wy + 15), (255, 255, 0), -1)
-                    cv2.rectangle(campus_map, (wx, wy), (wx + 12, wy + 15), (0, 0, 0), 1)
+                    windows.append((wx, wy))
+
+        draw_building(campus_map, x1, y1, x2, y2, color, windows, (12, 15), name)
 
     # วาดถนนและทางเดิน
     # ถนนหลัก
-    cv2.rectangle(campus_map, (0, 380), (1200, 420), (100, 100, 100), -1)
-    cv2.rectangle(campus_map, (350, 0), (390, 900), (100, 100, 100), -1)
-    cv2.rectangle(campus_map, (700, 0), (740, 900), (100, 100, 100), -1)
+    roads = [(0, 380, 1200, 420), (350, 0, 390, 900), (700, 0, 740, 900)]
+    for road in roads:
+        draw_road(campus_map, *road)
 
     # เส้นกลางถนน
-    for x in range(50, 1200, 100):
-        cv2.rectangle(campus_map, (x, 395), (x + 40, 405), (255, 255, 255), -1)
-    for y in range(50, 900, 100):
-        cv2.rectangle(campus_map, (365, y), (375, y + 40), (255, 255, 255), -1)
-        cv2.rectangle(campus_map, (715, y), (725, y + 40), (255, 255, 255), -1)
+    for road in roads:
+        draw_lane_marks(campus_map, *road, start=50, period=100, length=40, thickness=10)
 
     # ลานกลาง (จุดสำคัญ)
-    cv2.circle(campus_map, (550, 320), 80, (100, 200, 100), -1)  # สวนกลาง
-    cv2.circle(campus_map, (550, 320), 80, (255, 255, 255), 3)
-    cv2.putText(campus_map, "ลานกลาง", (520, 325),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+    draw_park(campus_map, (550, 320), 80, border=3)  # สวนกลาง
+    draw_label(campus_map, "ลานกลาง", (520, 325), 0.7, (255, 255, 255))
 
     # น้ำพุ
     cv2.circle(campus_map, (550, 320), 25, (0, 150, 255), -1)
@@ -88,8 +170,7 @@ def create_university_campus():
     ]
 
     for x, y in tree_positions:
-        cv2.circle(campus_map, (x, y), 15, (50, 150, 50), -1)
-        cv2.circle(campus_map, (x, y), 15, (100, 200, 100), 2)
+        draw_tree(campus_map, (x, y), 15)
 
     # ป้ายบอกทาง
     cv2.rectangle(campus_map, (500, 50), (600, 80), (255, 255, 255), -1)
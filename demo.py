@@ -5,15 +5,20 @@
 สำหรับผู้เริ่มต้น
 """
 
+import argparse
 import cv2
 import numpy as np
 from homography_matcher import HomographyMatcher
+from parallel_runner import run_parallel
 import os
 
 
-def simple_demo():
+def simple_demo(workers: int = 1):
     """
     การสาธิตแบบง่าย ๆ
+
+    Args:
+        workers (int): จำนวน processes ที่ใช้รันการทดสอบพร้อมกัน (1 = ทีละการทดสอบ)
     """
     print("🎯 OpenCV Homography Matcher - การสาธิตแบบง่าย")
     print("=" * 60)
@@ -47,12 +52,32 @@ def simple_demo():
 
     results_summary = []
 
+    # ทดสอบกับ detectors ต่าง ๆ
+    detectors = ['SIFT', 'ORB', 'AKAZE']
+
+    # ถ้าใช้หลาย processes ให้รันทุกภาพ × detectors พร้อมกันก่อน และแสดงผลตามลำดับที่เสร็จ
+    # (key -> (ผลลัพธ์, ข้อความ error))
+    parallel_results = {}
+    if workers > 1:
+        tasks = {(i, detector): ({'feature_detector': detector, 'min_match_count': 5},
+                                 eye_path, top_path, f"demo_results/test_{i}_{detector.lower()}")
+                 for i, (eye_path, top_path, _) in enumerate(available_samples, 1)
+                 for detector in detectors}
+
+        for (i, detector), result, error in run_parallel(tasks, workers):
+            if error is not None:
+                status = f"❌ Error: {error}"
+            elif result['homography_found']:
+                status = f"✅ Score: {result['confidence_score']:.2f}"
+            else:
+                status = f"❌ Matches: {result['total_matches']}"
+            print(f"   ⚡ เสร็จแล้ว: ทดสอบ {i} / {detector} {status}")
+            parallel_results[(i, detector)] = (result, error)
+
     for i, (eye_path, top_path, description) in enumerate(available_samples, 1):
         print(f"\n📍 ทดสอบ {i}: {description}")
         print("-" * 40)
 
-        # ทดสอบกับ detectors ต่าง ๆ
-        detectors = ['SIFT', 'ORB', 'AKAZE']
         best_result = None
         best_detector = None
         best_score = 0
@@ -61,13 +86,18 @@ def simple_demo():
             try:
                 print(f"   🔍 ทดสอบด้วย {detector}...", end="")
 
-                matcher = HomographyMatcher(
-                    feature_detector=detector,
-                    min_match_count=5  # ลดค่าเพื่อให้ทำงานได้ง่ายขึ้น
-                )
+                if workers > 1:
+                    result, error = parallel_results[(i, detector)]
+                    if error is not None:
+                        raise RuntimeError(error)
+                else:
+                    matcher = HomographyMatcher(
+                        feature_detector=detector,
+                        min_match_count=5  # ลดค่าเพื่อให้ทำงานได้ง่ายขึ้น
+                    )
 
-                output_dir = f"demo_results/test_{i}_{detector.lower()}"
-                result = matcher.compare_images(eye_path, top_path, output_dir)
+                    output_dir = f"demo_results/test_{i}_{detector.lower()}"
+                    result = matcher.compare_images(eye_path, top_path, output_dir)
 
                 if result['homography_found'] and result['confidence_score'] > best_score:
                     best_result = result
@@ -80,7 +110,7 @@ def simple_demo():
                     print(f" ❌ Matches: {result['total_matches']}")
 
             except Exception as e:
-                print(f" ❌ Error")
+                print(f" ❌ Error: {e}")
 
         # สรุปผลลัพธ์ของแต่ละการทดสอบ
         if best_result:
@@ -172,5 +202,8 @@ def explain_theory():
 
 
 if __name__ == "__main__":
-    simple_demo()
+    parser = argparse.ArgumentParser(description='การสาธิต OpenCV Homography Matcher')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='จำนวน processes ที่ใช้รันการทดสอบพร้อมกัน (default: 1)')
+    simple_demo(parser.parse_args().workers)
     explain_theory()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feature Cache บนดิสก์สำหรับ HomographyMatcher
+เก็บ keypoints และ descriptors ของภาพไว้ในรูปแบบ NumPy arrays
+โดยใช้ hash ของเนื้อหาไฟล์ + การตั้งค่า detector เป็น key
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+from keypoints import KeypointArray
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    คำนวณ hash ของเนื้อหาไฟล์ (SHA-1)
+
+    Args:
+        path (str): path ของไฟล์
+        chunk_size (int): ขนาด block ที่อ่านในแต่ละครั้ง
+
+    Returns:
+        str: hex digest ของไฟล์
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Cache ของ features บนดิสก์ (content-addressed)
+
+    แต่ละ entry เก็บเป็นไฟล์ .npz หนึ่งไฟล์ ชื่อไฟล์คือ hash ของ
+    (hash ของไฟล์ภาพ + การตั้งค่า detector + การตั้งค่า preprocessing)
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the FeatureCache
+
+        Args:
+            cache_dir (str): โฟลเดอร์สำหรับเก็บ cache
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, config: dict) -> str:
+        """
+        สร้าง key ของ cache จาก hash ของภาพและการตั้งค่า
+
+        Args:
+            content_hash (str): hash ของเนื้อหาไฟล์ภาพ
+            config (dict): การตั้งค่า detector และ preprocessing
+
+        Returns:
+            str: key ของ cache
+        """
+        payload = json.dumps({'image': content_hash, 'config': config}, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key: str) -> Optional[Tuple[KeypointArray, Optional[np.ndarray]]]:
+        """
+        โหลด keypoints และ descriptors จาก cache
+
+        Args:
+            key (str): key ของ cache
+
+        Returns:
+            Optional[Tuple[KeypointArray, Optional[np.ndarray]]]: keypoints และ descriptors
+                หรือ None ถ้าไม่มีใน cache
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                keypoints = KeypointArray.from_dict(
+                    {name: data[f'kp_{name}'] for name in KeypointArray.FIELDS})
+                descriptors = data['descriptors'] if data['has_descriptors'] else None
+        except (OSError, ValueError, KeyError):
+            # ไฟล์เสียหาย ให้คำนวณใหม่
+            return None
+
+        return keypoints, descriptors
+
+    def save(self, key: str, keypoints: KeypointArray, descriptors: Optional[np.ndarray]):
+        """
+        บันทึก keypoints และ descriptors ลง cache
+
+        Args:
+            key (str): key ของ cache
+            keypoints (KeypointArray): keypoints ของภาพ
+            descriptors (Optional[np.ndarray]): descriptors ของภาพ
+        """
+        kp_arrays = {f'kp_{name}': array for name, array in keypoints.to_dict().items()}
+        has_descriptors = descriptors is not None
+        if not has_descriptors:
+            descriptors = np.empty((0, 0), dtype=np.uint8)
+
+        # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย rename เพื่อไม่ให้ได้ไฟล์ที่เขียนไม่ครบ
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, descriptors=descriptors, has_descriptors=has_descriptors, **kp_arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ผลการจับคู่ features ในรูปแบบ NumPy arrays
+ใช้แทน list ของ cv2.DMatch ในขั้นตอนกรอง matches และหา Homography
+(แปลงเป็น cv2.DMatch เฉพาะตอนวาดภาพ)
+"""
+
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+
+
+class FeatureMatches:
+    """
+    ชุดของ matches แบบ struct-of-arrays
+
+    Attributes:
+        query_idx (np.ndarray): index ของ keypoint ในภาพแรก (int32)
+        train_idx (np.ndarray): index ของ keypoint ในภาพที่สอง (int32)
+        distance (np.ndarray): ระยะห่างของ descriptors (float32)
+    """
+
+    __slots__ = ('query_idx', 'train_idx', 'distance')
+
+    def __init__(self, query_idx: np.ndarray, train_idx: np.ndarray, distance: np.ndarray):
+        self.query_idx = np.asarray(query_idx, dtype=np.int32)
+        self.train_idx = np.asarray(train_idx, dtype=np.int32)
+        self.distance = np.asarray(distance, dtype=np.float32)
+
+    @classmethod
+    def empty(cls) -> 'FeatureMatches':
+        """สร้างชุด matches ว่าง"""
+        return cls(np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32))
+
+    @classmethod
+    def from_dmatches(cls, dmatches: Sequence) -> 'FeatureMatches':
+        """
+        แปลงจาก list ของ cv2.DMatch
+
+        Args:
+            dmatches (Sequence): รายการ cv2.DMatch
+
+        Returns:
+            FeatureMatches: matches ในรูปแบบ arrays
+        """
+        n = len(dmatches)
+        return cls(np.fromiter((m.queryIdx for m in dmatches), np.int32, n),
+                   np.fromiter((m.trainIdx for m in dmatches), np.int32, n),
+                   np.fromiter((m.distance for m in dmatches), np.float32, n))
+
+    @classmethod
+    def concatenate(cls, parts: Sequence['FeatureMatches'],
+                    query_offsets: Optional[Sequence[int]] = None,
+                    train_offsets: Optional[Sequence[int]] = None) -> 'FeatureMatches':
+        """
+        รวมหลายชุด matches เข้าด้วยกัน พร้อมเลื่อน index ของแต่ละชุด
+
+        Args:
+            parts (Sequence[FeatureMatches]): ชุด matches ที่จะรวม
+            query_offsets (Sequence[int]): ค่าที่บวกเพิ่มให้ query_idx ของแต่ละชุด (optional)
+            train_offsets (Sequence[int]): ค่าที่บวกเพิ่มให้ train_idx ของแต่ละชุด (optional)
+
+        Returns:
+            FeatureMatches: matches ที่รวมแล้ว
+        """
+        if not parts:
+            return cls.empty()
+        query_offsets = query_offsets or [0] * len(parts)
+        train_offsets = train_offsets or [0] * len(parts)
+        return cls(np.concatenate([p.query_idx + q for p, q in zip(parts, query_offsets)]),
+                   np.concatenate([p.train_idx + t for p, t in zip(parts, train_offsets)]),
+                   np.concatenate([p.distance for p in parts]))
+
+    def __len__(self) -> int:
+        return len(self.query_idx)
+
+    def __getitem__(self, selection) -> 'FeatureMatches':
+        """เลือกบางส่วนด้วย slice, boolean mask หรือ index array"""
+        return FeatureMatches(self.query_idx[selection], self.train_idx[selection],
+                              self.distance[selection])
+
+    def sorted_by_distance(self) -> 'FeatureMatches':
+        """เรียงลำดับตาม distance จากน้อยไปมาก (stable)"""
+        return self[np.argsort(self.distance, kind='stable')]
+
+    def to_dmatches(self) -> list:
+        """
+        แปลงเป็น list ของ cv2.DMatch (ใช้สำหรับ cv2.drawMatches)
+
+        Returns:
+            list: รายการ cv2.DMatch
+        """
+        return [cv2.DMatch(q, t, d) for q, t, d in
+                zip(self.query_idx.tolist(), self.train_idx.tolist(), self.distance.tolist())]
@@ -10,10 +10,124 @@ Date: 2025-07-25
 
 import cv2
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
+import copy
+import json
 import os
-from typing import Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Tuple, Optional, Union
+
+from artifact_writer import ARTIFACT_POLICIES, ArtifactWriter, write_image
+from feature_cache import FeatureCache, file_content_hash
+from feature_matches import FeatureMatches
+from instrumentation import RANSAC_CONFIDENCE, RANSAC_MAX_ITERS, StageTimer, estimated_ransac_iterations
+from keypoint_selection import SELECTION_METHODS, select_grid, select_keypoints
+from keypoints import KeypointArray
+from memory_cache import MemoryCache, freeze_arrays
+
+
+# วิธี decode ภาพ: 'grayscale' = decode ภาพ grayscale โดยตรง (ภาพสีโหลดเฉพาะเมื่อต้องใช้)
+# 'color' = decode ภาพสีแล้วแปลงเป็น grayscale
+DECODE_MODES = ('grayscale', 'color')
+
+# flags สำหรับ decode ภาพ grayscale แบบย่อขนาด (ตัวหาร, flag) เรียงจากย่อมากไปน้อย
+REDUCED_GRAYSCALE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+# Robust estimators ของ cv2.findHomography
+ESTIMATORS = {
+    'RANSAC': cv2.RANSAC,
+    'RHO': cv2.RHO,
+    'LMEDS': cv2.LMEDS,
+    'USAC_DEFAULT': cv2.USAC_DEFAULT,
+    'USAC_PARALLEL': cv2.USAC_PARALLEL,
+    'USAC_FAST': cv2.USAC_FAST,
+    'USAC_ACCURATE': cv2.USAC_ACCURATE,
+    'USAC_PROSAC': cv2.USAC_PROSAC,
+    'USAC_MAGSAC': cv2.USAC_MAGSAC,
+}
+
+# วิธีจับคู่ descriptors แบบ binary (ORB, AKAZE)
+BINARY_MATCHING_METHODS = ('bruteforce', 'lsh')
+
+# ค่า default ของ FLANN LSH index สำหรับ descriptors แบบ binary
+DEFAULT_LSH_PARAMS = {'table_number': 6, 'key_size': 12, 'multi_probe_level': 1}
+
+# estimators ที่สุ่มตามลำดับคุณภาพของ matches (ต้องเรียง matches จากดีไปแย่ก่อน)
+ORDERED_ESTIMATORS = ('USAC_PROSAC',)
+
+# วิธี interpolate ตอน warp ภาพ (เรียงจากเร็วไปละเอียด)
+INTERPOLATIONS = {
+    'nearest': cv2.INTER_NEAREST,
+    'linear': cv2.INTER_LINEAR,
+    'cubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+}
+
+# รัศมีของ kernel แต่ละวิธี (pixels ในภาพต้นฉบับ) pixels ที่อยู่นอกภาพไม่เกินระยะนี้ยังได้สีจากขอบภาพ
+INTERPOLATION_RADIUS = {'nearest': 1, 'linear': 1, 'cubic': 2, 'lanczos': 4}
+
+
+def image_size(image_path: str) -> Optional[Tuple[int, int]]:
+    """
+    ขนาด (width, height) ของภาพจาก header ของไฟล์โดยไม่ decode ภาพ
+
+    Args:
+        image_path (str): path ของภาพ
+
+    Returns:
+        Optional[Tuple[int, int]]: ขนาดภาพ หรือ None ถ้าอ่านไม่ได้ (หรือไม่มี Pillow)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(image_path) as img:
+            return img.size
+    except (OSError, ValueError):
+        return None
+
+
+def projected_bbox(src_shape: tuple, H: np.ndarray, dst_shape: tuple, margin: float = 0.0,
+                   padding: float = 0.0) -> Optional[Tuple[int, int, int, int]]:
+    """
+    กรอบ (x0, y0, x1, y1) ในภาพปลายทางที่มุมทั้งสี่ของภาพต้นทางถูก project ไปตก (ตัดให้อยู่ในภาพปลายทาง)
+
+    Args:
+        src_shape (tuple): shape ของภาพต้นทาง
+        H (np.ndarray): Homography จากภาพต้นทางไปภาพปลายทาง
+        dst_shape (tuple): shape ของภาพปลายทาง
+        margin (float): ขยายกรอบเผื่อไว้ตามสัดส่วนของความกว้างและความสูง
+        padding (float): ขยายภาพต้นทางออกทุกด้านเท่านี้ (pixels) ก่อน project เช่นรัศมีของ interpolation
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: กรอบทั้งภาพถ้ามุมใดถูก project ไปอยู่หลังกล้อง
+            หรือ None ถ้าไม่มีส่วนที่ซ้อนทับกับภาพปลายทาง
+    """
+    h, w = src_shape[:2]
+    dst_h, dst_w = dst_shape[:2]
+    lo, hi_x, hi_y = -padding, w + padding, h + padding
+    corners = np.array([[lo, lo, 1], [hi_x, lo, 1], [hi_x, hi_y, 1], [lo, hi_y, 1]], dtype=np.float64).T
+    projected = H @ corners
+    if np.any(projected[2] <= 1e-9):
+        return 0, 0, dst_w, dst_h
+
+    xs = projected[0] / projected[2]
+    ys = projected[1] / projected[2]
+    pad_x = (xs.max() - xs.min()) * margin
+    pad_y = (ys.max() - ys.min()) * margin
+    x0 = int(max(0, np.floor(xs.min() - pad_x)))
+    y0 = int(max(0, np.floor(ys.min() - pad_y)))
+    x1 = int(min(dst_w, np.ceil(xs.max() + pad_x)))
+    y1 = int(min(dst_h, np.ceil(ys.max() + pad_y)))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
 
 
 class HomographyMatcher:
@@ -21,116 +135,901 @@ class HomographyMatcher:
     คลาสสำหรับเปรียบเทียบภาพด้วย Feature Matching และ Homography Transformation
     """
 
-    def __init__(self, feature_detector='SIFT', min_match_count=10):
+    def __init__(self, feature_detector='SIFT', min_match_count=10,
+                 detector_params: Optional[dict] = None, cache_dir: Optional[str] = None,
+                 pyramid_max_dim: Optional[int] = None, artifacts: str = 'full',
+                 artifact_threads: int = 0, stats_hook: Optional[Callable[[dict], None]] = None,
+                 decode_mode: str = 'grayscale', max_keypoints: Optional[int] = None,
+                 keypoint_selection: str = 'grid', estimator: str = 'RANSAC',
+                 ransac_threshold: float = 5.0, ransac_confidence: float = RANSAC_CONFIDENCE,
+                 ransac_max_iters: int = RANSAC_MAX_ITERS, guided_matching: bool = False,
+                 guided_radius: float = 10.0, first_pass_keypoints: Optional[int] = None,
+                 binary_matching: str = 'bruteforce', lsh_params: Optional[dict] = None,
+                 match_chunk_size: Optional[int] = None, match_threads: int = 1,
+                 memory_cache_bytes: int = 0, warp_interpolation: str = 'linear',
+                 remap_cache_bytes: int = 0):
         """
         Initialize the HomographyMatcher
 
         Args:
             feature_detector (str): ประเภทของ feature detector ('SIFT', 'ORB', 'AKAZE')
             min_match_count (int): จำนวนการจับคู่ขั้นต่ำที่ต้องการ
+            detector_params (dict): พารามิเตอร์ที่ส่งให้ตัวสร้าง detector (optional)
+            cache_dir (str): โฟลเดอร์สำหรับ feature cache บนดิสก์ (optional)
+            pyramid_max_dim (int): ถ้ากำหนด จะหา features บนภาพย่อที่ด้านยาวสุดไม่เกินค่านี้
+                แล้ว refine Homography ที่ความละเอียดเต็มเฉพาะบริเวณที่ซ้อนทับกัน (optional)
+            artifacts (str): ภาพผลลัพธ์ที่บันทึก 'none' (ไม่บันทึก), 'minimal' (เฉพาะภาพการจับคู่)
+                หรือ 'full' (ทั้งหมด)
+            artifact_threads (int): จำนวน threads ที่วาดและเขียนภาพผลลัพธ์ใน background
+                (0 = เขียนทันทีก่อนคืนผลลัพธ์) ต้องเรียก flush_artifacts เพื่อรอให้เขียนเสร็จ
+            stats_hook (Callable): ฟังก์ชันที่รับผลลัพธ์ (พร้อมเวลาแต่ละขั้นตอน) ของทุกการเปรียบเทียบ (optional)
+            decode_mode (str): 'grayscale' (decode ภาพ grayscale โดยตรง โหลดภาพสีเฉพาะตอนบันทึกผลลัพธ์)
+                หรือ 'color' (decode ภาพสีแล้วแปลงเป็น grayscale แบบเวอร์ชันก่อน)
+                ภาพ grayscale ที่ decode โดยตรงไม่เท่ากับ BGR->gray ทุกพิกเซล (JPEG ใช้ช่อง Y ของไฟล์โดยตรง)
+                จำนวน matches และ score จึงต่างจาก 'color' เล็กน้อย
+            max_keypoints (int): จำนวน keypoints สูงสุดต่อภาพ (None = ไม่จำกัด) เพื่อจำกัดเวลาจับคู่
+            keypoint_selection (str): วิธีเลือก keypoints เมื่อเกิน max_keypoints
+                'grid' (แบ่งช่องตาม response) หรือ 'anms' (Adaptive Non-Maximal Suppression)
+            estimator (str): robust estimator ของ cv2.findHomography (ดู ESTIMATORS) เช่น 'RANSAC',
+                'RHO', 'USAC_MAGSAC' หรือ 'USAC_PROSAC' (สุ่มตามลำดับระยะของ matches)
+            ransac_threshold (float): ระยะ reprojection สูงสุดของ inliers (pixels)
+            ransac_confidence (float): ความเชื่อมั่นที่ใช้หยุดการสุ่ม
+            ransac_max_iters (int): จำนวนรอบสูงสุดของการสุ่ม
+            guided_matching (bool): หลังพบ Homography แรก จับคู่ใหม่โดยค้นหาเฉพาะรอบตำแหน่งที่ H ทำนาย
+                แล้วหา Homography ใหม่จากชุด matches ที่ใหญ่ขึ้น
+            guided_radius (float): รัศมีการค้นหาของ guided matching (pixels ในภาพ top-down)
+            first_pass_keypoints (int): จำนวน keypoints ของภาพ eye-level ที่ใช้จับคู่รอบแรก
+                เมื่อเปิด guided_matching (None = ใช้ทั้งหมด)
+            binary_matching (str): วิธีจับคู่ของ ORB/AKAZE 'bruteforce' (Hamming + cross check)
+                หรือ 'lsh' (FLANN LSH index + ratio test ใช้ index ซ้ำได้หลาย queries)
+            lsh_params (dict): พารามิเตอร์ของ LSH index ('table_number', 'key_size',
+                'multi_probe_level') ที่ใช้แทนค่า default (optional)
+            match_chunk_size (int): จับคู่ descriptors ของภาพแรกทีละช่วงขนาดนี้ และเก็บเฉพาะ matches
+                ที่ผ่านการกรองลง buffers ที่จองไว้ เพื่อจำกัดหน่วยความจำ (None = จับคู่ทั้งหมดในครั้งเดียว)
+            match_threads (int): จำนวน threads ที่จับคู่ช่วงต่างๆ พร้อมกันเมื่อกำหนด match_chunk_size
+            memory_cache_bytes (int): ขนาดสูงสุดของ cache ในหน่วยความจำ (bytes) สำหรับภาพที่ decode แล้ว,
+                features และผลการจับคู่ของ compare_images (0 = ไม่ใช้)
+            warp_interpolation (str): วิธี interpolate ของ transform_image (ดู INTERPOLATIONS)
+                'nearest' เร็วที่สุด 'lanczos' ละเอียดที่สุด
+            remap_cache_bytes (int): ขนาดสูงสุดของ cache ตาราง remap แบบ fixed-point ของ transform_image
+                (bytes) เมื่อ warp ด้วย Homography เดิมซ้ำ (กล้องตั้งอยู่กับที่, วิดีโอ) จะเหลือเพียง
+                cv2.remap ครั้งเดียว (0 = ไม่ใช้)
         """
+        if artifacts not in ARTIFACT_POLICIES:
+            raise ValueError(f"Unsupported artifacts policy: {artifacts}")
+        if decode_mode not in DECODE_MODES:
+            raise ValueError(f"Unsupported decode mode: {decode_mode}")
+        if keypoint_selection not in SELECTION_METHODS:
+            raise ValueError(f"Unsupported keypoint selection: {keypoint_selection}")
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unsupported estimator: {estimator}")
+        if binary_matching not in BINARY_MATCHING_METHODS:
+            raise ValueError(f"Unsupported binary matching: {binary_matching}")
+        if match_chunk_size is not None and match_chunk_size < 1:
+            raise ValueError(f"Unsupported match chunk size: {match_chunk_size}")
+        if warp_interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unsupported interpolation: {warp_interpolation}")
+
         self.min_match_count = min_match_count
         self.feature_detector = feature_detector
-
-        # สร้าง feature detector และ matcher
+        self.detector_params = dict(detector_params or {})
+        self.pyramid_max_dim = pyramid_max_dim
+        self.max_keypoints = max_keypoints
+        self.keypoint_selection = keypoint_selection
+        self.match_chunk_size = match_chunk_size
+        self.match_threads = max(1, match_threads)
+        # ขนาดและจำนวน patches (ต่อแกน) ที่ใช้ refine ที่ความละเอียดเต็ม
+        # (patches ถูกวางที่ inliers ของระดับหยาบ จึงใช้ patches เล็กได้โดยยังมี texture)
+        self.refine_patch_size = 160
+        self.refine_grid = 4
+
+        # การตั้งค่า contrast และ brightness ตอน preprocess
+        self.decode_mode = decode_mode
+        self.contrast_alpha = 1.2
+        self.contrast_beta = 10
+
+        # feature cache บนดิสก์
+        self.feature_cache = FeatureCache(cache_dir) if cache_dir else None
+
+        # cache ในหน่วยความจำ (LRU จำกัดตามจำนวน bytes)
+        self.memory_cache = MemoryCache(memory_cache_bytes) if memory_cache_bytes > 0 else None
+
+        # การ warp ภาพของ transform_image และ cache ตาราง remap ตาม Homography
+        self.warp_interpolation = warp_interpolation
+        self.remap_cache = MemoryCache(remap_cache_bytes) if remap_cache_bytes > 0 else None
+
+        # การบันทึกภาพผลลัพธ์
+        self.artifacts = artifacts
+        self.artifact_writer = (ArtifactWriter(artifact_threads)
+                                if artifact_threads > 0 and artifacts != 'none' else None)
+
+        # เวลาแต่ละขั้นตอนของการเปรียบเทียบปัจจุบัน
+        self.stats_hook = stats_hook
+        self.timer = StageTimer()
+
+        # สร้าง feature detector และการตั้งค่า matcher
+        # flann_index_params = None หมายถึงจับคู่แบบ brute-force (ไม่มี index)
+        self.binary_matching = binary_matching
+        self.flann_index_params = None
+        self.flann_search_params = dict(checks=50)
         if feature_detector == 'SIFT':
-            self.detector = cv2.SIFT_create()
-            # FLANN matcher สำหรับ SIFT
+            self.detector = cv2.SIFT_create(**self.detector_params)
+            # FLANN (KD-tree) สำหรับ SIFT
             FLANN_INDEX_KDTREE = 1
-            index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-            search_params = dict(checks=50)
-            self.matcher = cv2.FlannBasedMatcher(index_params, search_params)
-        elif feature_detector == 'ORB':
-            self.detector = cv2.ORB_create()
-            # BFMatcher สำหรับ ORB
-            self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-        elif feature_detector == 'AKAZE':
-            self.detector = cv2.AKAZE_create()
-            self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+            self.flann_index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+        elif feature_detector in ('ORB', 'AKAZE'):
+            if feature_detector == 'ORB':
+                self.detector = cv2.ORB_create(**self.detector_params)
+            else:
+                self.detector = cv2.AKAZE_create(**self.detector_params)
+            # Brute-force Hamming + cross check หรือ FLANN LSH สำหรับ descriptors แบบ binary
+            self.norm_type = cv2.NORM_HAMMING
+            if binary_matching == 'lsh':
+                FLANN_INDEX_LSH = 6
+                self.flann_index_params = dict(DEFAULT_LSH_PARAMS, **(lsh_params or {}),
+                                               algorithm=FLANN_INDEX_LSH)
         else:
             raise ValueError(f"Unsupported feature detector: {feature_detector}")
 
-    def load_and_preprocess_image(self, image_path: str) -> np.ndarray:
+        # ค่า ratio สำหรับ Lowe's ratio test และสัดส่วนของ matches ที่เก็บไว้ (ORB/AKAZE)
+        self.ratio_threshold = 0.7
+        self.keep_fraction = 0.25
+
+        # การตั้งค่าของ robust estimator
+        self.estimator = estimator
+        self.ransac_threshold = ransac_threshold
+        self.ransac_confidence = ransac_confidence
+        self.ransac_max_iters = ransac_max_iters
+
+        # การตั้งค่าของ guided matching (ratio test ในหน้าต่างเล็กจึงผ่อนได้มากกว่ารอบแรก)
+        self.guided_matching = guided_matching
+        self.guided_radius = guided_radius
+        self.guided_ratio = 0.8
+        self.first_pass_keypoints = first_pass_keypoints
+
+    def _read_image(self, image_path: str, flags: int) -> np.ndarray:
         """
-        โหลดและปรับแต่งภาพ
+        decode ภาพจากไฟล์
 
         Args:
             image_path (str): path ของภาพ
+            flags (int): flags ของ cv2.imread
 
         Returns:
-            np.ndarray: ภาพที่ปรับแต่งแล้ว
+            np.ndarray: ภาพ
+
+        Raises:
+            FileNotFoundError: ถ้าไม่พบไฟล์
+            ValueError: ถ้า decode ไม่ได้
         """
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"ไม่พบไฟล์ภาพ: {image_path}")
 
-        img = cv2.imread(image_path)
+        with self.timer.stage('load'):
+            img = cv2.imread(image_path, flags)
         if img is None:
             raise ValueError(f"ไม่สามารถโหลดภาพได้: {image_path}")
+        self.timer.record_array('image', img)
+        return img
 
-        # แปลงเป็น grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def decode_buffer(self, data: Union[bytes, bytearray, memoryview, np.ndarray], flags: int) -> np.ndarray:
+        """
+        decode ภาพที่ encode แล้ว (เช่น JPEG/PNG ที่ได้รับทางเครือข่าย) จากหน่วยความจำ โดยไม่เขียนไฟล์
 
-        # ปรับ contrast และ brightness
-        gray = cv2.convertScaleAbs(gray, alpha=1.2, beta=10)
+        Args:
+            data: bytes ของไฟล์ภาพ
+            flags (int): flags ของ cv2.imdecode
+
+        Returns:
+            np.ndarray: ภาพ
+
+        Raises:
+            ValueError: ถ้า decode ไม่ได้
+        """
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        with self.timer.stage('load'):
+            img = cv2.imdecode(buffer, flags) if buffer.size else None
+        if img is None:
+            raise ValueError(f"ไม่สามารถ decode ภาพจาก buffer ได้ ({buffer.size} bytes)")
+        self.timer.record_array('image', img)
+        return img
+
+    def load_color_image(self, image_path: str) -> np.ndarray:
+        """
+        โหลดภาพสี BGR (ใช้เฉพาะตอนวาดหรือ warp ภาพผลลัพธ์)
+
+        Args:
+            image_path (str): path ของภาพ
+
+        Returns:
+            np.ndarray: ภาพสี
+        """
+        return self._read_image(image_path, cv2.IMREAD_COLOR)
+
+    def load_and_preprocess_image(self, image_path: str,
+                                  color: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        โหลดและปรับแต่งภาพ
+
+        ในโหมด decode 'grayscale' จะ decode ภาพ grayscale โดยตรงแล้วปรับ contrast ในที่เดิม
+        และ decode ภาพสีแยกต่างหากเฉพาะเมื่อ color=True
+
+        Args:
+            image_path (str): path ของภาพ
+            color (bool): ต้องการภาพสีด้วยหรือไม่ (ใช้วาดหรือ warp ภาพผลลัพธ์)
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: ภาพสี (None ถ้า color=False)
+                และภาพ grayscale ที่ปรับแต่งแล้ว
+        """
+        if self.memory_cache is None:
+            return self._decode_and_preprocess(lambda flags: self._read_image(image_path, flags), color)
+
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"ไม่พบไฟล์ภาพ: {image_path}")
+        key = ('image', self.content_hash(image_path), self.decode_mode,
+               self.contrast_alpha, self.contrast_beta)
+        cached = self.memory_cache.get(key)
+        if cached is not None and (cached[0] is not None or not color):
+            return (cached[0] if color else None), cached[1]
+
+        img, gray = self._decode_and_preprocess(lambda flags: self._read_image(image_path, flags), color)
+        # ภาพใน cache ถูกแชร์ระหว่างการเปรียบเทียบ ห้ามแก้ไข
+        self.memory_cache.put(key, freeze_arrays((img, gray)))
+        return img, gray
+
+    def content_hash(self, image_path: str) -> str:
+        """
+        hash ของเนื้อหาไฟล์ภาพ (จำไว้ใน memory cache ตาม path, เวลาแก้ไข และขนาดของไฟล์)
 
+        Args:
+            image_path (str): path ของภาพ
+
+        Returns:
+            str: hex digest ของไฟล์
+        """
+        if self.memory_cache is None:
+            return file_content_hash(image_path)
+
+        stat = os.stat(image_path)
+        key = ('content_hash', os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+        digest = self.memory_cache.get(key)
+        if digest is None:
+            digest = file_content_hash(image_path)
+            self.memory_cache.put(key, digest)
+        return digest
+
+    def invalidate_image(self, image_path: str) -> int:
+        """
+        ลบภาพ, features และผลการจับคู่ทั้งหมดที่เกี่ยวกับไฟล์ภาพนี้ออกจาก memory cache
+        (ทุกเวอร์ชันของไฟล์ที่เคยถูกอ่าน รวมถึงเนื้อหาปัจจุบัน)
+
+        Args:
+            image_path (str): path ของภาพ
+
+        Returns:
+            int: จำนวน entries ที่ถูกลบ
+        """
+        if self.memory_cache is None:
+            return 0
+
+        path = os.path.abspath(image_path)
+        hashes = {self.memory_cache.peek(key) for key in self.memory_cache.keys()
+                  if key[0] == 'content_hash' and key[1] == path}
+        if os.path.exists(image_path):
+            hashes.add(file_content_hash(image_path))
+
+        return self.memory_cache.invalidate_where(
+            lambda key: (key[0] == 'content_hash' and key[1] == path)
+            or any(part in hashes for part in key[1:] if isinstance(part, str)))
+
+    def decode_and_preprocess_buffer(self, data: Union[bytes, bytearray, memoryview, np.ndarray],
+                                     color: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        decode และปรับแต่งภาพจาก bytes ของไฟล์ภาพ (เหมือน load_and_preprocess_image แต่ไม่อ่านไฟล์)
+
+        Args:
+            data: bytes ของไฟล์ภาพ
+            color (bool): ต้องการภาพสีด้วยหรือไม่ (ใช้วาดภาพผลลัพธ์)
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: ภาพสี (None ถ้า color=False)
+                และภาพ grayscale ที่ปรับแต่งแล้ว
+        """
+        return self._decode_and_preprocess(lambda flags: self.decode_buffer(data, flags), color)
+
+    def _decode_and_preprocess(self, read: Callable[[int], np.ndarray],
+                               color: bool) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        if self.decode_mode == 'color':
+            img = read(cv2.IMREAD_COLOR)
+            return (img if color else None), self.preprocess_image(img)
+
+        gray = read(cv2.IMREAD_GRAYSCALE)
+        self._adjust_contrast(gray)
+        img = read(cv2.IMREAD_COLOR) if color else None
         return img, gray
 
-    def detect_and_compute_features(self, gray_img: np.ndarray) -> Tuple[list, np.ndarray]:
+    def prepare_array_image(self, image: np.ndarray,
+                            color: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        ปรับแต่งภาพที่ผู้เรียกส่งมาเป็น array (ไม่แก้ไข array ต้นฉบับ)
+
+        Args:
+            image (np.ndarray): ภาพ uint8 แบบ grayscale, BGR หรือ BGRA
+            color (bool): ต้องการภาพสีด้วยหรือไม่ (ใช้วาดภาพผลลัพธ์)
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: ภาพสี BGR (None ถ้า color=False)
+                และภาพ grayscale ใหม่ที่ปรับแต่งแล้ว
+
+        Raises:
+            ValueError: ถ้าชนิดหรือจำนวน channels ของภาพไม่รองรับ
+        """
+        if image.dtype != np.uint8:
+            raise ValueError(f"Unsupported image dtype: {image.dtype}")
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        elif image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        elif image.ndim != 2 and not (image.ndim == 3 and image.shape[2] == 3):
+            raise ValueError(f"Unsupported image shape: {image.shape}")
+
+        self.timer.record_array('image', image)
+        gray = self.preprocess_image(image)
+        if not color:
+            return None, gray
+        return (image if image.ndim == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)), gray
+
+    def load_pyramid_image(self, image_path: str) -> Tuple[np.ndarray, float, int]:
+        """
+        โหลดเฉพาะภาพระดับหยาบสำหรับหา features ในโหมด pyramid โดยไม่ decode ภาพความละเอียดเต็ม
+
+        ใช้ reduced decode ของ OpenCV (JPEG ถูกย่อระหว่าง decode) ด้วยตัวหารที่มากที่สุด
+        ที่ภาพยังไม่เล็กกว่า pyramid_max_dim แล้วย่อส่วนที่เหลือด้วย INTER_AREA
+
+        Args:
+            image_path (str): path ของภาพ
+
+        Returns:
+            Tuple[np.ndarray, float, int]: ภาพ grayscale ระดับหยาบที่ปรับแต่งแล้ว,
+                อัตราส่วนเทียบกับภาพเต็ม และตัวหารที่ใช้ตอน decode (1 = ไม่ได้ย่อ)
+        """
+        factor, flags = 1, cv2.IMREAD_GRAYSCALE
+        size = image_size(image_path) if self.decode_mode == 'grayscale' else None
+        if size is not None:
+            for reduce_factor, reduce_flags in REDUCED_GRAYSCALE_FLAGS:
+                if max(size) / reduce_factor >= self.pyramid_max_dim:
+                    factor, flags = reduce_factor, reduce_flags
+                    break
+
+        if self.decode_mode == 'color':
+            _, gray = self.load_and_preprocess_image(image_path, color=False)
+        else:
+            gray = self._read_image(image_path, flags)
+            self._adjust_contrast(gray)
+
+        scale = min(1.0, self.pyramid_max_dim / max(gray.shape[:2]))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return gray, scale / factor, factor
+
+    def _adjust_contrast(self, gray: np.ndarray):
+        """ปรับ contrast และ brightness ของภาพ grayscale ในที่เดิม (ไม่สร้าง array ใหม่)"""
+        with self.timer.stage('preprocess'):
+            cv2.convertScaleAbs(gray, dst=gray, alpha=self.contrast_alpha, beta=self.contrast_beta)
+
+    def preprocess_image(self, img: np.ndarray) -> np.ndarray:
+        """
+        ปรับแต่งภาพที่อยู่ในหน่วยความจำแล้ว (เช่น frame ของวิดีโอ)
+
+        Args:
+            img (np.ndarray): ภาพสี BGR หรือภาพ grayscale
+
+        Returns:
+            np.ndarray: ภาพ grayscale ใหม่ที่ปรับ contrast และ brightness แล้ว
+        """
+        with self.timer.stage('preprocess'):
+            # แปลงเป็น grayscale
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img.copy()
+
+        # ปรับ contrast และ brightness
+        self._adjust_contrast(gray)
+        return gray
+
+    def detect_and_compute_features(self, gray_img: np.ndarray) -> Tuple[KeypointArray, np.ndarray]:
         """
         หา keypoints และ descriptors ในภาพ
 
+        ถ้ากำหนด max_keypoints จะเลือก keypoints ที่กระจายทั่วภาพให้ไม่เกินจำนวนนั้น
+        (เลือกหลัง detectAndCompute เพราะการเรียก compute แยกทำให้ SIFT/AKAZE ต้องสร้าง scale space ใหม่)
+
         Args:
             gray_img (np.ndarray): ภาพ grayscale
 
         Returns:
-            Tuple[list, np.ndarray]: keypoints และ descriptors
+            Tuple[KeypointArray, np.ndarray]: keypoints และ descriptors
         """
         keypoints, descriptors = self.detector.detectAndCompute(gray_img, None)
+        keypoints = KeypointArray.from_cv(keypoints)
+
+        if self.max_keypoints and len(keypoints) > self.max_keypoints:
+            selected = select_keypoints(keypoints, gray_img.shape, self.max_keypoints,
+                                        self.keypoint_selection)
+            self.timer.count('keypoints_dropped', len(keypoints) - len(selected))
+            keypoints, descriptors = keypoints[selected], descriptors[selected]
+
         return keypoints, descriptors
 
-    def match_features(self, desc1: np.ndarray, desc2: np.ndarray) -> list:
+    def feature_config(self) -> dict:
+        """
+        การตั้งค่าที่มีผลต่อ features (ใช้เป็นส่วนหนึ่งของ cache key)
+
+        Returns:
+            dict: ประเภท detector, พารามิเตอร์ และการตั้งค่า preprocessing
+        """
+        return {
+            'detector': self.feature_detector,
+            'detector_params': self.detector_params,
+            'max_keypoints': self.max_keypoints,
+            'keypoint_selection': self.keypoint_selection,
+            'decode_mode': self.decode_mode,
+            'contrast_alpha': self.contrast_alpha,
+            'contrast_beta': self.contrast_beta,
+            'opencv_version': cv2.__version__,
+        }
+
+    def match_config(self) -> dict:
+        """
+        การตั้งค่าที่มีผลต่อผลการจับคู่และ Homography (ใช้เป็นส่วนหนึ่งของ key ของผลลัพธ์ใน memory cache)
+
+        Returns:
+            dict: feature_config พร้อมการตั้งค่าของการจับคู่, RANSAC, guided matching และ pyramid
+        """
+        return dict(
+            self.feature_config(),
+            pyramid_max_dim=self.pyramid_max_dim,
+            refine_patch_size=self.refine_patch_size,
+            refine_grid=self.refine_grid,
+            min_match_count=self.min_match_count,
+            ratio_threshold=self.ratio_threshold,
+            keep_fraction=self.keep_fraction,
+            flann_index_params=self.flann_index_params,
+            flann_search_params=self.flann_search_params,
+            estimator=self.estimator,
+            ransac_threshold=self.ransac_threshold,
+            ransac_confidence=self.ransac_confidence,
+            ransac_max_iters=self.ransac_max_iters,
+            guided_matching=self.guided_matching,
+            guided_radius=self.guided_radius,
+            guided_ratio=self.guided_ratio,
+            first_pass_keypoints=self.first_pass_keypoints,
+        )
+
+    def get_features(self, image_path: Optional[str], gray_img: np.ndarray,
+                     variant: Optional[dict] = None) -> Tuple[KeypointArray, np.ndarray]:
+        """
+        หา keypoints และ descriptors โดยตรวจสอบ feature cache ก่อน
+
+        Args:
+            image_path (str): path ของภาพ (ใช้คำนวณ hash ของเนื้อหาไฟล์)
+                หรือ None สำหรับภาพที่ไม่มีไฟล์ (ไม่ใช้ cache)
+            gray_img (np.ndarray): ภาพ grayscale ที่ปรับแต่งแล้ว
+            variant (dict): การตั้งค่าเพิ่มเติมที่ทำให้ gray_img ต่างจากภาพเต็ม
+                เช่น ระดับของ pyramid (ใช้เป็นส่วนหนึ่งของ cache key)
+
+        Returns:
+            Tuple[KeypointArray, np.ndarray]: keypoints และ descriptors
+        """
+        if image_path is None or (self.feature_cache is None and self.memory_cache is None):
+            return self.detect_and_compute_features(gray_img)
+
+        config = self.feature_config()
+        if variant:
+            config['variant'] = variant
+        content_hash = self.content_hash(image_path)
+        key = FeatureCache.make_key(content_hash, config)
+
+        # ลำดับการค้นหา: memory cache -> cache บนดิสก์ -> คำนวณใหม่
+        memory_key = ('features', content_hash, key)
+        if self.memory_cache is not None:
+            cached = self.memory_cache.get(memory_key)
+            if cached is not None:
+                return cached
+
+        cached = self.feature_cache.load(key) if self.feature_cache is not None else None
+        if cached is None:
+            cached = self.detect_and_compute_features(gray_img)
+            if self.feature_cache is not None:
+                self.feature_cache.save(key, *cached)
+
+        if self.memory_cache is not None:
+            # keypoints และ descriptors ถูกแชร์กับทุกผู้เรียกที่ใช้ภาพเดียวกัน ห้ามแก้ไข
+            self.memory_cache.put(memory_key, freeze_arrays(cached))
+        return cached
+
+    def pyramid_scale(self, gray_img: np.ndarray) -> float:
+        """
+        อัตราส่วนของภาพย่อที่ใช้หา features ในโหมด pyramid
+
+        Args:
+            gray_img (np.ndarray): ภาพ grayscale ความละเอียดเต็ม
+
+        Returns:
+            float: อัตราส่วน (1.0 = ไม่ย่อ)
+        """
+        if not self.pyramid_max_dim:
+            return 1.0
+        return min(1.0, self.pyramid_max_dim / max(gray_img.shape[:2]))
+
+    def get_pyramid_features(self, image_path: Optional[str], gray_img: np.ndarray) -> Tuple[KeypointArray, np.ndarray, float]:
+        """
+        หา features บนระดับหยาบของ pyramid (หรือภาพเต็มถ้าภาพเล็กพออยู่แล้ว)
+
+        Args:
+            image_path (str): path ของภาพ (None = ไม่ใช้ feature cache)
+            gray_img (np.ndarray): ภาพ grayscale ความละเอียดเต็ม
+
+        Returns:
+            Tuple[KeypointArray, np.ndarray, float]: keypoints (พิกัดในภาพย่อ), descriptors และอัตราส่วนที่ย่อ
+        """
+        scale = self.pyramid_scale(gray_img)
+        if scale >= 1.0:
+            keypoints, descriptors = self.get_features(image_path, gray_img)
+            self.timer.record_array('descriptors', descriptors)
+            return keypoints, descriptors, 1.0
+
+        small = cv2.resize(gray_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        keypoints, descriptors = self.get_features(image_path, small,
+                                                   variant={'pyramid_max_dim': self.pyramid_max_dim})
+        self.timer.record_array('descriptors', descriptors)
+        return keypoints, descriptors, scale
+
+    @staticmethod
+    def _projected_roi(src_shape: tuple, H: np.ndarray, dst_shape: tuple,
+                       margin: float = 0.1) -> Optional[Tuple[int, int, int, int]]:
+        """
+        กรอบ (x0, y0, x1, y1) ในภาพปลายทางที่ภาพต้นทางถูก project ไปตก โดยขยายขอบเผื่อไว้
+
+        คืนค่ากรอบทั้งภาพถ้ามุมใดถูก project ไปอยู่หลังกล้อง และ None ถ้าบริเวณที่ซ้อนทับกันเล็กเกินไป
+        """
+        roi = projected_bbox(src_shape, H, dst_shape, margin)
+        if roi is None or roi[2] - roi[0] < 16 or roi[3] - roi[1] < 16:
+            return None
+        return roi
+
+    def refine_homography(self, H: np.ndarray, gray1: np.ndarray, gray2: np.ndarray,
+                          anchors: Optional[KeypointArray] = None) -> Optional[tuple]:
+        """
+        หา Homography ใหม่ที่ความละเอียดเต็ม โดยใช้เฉพาะ keypoints ในบริเวณที่ซ้อนทับกันตาม H เดิม
+
+        หา features เฉพาะใน patches ขนาด refine_patch_size ไม่เกิน refine_grid x refine_grid patches
+        ที่วางบน inliers ของระดับหยาบ (เลือกให้กระจายทั่วภาพ) หรือแบ่งบริเวณที่ซ้อนทับกันเป็นตาราง
+        ถ้าไม่มี inliers แต่ละ patch จะหา features เทียบกับบริเวณที่ H คาดว่าจะตรงกันในภาพ top-down
+        เท่านั้น แล้วรวม matches ทั้งหมดมาหา Homography ครั้งเดียว
+        เวลาที่ใช้จึงขึ้นกับจำนวนและขนาดของ patches ไม่ใช่ขนาดภาพ
+
+        Args:
+            H (np.ndarray): Homography แบบหยาบ (พิกัดภาพเต็ม)
+            gray1, gray2: ภาพ grayscale ความละเอียดเต็ม (eye-level, top-down)
+            anchors (KeypointArray): keypoints ของ inliers ระดับหยาบในภาพ eye-level (พิกัดภาพเต็ม)
+
+        Returns:
+            Optional[tuple]: ผลลัพธ์, Homography, keypoints ทั้งสองภาพ (พิกัดภาพเต็ม),
+                good matches และ inlier matches หรือ None ถ้าไม่มีบริเวณที่ซ้อนทับกัน
+        """
+        try:
+            H_inv = np.linalg.inv(H)
+        except np.linalg.LinAlgError:
+            return None
+
+        roi1 = self._projected_roi(gray2.shape, H_inv, gray1.shape, margin=0.0)
+        if roi1 is None:
+            return None
+
+        x0, y0, x1, y1 = roi1
+        half = self.refine_patch_size // 2
+        num_patches = self.refine_grid * self.refine_grid
+        if anchors is not None and len(anchors) >= num_patches:
+            # inliers ที่แรงที่สุดในแต่ละช่องของตาราง (patches กระจายทั่วบริเวณที่ซ้อนทับกัน)
+            selected = select_grid(anchors, gray1.shape, num_patches, per_cell=1)[:num_patches]
+            centers = anchors.pt[selected]
+        else:
+            xs = np.linspace(x0 + half, max(x0 + half, x1 - half), self.refine_grid)
+            ys = np.linspace(y0 + half, max(y0 + half, y1 - half), self.refine_grid)
+            centers = np.array([(cx, cy) for cy in ys for cx in xs])
+
+        kp1, kp2 = [], []
+        patch_matches, offsets1, offsets2 = [], [], []
+        count1 = count2 = 0
+        for cx, cy in centers:
+            px0, py0 = int(max(0, cx - half)), int(max(0, cy - half))
+            px1, py1 = int(min(gray1.shape[1], cx + half)), int(min(gray1.shape[0], cy + half))
+            patch_shape = (py1 - py0, px1 - px0)
+            if min(patch_shape) < 16:
+                continue
+
+            # บริเวณในภาพ top-down ที่ patch นี้ควรตกไปตาม H
+            H_patch = H @ np.array([[1, 0, px0], [0, 1, py0], [0, 0, 1]], dtype=np.float64)
+            roi2 = self._projected_roi(patch_shape, H_patch, gray2.shape, margin=0.25)
+            if roi2 is None:
+                continue
+            qx0, qy0, qx1, qy1 = roi2
+            if (qx1 - qx0) * (qy1 - qy0) > 16 * patch_shape[0] * patch_shape[1]:
+                # patch ถูกขยายมากเกินไป (ใกล้เส้นขอบฟ้า) ไม่คุ้มที่จะใช้ refine
+                continue
+
+            pkp1, pdesc1 = self.detect_and_compute_features(gray1[py0:py1, px0:px1])
+            pkp2, pdesc2 = self.detect_and_compute_features(gray2[qy0:qy1, qx0:qx1])
+            if pdesc1 is None or pdesc2 is None or len(pkp1) < 2 or len(pkp2) < 2:
+                continue
+
+            patch_matches.append(self.match_features(pdesc1, pdesc2))
+            offsets1.append(count1)
+            offsets2.append(count2)
+            count1 += len(pkp1)
+            count2 += len(pkp2)
+            kp1.append(pkp1.transformed(offset=(px0, py0)))
+            kp2.append(pkp2.transformed(offset=(qx0, qy0)))
+
+        kp1 = KeypointArray.concatenate(kp1)
+        kp2 = KeypointArray.concatenate(kp2)
+        matches = FeatureMatches.concatenate(patch_matches, offsets1, offsets2)
+        results, H_fine, matches, inlier_matches = self.estimate_from_matches(kp1, kp2, matches)
+        return results, H_fine, kp1, kp2, matches, inlier_matches
+
+    def estimate_pair(self, kp1: KeypointArray, desc1: np.ndarray, scale1: float, gray1: Optional[np.ndarray],
+                      kp2: KeypointArray, desc2: np.ndarray, scale2: float,
+                      gray2: Optional[np.ndarray], index2=None) -> tuple:
+        """
+        จับคู่และหา Homography จาก features ที่อาจมาจากระดับหยาบของ pyramid
+
+        ถ้าไม่ได้ใช้โหมด pyramid จะเท่ากับ estimate_from_features ถ้าใช้ จะแปลง H จากภาพย่อ
+        กลับเป็นพิกัดภาพเต็ม แล้ว refine ที่ความละเอียดเต็ม (เมื่อมี gray1 และ gray2)
+
+        Args:
+            kp1, desc1, scale1: features ของภาพ eye-level และอัตราส่วนที่ย่อ
+            gray1: ภาพ eye-level grayscale ความละเอียดเต็ม (None = ไม่ refine)
+            kp2, desc2, scale2: features ของภาพ top-down และอัตราส่วนที่ย่อ
+            gray2: ภาพ top-down grayscale ความละเอียดเต็ม (None = ไม่ refine)
+            index2: index ที่สร้างไว้แล้วจาก desc2 (optional)
+
+        Returns:
+            tuple: ผลลัพธ์ (รวม 'homography'), Homography (พิกัดภาพเต็ม),
+                keypoints ทั้งสองภาพ (พิกัดภาพเต็ม), good matches และ inlier matches
+                เมื่อ refine สำเร็จ ผลลัพธ์มี 'coarse_inlier_matches' (inliers ที่ระดับหยาบ)
+                และ 'guided' / 'initial_inlier_matches' ของ guided matching ที่ระดับหยาบด้วย
+        """
+        results, H, matches, inlier_matches = self.estimate_from_features(kp1, desc1, kp2, desc2, index2)
+        results['homography'] = H
+        if not self.pyramid_max_dim:
+            return results, H, kp1, kp2, matches, inlier_matches
+
+        results['pyramid_scales'] = (scale1, scale2)
+        results['refined'] = False
+        kp1 = kp1.transformed(1.0 / scale1) if scale1 != 1.0 else kp1
+        kp2 = kp2.transformed(1.0 / scale2) if scale2 != 1.0 else kp2
+
+        if H is None:
+            return results, H, kp1, kp2, matches, inlier_matches
+
+        # H_full = S2^-1 · H_small · S1
+        H = np.diag([1.0 / scale2, 1.0 / scale2, 1.0]) @ H @ np.diag([scale1, scale1, 1.0])
+        H /= H[2, 2]
+        results['homography'] = H
+
+        if gray1 is not None and gray2 is not None:
+            with self.timer.stage('refine'):
+                refined = self.refine_homography(H, gray1, gray2, kp1[inlier_matches.query_idx])
+            if refined is not None and refined[0]['homography_found']:
+                # ผลของ guided matching เกิดที่ระดับหยาบ เก็บไว้ในผลลัพธ์ที่ refine แล้วด้วย
+                for key in ('guided', 'initial_inlier_matches'):
+                    if key in results:
+                        refined[0][key] = results[key]
+                refined[0]['coarse_inlier_matches'] = results.get('inlier_matches', 0)
+                refined[0]['pyramid_scales'] = (scale1, scale2)
+                refined[0]['refined'] = True
+                refined[0]['homography'] = refined[1]
+                return refined
+
+        return results, H, kp1, kp2, matches, inlier_matches
+
+    def build_match_index(self, descriptors: Optional[np.ndarray]):
+        """
+        สร้าง index สำหรับค้นหา descriptors ของภาพอ้างอิง (ใช้ซ้ำได้หลาย queries)
+
+        Args:
+            descriptors (np.ndarray): descriptors ของภาพที่สอง (top-down)
+
+        Returns:
+            cv2.flann_Index (KD-tree สำหรับ SIFT หรือ LSH สำหรับ binary_matching='lsh')
+                หรือ None ถ้าใช้ brute-force matching
+        """
+        if self.flann_index_params is None or descriptors is None or len(descriptors) < 2:
+            return None
+        return cv2.flann_Index(descriptors, self.flann_index_params)
+
+    def match_features(self, desc1: np.ndarray, desc2: np.ndarray, index=None) -> FeatureMatches:
         """
         จับคู่ features ระหว่างสองภาพ
 
         Args:
             desc1 (np.ndarray): descriptors ของภาพแรก
             desc2 (np.ndarray): descriptors ของภาพที่สอง
+            index: index ที่สร้างจาก desc2 ด้วย build_match_index (optional)
+                ถ้าไม่ระบุจะสร้างใหม่สำหรับการจับคู่ครั้งนี้
 
         Returns:
-            list: รายการของ good matches
+            FeatureMatches: good matches (index และ distance ในรูปแบบ arrays)
+        """
+        if desc1 is None or desc2 is None or len(desc1) == 0 or len(desc2) == 0:
+            return FeatureMatches.empty()
+
+        if self.flann_index_params is not None:
+            if len(desc2) < 2:
+                return FeatureMatches.empty()
+
+            # ใช้ FLANN index (ได้ผลลัพธ์เป็น arrays ของ index และระยะห่าง)
+            if index is None:
+                with self.timer.stage('index_build'):
+                    index = self.build_match_index(desc2)
+            if self.match_chunk_size is not None:
+                # การกรองทำในแต่ละช่วง เวลาจึงถูกนับรวมใน 'match'
+                with self.timer.stage('match'):
+                    return self._match_index_chunked(desc1, index)
+
+            with self.timer.stage('match'):
+                indices, dists = index.knnSearch(desc1, 2, params=self.flann_search_params)
+            self.timer.record_array('knn_results', dists)
+
+            with self.timer.stage('ratio_filter'):
+                good, distance = self._ratio_test(indices, dists)
+                query_idx = np.flatnonzero(good)
+                return FeatureMatches(query_idx, indices[good, 0], distance)
+
+        # Brute-force Hamming + cross check สำหรับ ORB และ AKAZE
+        if self.match_chunk_size is not None:
+            with self.timer.stage('match'):
+                matches = self._crosscheck_chunked(desc1, desc2)
+        else:
+            with self.timer.stage('match'):
+                dists, indices = cv2.batchDistance(desc1, desc2, cv2.CV_32S, normType=self.norm_type,
+                                                   K=1, crosscheck=True)
+            self.timer.record_array('knn_results', dists)
+
+            with self.timer.stage('ratio_filter'):
+                query_idx = np.flatnonzero(indices[:, 0] >= 0)
+                matches = FeatureMatches(query_idx, indices[query_idx, 0], dists[query_idx, 0])
+
+        with self.timer.stage('ratio_filter'):
+            # เรียงลำดับตาม distance แล้วเลือกเฉพาะ matches ที่ดี (25% แรก)
+            matches = matches.sorted_by_distance()
+            return matches[:int(len(matches) * self.keep_fraction)]
+
+    def _ratio_test(self, indices: np.ndarray, dists: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        if desc1 is None or desc2 is None:
-            return []
+        Lowe's ratio test ของผลลัพธ์ knnSearch (k=2) จาก FLANN index
+
+        Args:
+            indices (np.ndarray): index ของเพื่อนบ้าน 2 ตัวแรก (N x 2)
+            dists (np.ndarray): ระยะของเพื่อนบ้าน 2 ตัวแรก (N x 2)
 
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (mask ของ queries ที่ผ่าน, ระยะของ matches ที่ผ่าน)
+        """
         if self.feature_detector == 'SIFT':
-            # ใช้ FLANN matcher สำหรับ SIFT
-            matches = self.matcher.knnMatch(desc1, desc2, k=2)
-
-            # Apply Lowe's ratio test
-            good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance < 0.7 * n.distance:
-                        good_matches.append(m)
+            # KD-tree คืนระยะห่างยกกำลังสอง
+            good = dists[:, 0] < (self.ratio_threshold ** 2) * dists[:, 1]
+            return good, np.sqrt(dists[good, 0])
+        # LSH คืนระยะ Hamming และ index -1 ถ้าหาเพื่อนบ้านไม่ครบ 2 ตัว
+        good = ((indices[:, 1] >= 0)
+                & (dists[:, 0] < self.ratio_threshold * dists[:, 1].astype(np.float32)))
+        return good, dists[good, 0]
+
+    def _match_in_chunks(self, num_queries: int, match_chunk: Callable[[int, int], None]):
+        """
+        เรียก match_chunk(start, stop) กับแต่ละช่วงของ queries ขนาด match_chunk_size
+        (ใช้หลาย threads ถ้า match_threads > 1 เพราะ OpenCV ปล่อย GIL ระหว่างคำนวณ)
+
+        Args:
+            num_queries (int): จำนวน query descriptors
+            match_chunk (Callable[[int, int], None]): ฟังก์ชันที่จับคู่ queries[start:stop]
+        """
+        starts = range(0, num_queries, self.match_chunk_size)
+        self.timer.count('match_chunks', len(starts))
+
+        def run(start: int):
+            match_chunk(start, min(start + self.match_chunk_size, num_queries))
+
+        if self.match_threads > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.match_threads, len(starts))) as executor:
+                list(executor.map(run, starts))
         else:
-            # ใช้ BFMatcher สำหรับ ORB และ AKAZE
-            matches = self.matcher.match(desc1, desc2)
-            # เรียงลำดับตาม distance
-            matches = sorted(matches, key=lambda x: x.distance)
-            # เลือกเฉพาะ matches ที่ดี (25% แรก)
-            good_matches = matches[:len(matches)//4]
+            for start in starts:
+                run(start)
 
-        return good_matches
+    def _match_index_chunked(self, desc1: np.ndarray, index) -> FeatureMatches:
+        """
+        จับคู่กับ FLANN index ทีละช่วงของ desc1 แล้วเก็บเฉพาะ matches ที่ผ่าน ratio test
+        ลง buffers ที่จองไว้ล่วงหน้า (หน่วยความจำของผลลัพธ์ knnSearch จำกัดที่ขนาดช่วง)
 
-    def find_homography(self, kp1: list, kp2: list, matches: list) -> Optional[np.ndarray]:
+        Args:
+            desc1 (np.ndarray): descriptors ของภาพแรก
+            index: FLANN index ของภาพที่สอง
+
+        Returns:
+            FeatureMatches: matches ที่ผ่าน ratio test เรียงตาม query_idx
+        """
+        n = len(desc1)
+        query_idx = np.empty(n, dtype=np.int32)
+        train_idx = np.empty(n, dtype=np.int32)
+        distance = np.empty(n, dtype=np.float32)
+        # จำนวน matches ของแต่ละช่วง (ช่วงที่เริ่มที่ start เขียนลง buffers ตั้งแต่ตำแหน่ง start)
+        counts = {}
+
+        def match_chunk(start: int, stop: int):
+            indices, dists = index.knnSearch(desc1[start:stop], 2, params=self.flann_search_params)
+            self.timer.record_array('knn_results', dists)
+            good, good_distance = self._ratio_test(indices, dists)
+            rows = np.flatnonzero(good)
+            end = start + len(rows)
+            query_idx[start:end] = rows + start
+            train_idx[start:end] = indices[rows, 0]
+            distance[start:end] = good_distance
+            counts[start] = len(rows)
+
+        self._match_in_chunks(n, match_chunk)
+
+        # ย้าย matches ของทุกช่วงมาต่อกันที่ต้น buffers (ตำแหน่งปลายทางไม่เกินตำแหน่งต้นทางเสมอ)
+        total = 0
+        for start in sorted(counts):
+            count = counts[start]
+            for buffer in (query_idx, train_idx, distance):
+                buffer[total:total + count] = buffer[start:start + count]
+            total += count
+        return FeatureMatches(query_idx[:total], train_idx[:total], distance[:total])
+
+    def _crosscheck_chunked(self, desc1: np.ndarray, desc2: np.ndarray) -> FeatureMatches:
+        """
+        Brute-force cross check แบบสองรอบทีละช่วง: หาเพื่อนบ้านที่ใกล้ที่สุดของ desc1 ใน desc2
+        และของ desc2 ใน desc1 แล้วเก็บคู่ที่เป็นเพื่อนบ้านที่ใกล้ที่สุดของกันและกัน
+        (ให้ผลเหมือน cv2.batchDistance(..., crosscheck=True))
+
+        Args:
+            desc1 (np.ndarray): descriptors ของภาพแรก
+            desc2 (np.ndarray): descriptors ของภาพที่สอง
+
+        Returns:
+            FeatureMatches: matches ที่ผ่าน cross check เรียงตาม query_idx
+        """
+        forward_idx = np.empty(len(desc1), dtype=np.int32)
+        forward_dist = np.empty(len(desc1), dtype=np.int32)
+        backward_idx = np.empty(len(desc2), dtype=np.int32)
+
+        def nearest(queries: np.ndarray, train: np.ndarray, out_idx: np.ndarray,
+                    out_dist: Optional[np.ndarray]) -> Callable[[int, int], None]:
+            def match_chunk(start: int, stop: int):
+                dists, indices = cv2.batchDistance(queries[start:stop], train, cv2.CV_32S,
+                                                   normType=self.norm_type, K=1)
+                self.timer.record_array('knn_results', dists)
+                out_idx[start:stop] = indices[:, 0]
+                if out_dist is not None:
+                    out_dist[start:stop] = dists[:, 0]
+            return match_chunk
+
+        self._match_in_chunks(len(desc1), nearest(desc1, desc2, forward_idx, forward_dist))
+        self._match_in_chunks(len(desc2), nearest(desc2, desc1, backward_idx, None))
+
+        query_idx = np.flatnonzero(backward_idx[forward_idx] == np.arange(len(desc1)))
+        return FeatureMatches(query_idx, forward_idx[query_idx], forward_dist[query_idx])
+
+    def find_homography(self, kp1: KeypointArray, kp2: KeypointArray, matches: FeatureMatches) -> Optional[np.ndarray]:
         """
         หา Homography matrix จาก matched keypoints
 
         Args:
-            kp1 (list): keypoints ของภาพแรก
-            kp2 (list): keypoints ของภาพที่สอง
-            matches (list): รายการของ good matches
+            kp1 (KeypointArray): keypoints ของภาพแรก
+            kp2 (KeypointArray): keypoints ของภาพที่สอง
+            matches (FeatureMatches): good matches
 
         Returns:
             Optional[np.ndarray]: Homography matrix หรือ None
@@ -139,43 +1038,144 @@ class HomographyMatcher:
             print(f"จำนวน matches ไม่เพียงพอ: {len(matches)}/{self.min_match_count}")
             return None
 
-        # แยก coordinates ของ matched points
-        src_pts = np.float32([kp1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-        dst_pts = np.float32([kp2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+        # PROSAC สุ่มจาก matches ที่ดีที่สุดก่อน จึงต้องเรียงตามระยะของ descriptors
+        order = None
+        if self.estimator in ORDERED_ESTIMATORS:
+            order = np.argsort(matches.distance, kind='stable')
+            matches = matches[order]
 
-        # หา Homography matrix ด้วย RANSAC
-        H, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+        # แยก coordinates ของ matched points
+        src_pts = kp1.pt[matches.query_idx].reshape(-1, 1, 2)
+        dst_pts = kp2.pt[matches.train_idx].reshape(-1, 1, 2)
+
+        # หา Homography matrix ด้วย robust estimator ที่เลือก
+        with self.timer.stage('ransac'):
+            H, mask = cv2.findHomography(src_pts, dst_pts, ESTIMATORS[self.estimator],
+                                         ransacReprojThreshold=self.ransac_threshold,
+                                         maxIters=self.ransac_max_iters,
+                                         confidence=self.ransac_confidence)
+
+        if mask is not None and order is not None:
+            # คืน mask ตามลำดับเดิมของ matches
+            unordered = np.empty_like(mask)
+            unordered[order] = mask
+            mask = unordered
+
+        # จำนวนรอบที่ควรใช้ตามสูตรจากสัดส่วน inliers สุดท้าย ไม่ใช่จำนวนรอบที่ estimator ทำจริง
+        self.timer.count('ransac_calls')
+        if mask is not None:
+            self.timer.count('estimated_ransac_iterations', self.estimated_iterations(float(mask.mean())))
 
         return H, mask
 
-    def transform_image(self, img: np.ndarray, H: np.ndarray, target_shape: Tuple[int, int]) -> np.ndarray:
+    def estimated_iterations(self, inlier_ratio: float) -> int:
+        """
+        จำนวนรอบของการสุ่มที่ estimator ต้องใช้ตามสัดส่วน inliers (OpenCV ไม่รายงานจำนวนรอบจริง)
+
+        Args:
+            inlier_ratio (float): สัดส่วน inliers
+
+        Returns:
+            int: จำนวนรอบโดยประมาณ ตาม ransac_confidence และไม่เกิน ransac_max_iters
+        """
+        return estimated_ransac_iterations(inlier_ratio, self.ransac_confidence,
+                                           max_iters=self.ransac_max_iters)
+
+    def transform_image(self, img: np.ndarray, H: np.ndarray, target_shape: Tuple[int, int],
+                        interpolation: Optional[str] = None) -> np.ndarray:
         """
         Transform ภาพด้วย Homography matrix
 
+        คำนวณเฉพาะกรอบที่มุมของภาพถูก project ไปตกในภาพเป้าหมาย (ส่วนอื่นเป็นสีดำ)
+        ถ้าเปิด remap_cache จะเก็บตาราง remap ของ Homography นี้ไว้ใช้ซ้ำ
+
         Args:
             img (np.ndarray): ภาพต้นฉบับ
             H (np.ndarray): Homography matrix
             target_shape (Tuple[int, int]): ขนาดของภาพเป้าหมาย (width, height)
+            interpolation (str): วิธี interpolate (default: warp_interpolation)
 
         Returns:
             np.ndarray: ภาพที่ถูก transform แล้ว
         """
-        return cv2.warpPerspective(img, H, target_shape)
+        interpolation = interpolation or self.warp_interpolation
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unsupported interpolation: {interpolation}")
+
+        width, height = target_shape
+        transformed = np.zeros((height, width) + img.shape[2:], dtype=img.dtype)
+        roi = projected_bbox(img.shape, H, (height, width), padding=INTERPOLATION_RADIUS[interpolation])
+        if roi is None:
+            return transformed
+
+        x0, y0, x1, y1 = roi
+        if self.remap_cache is None:
+            # เลื่อนจุดเริ่มต้นของภาพเป้าหมายมาที่มุมของกรอบ
+            H_roi = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64) @ H
+            warped = cv2.warpPerspective(img, H_roi, (x1 - x0, y1 - y0),
+                                         flags=INTERPOLATIONS[interpolation])
+        else:
+            map1, map2 = self._remap_tables(H, img.shape, roi, interpolation)
+            warped = cv2.remap(img, map1, map2, INTERPOLATIONS[interpolation])
+
+        transformed[y0:y1, x0:x1] = warped.reshape(transformed[y0:y1, x0:x1].shape)
+        return transformed
 
-    def visualize_matches(self, img1: np.ndarray, kp1: list, img2: np.ndarray, kp2: list,
-                         matches: list, H: Optional[np.ndarray] = None) -> np.ndarray:
+    def _remap_tables(self, H: np.ndarray, src_shape: tuple, roi: Tuple[int, int, int, int],
+                      interpolation: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        ตาราง remap แบบ fixed-point (CV_16SC2) ของกรอบ roi ในภาพเป้าหมาย (ใช้ซ้ำจาก remap_cache)
+
+        Returns:
+            Tuple[np.ndarray, Optional[np.ndarray]]: map1 และ map2 สำหรับ cv2.remap
+        """
+        H = np.asarray(H, dtype=np.float64)
+        key = (H.tobytes(), src_shape[:2], roi, interpolation)
+        tables = self.remap_cache.get(key)
+        if tables is not None:
+            return tables
+
+        # พิกัดในภาพต้นฉบับของทุก pixel ในกรอบ (inverse mapping เหมือน cv2.warpPerspective)
+        x0, y0, x1, y1 = roi
+        H_inv = np.linalg.inv(H)
+        xs = np.arange(x0, x1, dtype=np.float64)[None, :]
+        ys = np.arange(y0, y1, dtype=np.float64)[:, None]
+        w = H_inv[2, 0] * xs + H_inv[2, 1] * ys + H_inv[2, 2]
+        valid = np.abs(w) > 1e-12
+        w = np.where(valid, w, 1.0)
+        # จุดที่ project ไม่ได้ถูกส่งไปนอกภาพ (กลายเป็นสีดำ)
+        map_x = np.where(valid, (H_inv[0, 0] * xs + H_inv[0, 1] * ys + H_inv[0, 2]) / w, -1).astype(np.float32)
+        map_y = np.where(valid, (H_inv[1, 0] * xs + H_inv[1, 1] * ys + H_inv[1, 2]) / w, -1).astype(np.float32)
+
+        tables = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2,
+                                 nninterpolation=interpolation == 'nearest')
+        if interpolation == 'nearest':
+            tables = (tables[0], None)
+        self.remap_cache.put(key, freeze_arrays(tables))
+        return tables
+
+    def visualize_matches(self, img1: np.ndarray, kp1: KeypointArray, img2: np.ndarray, kp2: KeypointArray,
+                         matches: FeatureMatches, H: Optional[np.ndarray] = None) -> np.ndarray:
         """
         แสดงผลการจับคู่ features
 
         Args:
             img1, img2: ภาพต้นฉบับ
             kp1, kp2: keypoints
-            matches: รายการของ matches
+            matches: matches (FeatureMatches หรือ list ของ cv2.DMatch)
             H: Homography matrix (optional)
 
         Returns:
             np.ndarray: ภาพที่แสดงผลการจับคู่
         """
+        # แปลงเป็น cv2.KeyPoint / cv2.DMatch เฉพาะตอนวาดภาพ
+        if isinstance(kp1, KeypointArray):
+            kp1 = kp1.to_cv()
+        if isinstance(kp2, KeypointArray):
+            kp2 = kp2.to_cv()
+        if isinstance(matches, FeatureMatches):
+            matches = matches.to_dmatches()
+
         # สร้างภาพสำหรับแสดงผล matches
         draw_params = dict(matchColor=(0, 255, 0),    # สีเขียวสำหรับ matches
                           singlePointColor=None,
@@ -199,44 +1199,156 @@ class HomographyMatcher:
 
         return img_matches
 
-    def compare_images(self, eye_level_path: str, top_down_path: str,
-                      output_dir: str = "output") -> dict:
+    def estimate_from_features(self, kp1: KeypointArray, desc1: np.ndarray,
+                               kp2: KeypointArray, desc2: np.ndarray,
+                               index2=None) -> Tuple[dict, Optional[np.ndarray],
+                                                     FeatureMatches, FeatureMatches]:
         """
-        เปรียบเทียบภาพ Eye-Level กับ Top-Down
+        จับคู่ features ที่คำนวณไว้แล้ว และหา Homography (ไม่มีการโหลดภาพหรือบันทึกไฟล์)
 
         Args:
-            eye_level_path (str): path ของภาพ eye-level
-            top_down_path (str): path ของภาพ top-down
-            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์
+            kp1, desc1: keypoints และ descriptors ของภาพ eye-level
+            kp2, desc2: keypoints และ descriptors ของภาพ top-down
+            index2: index ที่สร้างไว้แล้วจาก desc2 (optional)
 
         Returns:
-            dict: ผลลัพธ์การเปรียบเทียบ
+            tuple: ผลลัพธ์, Homography matrix (หรือ None),
+                good matches และ inlier matches
         """
-        # สร้างโฟลเดอร์ output
-        os.makedirs(output_dir, exist_ok=True)
-
-        print("🔍 กำลังโหลดและปรับแต่งภาพ...")
-
-        # โหลดภาพ
-        img1, gray1 = self.load_and_preprocess_image(eye_level_path)
-        img2, gray2 = self.load_and_preprocess_image(top_down_path)
+        if not self.guided_matching:
+            matches = self.match_features(desc1, desc2, index2)
+            return self.estimate_from_matches(kp1, kp2, matches)
+
+        # รอบแรก: จับคู่แบบทั้งภาพด้วย keypoints ของภาพ eye-level บางส่วน
+        if self.first_pass_keypoints and len(kp1) > self.first_pass_keypoints:
+            image_shape = (int(kp1.pt[:, 1].max()) + 1, int(kp1.pt[:, 0].max()) + 1)
+            subset = select_keypoints(kp1, image_shape, self.first_pass_keypoints, self.keypoint_selection)
+            matches = self.match_features(desc1[subset], desc2, index2)
+            matches = FeatureMatches(subset[matches.query_idx], matches.train_idx, matches.distance)
+        else:
+            matches = self.match_features(desc1, desc2, index2)
+
+        results, H, matches, inlier_matches = self.estimate_from_matches(kp1, kp2, matches)
+        results['initial_inlier_matches'] = len(inlier_matches)
+        results['guided'] = False
+        if H is None or len(inlier_matches) < self.min_match_count:
+            return results, H, matches, inlier_matches
+
+        # รอบที่สอง: ค้นหาเฉพาะรอบตำแหน่งที่ H ทำนาย แล้วหา Homography ใหม่
+        guided = self.guided_match(kp1, desc1, kp2, desc2, H)
+        guided_results, guided_H, guided, guided_inliers = self.estimate_from_matches(kp1, kp2, guided)
+        if guided_H is None or len(guided_inliers) < len(inlier_matches):
+            return results, H, matches, inlier_matches
+
+        guided_results['initial_inlier_matches'] = len(inlier_matches)
+        guided_results['guided'] = True
+        return guided_results, guided_H, guided, guided_inliers
+
+    def guided_match(self, kp1: KeypointArray, desc1: np.ndarray, kp2: KeypointArray,
+                     desc2: np.ndarray, H: np.ndarray) -> FeatureMatches:
+        """
+        จับคู่ features โดยค้นหาเฉพาะ keypoints ของภาพ top-down ที่อยู่ในรัศมี guided_radius
+        จากตำแหน่งที่ H ทำนาย
 
-        print(f"📏 ขนาดภาพ Eye-Level: {img1.shape}")
-        print(f"📏 ขนาดภาพ Top-Down: {img2.shape}")
+        keypoints ของภาพ top-down ถูกจัดลงช่องตาราง (ขนาด 2 * guided_radius) แล้ว keypoints ของภาพ
+        eye-level ที่ตกในช่องเดียวกันจะถูกเทียบกับ keypoints ใน 3x3 ช่องรอบๆ พร้อมกัน
 
-        # หา features
-        print(f"🔎 กำลังหา features ด้วย {self.feature_detector}...")
-        kp1, desc1 = self.detect_and_compute_features(gray1)
-        kp2, desc2 = self.detect_and_compute_features(gray2)
+        Args:
+            kp1, desc1: keypoints และ descriptors ของภาพ eye-level
+            kp2, desc2: keypoints และ descriptors ของภาพ top-down
+            H (np.ndarray): Homography จากรอบแรก (eye-level -> top-down)
 
-        print(f"✅ พบ keypoints ในภาพ Eye-Level: {len(kp1)}")
-        print(f"✅ พบ keypoints ในภาพ Top-Down: {len(kp2)}")
+        Returns:
+            FeatureMatches: matches แบบหนึ่งต่อหนึ่งที่ผ่าน ratio test
+        """
+        if desc1 is None or desc2 is None or len(kp1) == 0 or len(kp2) == 0:
+            return FeatureMatches.empty()
+
+        with self.timer.stage('guided_match'):
+            radius = self.guided_radius
+            cell_size = 2.0 * radius
+            if desc1.dtype == np.float32:
+                norm_type, dtype = cv2.NORM_L2, cv2.CV_32F
+            else:
+                norm_type, dtype = cv2.NORM_HAMMING, cv2.CV_32S
+
+            projected = cv2.perspectiveTransform(kp1.pt.reshape(-1, 1, 2), H).reshape(-1, 2)
+
+            # ตารางของ keypoints ภาพ top-down (เรียงตาม cell key เพื่อค้นหาด้วย searchsorted)
+            origin = kp2.pt.min(axis=0) - cell_size
+            cells2 = np.floor((kp2.pt - origin) / cell_size).astype(np.int64)
+            cols = int(cells2[:, 0].max()) + 3
+            rows = int(cells2[:, 1].max()) + 3
+            keys2 = cells2[:, 1] * cols + cells2[:, 0]
+            order2 = np.argsort(keys2, kind='stable')
+            sorted_keys2 = keys2[order2]
+
+            # เฉพาะจุดที่ project แล้วตกในตาราง
+            cells1 = np.floor((projected - origin) / cell_size)
+            valid = (np.isfinite(cells1).all(axis=1)
+                     & (cells1[:, 0] >= 1) & (cells1[:, 0] < cols - 1)
+                     & (cells1[:, 1] >= 1) & (cells1[:, 1] < rows - 1))
+            query_all = np.flatnonzero(valid)
+            cells1 = cells1[valid].astype(np.int64)
+            keys1 = cells1[:, 1] * cols + cells1[:, 0]
+
+            query_parts, train_parts, dist_parts = [], [], []
+            unique_keys, group_of = np.unique(keys1, return_inverse=True)
+            group_order = np.argsort(group_of, kind='stable')
+            bounds = np.searchsorted(group_of[group_order], np.arange(len(unique_keys) + 1))
+            for g, key in enumerate(unique_keys):
+                # candidates จาก 3x3 ช่องรอบๆ (แต่ละแถวเป็นช่วงของ key ที่ต่อเนื่องกัน)
+                ranges = [np.arange(*np.searchsorted(sorted_keys2, [key + dy * cols - 1, key + dy * cols + 2]))
+                          for dy in (-1, 0, 1)]
+                candidates = order2[np.concatenate(ranges)]
+                if len(candidates) == 0:
+                    continue
+                query = query_all[group_order[bounds[g]:bounds[g + 1]]]
+
+                dists, nidx = cv2.batchDistance(desc1[query], desc2[candidates], dtype,
+                                                normType=norm_type, K=len(candidates))
+                full = np.empty(dists.shape, dtype=np.float32)
+                np.put_along_axis(full, nidx, dists.astype(np.float32), axis=1)
+
+                # ตัด candidates ที่อยู่นอกรัศมีของแต่ละจุด
+                offsets = projected[query][:, None, :] - kp2.pt[candidates][None, :, :]
+                full[np.einsum('ijk,ijk->ij', offsets, offsets) > radius * radius] = np.inf
+
+                best = np.argmin(full, axis=1)
+                best_dist = full[np.arange(len(query)), best]
+                if full.shape[1] > 1:
+                    second_dist = np.partition(full, 1, axis=1)[:, 1]
+                else:
+                    second_dist = np.full(len(query), np.inf, dtype=np.float32)
+
+                good = np.isfinite(best_dist) & (best_dist < self.guided_ratio * second_dist)
+                query_parts.append(query[good])
+                train_parts.append(candidates[best[good]])
+                dist_parts.append(best_dist[good])
+
+            if not query_parts:
+                return FeatureMatches.empty()
+
+            # หนึ่งต่อหนึ่ง: keypoint ภาพ top-down แต่ละจุดเก็บ match ที่ระยะน้อยที่สุด
+            matches = FeatureMatches(np.concatenate(query_parts), np.concatenate(train_parts),
+                                     np.concatenate(dist_parts)).sorted_by_distance()
+            _, first = np.unique(matches.train_idx, return_index=True)
+            return matches[np.sort(first)]
+
+    def estimate_from_matches(self, kp1: KeypointArray, kp2: KeypointArray,
+                              matches: FeatureMatches) -> Tuple[dict, Optional[np.ndarray],
+                                                                FeatureMatches, FeatureMatches]:
+        """
+        หา Homography จาก matches ที่มีอยู่แล้ว
 
-        # จับคู่ features
-        print("🔗 กำลังจับคู่ features...")
-        matches = self.match_features(desc1, desc2)
-        print(f"✅ พบ good matches: {len(matches)}")
+        Args:
+            kp1, kp2: keypoints ของภาพ eye-level และ top-down
+            matches: good matches
 
+        Returns:
+            tuple: ผลลัพธ์, Homography matrix (หรือ None),
+                good matches และ inlier matches
+        """
         results = {
             'eye_level_keypoints': len(kp1),
             'top_down_keypoints': len(kp2),
@@ -245,53 +1357,594 @@ class HomographyMatcher:
             'confidence_score': 0.0
         }
 
+        H = None
+        inlier_matches = FeatureMatches.empty()
         if len(matches) >= self.min_match_count:
-            # หา Homography
-            print("📐 กำลังคำนวณ Homography matrix...")
             homography_result = self.find_homography(kp1, kp2, matches)
 
-            if homography_result is not None:
+            if homography_result is not None and homography_result[0] is not None:
                 H, mask = homography_result
-                matches_mask = mask.ravel().tolist()
-                inlier_matches = [m for i, m in enumerate(matches) if matches_mask[i]]
+                inlier_matches = matches[mask.ravel().astype(bool)]
 
                 results['homography_found'] = True
                 results['inlier_matches'] = len(inlier_matches)
                 results['confidence_score'] = len(inlier_matches) / len(matches)
+                results['estimated_ransac_iterations'] = self.estimated_iterations(len(inlier_matches) / len(matches))
+                results['estimator'] = self.estimator
 
-                print(f"✅ พบ Homography! Inlier matches: {len(inlier_matches)}/{len(matches)}")
-                print(f"📊 Confidence Score: {results['confidence_score']:.2f}")
+        return results, H, matches, inlier_matches
 
-                # แสดงผลการจับคู่
-                img_matches = self.visualize_matches(img1, kp1, img2, kp2, inlier_matches, H)
+    def wants_artifacts(self, output_dir: Optional[str]) -> bool:
+        """
+        ตรวจสอบว่าต้องบันทึกภาพผลลัพธ์หรือไม่ (ใช้ตัดสินใจว่าต้องโหลดภาพสีหรือไม่)
+
+        Args:
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ หรือ None
+
+        Returns:
+            bool: True ถ้าต้องบันทึก
+        """
+        return self.artifacts_wanted(self.artifacts, output_dir)
+
+    @staticmethod
+    def artifacts_wanted(artifacts: str, output_dir: Optional[str]) -> bool:
+        """
+        wants_artifacts แบบไม่ต้องสร้าง matcher (เช่นในโปรเซสหลักที่กระจายงานให้ workers)
+
+        Args:
+            artifacts (str): artifacts policy ('none', 'minimal', 'full')
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ หรือ None
+
+        Returns:
+            bool: True ถ้าต้องบันทึก
+        """
+        return output_dir is not None and artifacts != 'none'
 
-                # Transform ภาพ eye-level ให้เป็น top-down view
-                h, w = img2.shape[:2]
+    def save_artifacts(self, img1: np.ndarray, kp1: KeypointArray, img2: np.ndarray, kp2: KeypointArray,
+                       matches: FeatureMatches, inlier_matches: FeatureMatches, H: Optional[np.ndarray],
+                       output_dir: str):
+        """
+        บันทึกภาพผลลัพธ์ของการเปรียบเทียบลงโฟลเดอร์ตาม artifacts policy
+
+        ถ้ามี artifact_writer จะวาดและเขียนภาพใน background (ภาพที่ส่งมาต้องไม่ถูกแก้ไขภายหลัง)
+
+        Args:
+            img1, img2: ภาพต้นฉบับ (eye-level, top-down)
+            kp1, kp2: keypoints
+            matches: good matches ทั้งหมด
+            inlier_matches: inlier matches จาก RANSAC
+            H: Homography matrix หรือ None
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์
+        """
+        if not self.wants_artifacts(output_dir):
+            return
+
+        if self.artifact_writer is not None:
+            self.artifact_writer.submit(self._write_artifacts, img1, kp1, img2, kp2,
+                                        matches, inlier_matches, H, output_dir, self.timer)
+        else:
+            self._write_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H, output_dir, self.timer)
+
+    def _write_artifacts(self, img1: np.ndarray, kp1: KeypointArray, img2: np.ndarray, kp2: KeypointArray,
+                         matches: FeatureMatches, inlier_matches: FeatureMatches, H: Optional[np.ndarray],
+                         output_dir: str, timer: StageTimer):
+        os.makedirs(output_dir, exist_ok=True)
+
+        # เขียนแต่ละภาพทันทีที่วาดเสร็จ (ไม่เก็บทุกภาพไว้ในหน่วยความจำพร้อมกัน)
+        for name, image in self._render_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H, timer):
+            with timer.stage('write'):
+                write_image(os.path.join(output_dir, name), image)
+
+    def render_artifacts(self, img1: np.ndarray, kp1: KeypointArray, img2: np.ndarray, kp2: KeypointArray,
+                         matches: FeatureMatches, inlier_matches: FeatureMatches,
+                         H: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        วาดภาพผลลัพธ์ตาม artifacts policy เป็น arrays (ไม่เขียนไฟล์)
+
+        Args:
+            img1, img2: ภาพสีต้นฉบับ (eye-level, top-down)
+            kp1, kp2: keypoints
+            matches: good matches ทั้งหมด
+            inlier_matches: inlier matches จาก RANSAC
+            H: Homography matrix หรือ None
+
+        Returns:
+            Dict[str, np.ndarray]: ชื่อไฟล์ที่ compare_images ใช้ -> ภาพ
+        """
+        if self.artifacts == 'none':
+            return {}
+        return dict(self._render_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H, self.timer))
+
+    def _render_artifacts(self, img1: np.ndarray, kp1: KeypointArray, img2: np.ndarray, kp2: KeypointArray,
+                          matches: FeatureMatches, inlier_matches: FeatureMatches, H: Optional[np.ndarray],
+                          timer: StageTimer) -> Iterator[Tuple[str, np.ndarray]]:
+        if H is not None:
+            # แสดงผลการจับคู่
+            with timer.stage('render'):
+                img_matches = self.visualize_matches(img1, kp1, img2, kp2, inlier_matches, H)
+            timer.record_array('render', img_matches)
+            yield "matches_visualization.jpg", img_matches
+            if self.artifacts == 'minimal':
+                return
+
+            # Transform ภาพ eye-level ให้เป็น top-down view
+            h, w = img2.shape[:2]
+            with timer.stage('warp'):
                 transformed_img = self.transform_image(img1, H, (w, h))
+            timer.record_array('warped', transformed_img)
 
-                # บันทึกผลลัพธ์
-                cv2.imwrite(os.path.join(output_dir, "matches_visualization.jpg"), img_matches)
-                cv2.imwrite(os.path.join(output_dir, "transformed_eye_level.jpg"), transformed_img)
-                cv2.imwrite(os.path.join(output_dir, "original_top_down.jpg"), img2)
+            yield "transformed_eye_level.jpg", transformed_img
+            yield "original_top_down.jpg", img2
 
-                # สร้างการเปรียบเทียบแบบเคียงข้างกัน
+            # สร้างการเปรียบเทียบแบบเคียงข้างกัน
+            with timer.stage('render'):
                 comparison = np.hstack((transformed_img, img2))
-                cv2.imwrite(os.path.join(output_dir, "comparison.jpg"), comparison)
+            timer.record_array('render', comparison)
+            yield "comparison.jpg", comparison
 
-                print(f"💾 บันทึกผลลัพธ์ในโฟลเดอร์: {output_dir}")
-
-            else:
-                print("❌ ไม่สามารถหา Homography ได้")
-                # แสดงผล matches ที่มีอยู่
+        elif len(matches) >= self.min_match_count:
+            # แสดงผล matches ที่มีอยู่
+            with timer.stage('render'):
                 img_matches = self.visualize_matches(img1, kp1, img2, kp2, matches[:50])  # แสดงแค่ 50 matches แรก
-                cv2.imwrite(os.path.join(output_dir, "failed_matches.jpg"), img_matches)
+            yield "failed_matches.jpg", img_matches
+
+        elif len(matches) > 0:
+            with timer.stage('render'):
+                img_matches = self.visualize_matches(img1, kp1, img2, kp2, matches)
+            yield "insufficient_matches.jpg", img_matches
+
+    def begin_stats(self) -> StageTimer:
+        """
+        เริ่มเก็บเวลาแต่ละขั้นตอนของการเปรียบเทียบใหม่
+
+        Returns:
+            StageTimer: timer ของการเปรียบเทียบนี้
+        """
+        self.timer = StageTimer()
+        return self.timer
+
+    def finish_stats(self, results: dict, timer: Optional[StageTimer] = None) -> dict:
+        """
+        ใส่เวลาแต่ละขั้นตอน ตัวนับ และขนาดสูงสุดของ arrays ลงในผลลัพธ์ แล้วส่งให้ stats_hook
+
+        Args:
+            results (dict): ผลลัพธ์การเปรียบเทียบ
+            timer (StageTimer): timer ที่ใช้ (default: timer ปัจจุบัน)
+
+        Returns:
+            dict: ผลลัพธ์พร้อม 'timings' (วินาที), 'counters' และ 'peak_array_bytes'
+        """
+        return (timer or self.timer).attach(results, self.stats_hook)
+
+    def flush_artifacts(self):
+        """รอให้ภาพผลลัพธ์ที่เขียนใน background เสร็จทั้งหมด (ไม่มีผลถ้าเขียนแบบทันที)"""
+        if self.artifact_writer is not None:
+            self.artifact_writer.flush()
+
+    def compare_images(self, eye_level_path: str, top_down_path: str,
+                      output_dir: str = "output") -> dict:
+        """
+        เปรียบเทียบภาพ Eye-Level กับ Top-Down
+
+        Args:
+            eye_level_path (str): path ของภาพ eye-level
+            top_down_path (str): path ของภาพ top-down
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์
+
+        Returns:
+            dict: ผลลัพธ์การเปรียบเทียบ
+        """
+        self.begin_stats()
+        color = self.wants_artifacts(output_dir)
+
+        # ผลการจับคู่ของคู่ภาพและการตั้งค่าเดิมจาก memory cache
+        result_key = None
+        cached = None
+        if self.memory_cache is not None:
+            result_key = ('result', self.content_hash(eye_level_path), self.content_hash(top_down_path),
+                          json.dumps(self.match_config(), sort_keys=True, default=str))
+            cached = self.memory_cache.get(result_key)
+
+        if cached is not None:
+            print("♻️  ใช้ผลการจับคู่จาก memory cache")
+            self.timer.count('result_cache_hits')
+            results, kp1, kp2, matches, inlier_matches = cached
+            # ผู้เรียกได้สำเนาของผลลัพธ์ (รวม Homography) ที่แก้ไขได้ ค่าใน cache ไม่เปลี่ยน
+            results = copy.deepcopy(results)
+            H = results.get('homography')
+            img1 = img2 = None
+            if color:
+                img1, _ = self.load_and_preprocess_image(eye_level_path, color)
+                img2, _ = self.load_and_preprocess_image(top_down_path, color)
+        else:
+            print("🔍 กำลังโหลดและปรับแต่งภาพ...")
+
+            # โหลดภาพ (ภาพสีโหลดเฉพาะเมื่อต้องบันทึกภาพผลลัพธ์)
+            img1, gray1 = self.load_and_preprocess_image(eye_level_path, color)
+            img2, gray2 = self.load_and_preprocess_image(top_down_path, color)
+
+            results, H, kp1, kp2, matches, inlier_matches = self._match_loaded(
+                gray1, gray2, eye_level_path, top_down_path)
+            if result_key is not None:
+                # เก็บสำเนาของผลลัพธ์ (finish_stats เพิ่มเวลาของการเปรียบเทียบนี้ลงใน dict ที่คืนไป
+                # และผู้เรียกอาจแก้ไข Homography ที่ได้รับ) arrays ใน cache เป็นแบบอ่านอย่างเดียว
+                self.memory_cache.put(result_key, freeze_arrays(
+                    (copy.deepcopy(results), kp1, kp2, matches, inlier_matches)))
+
+        self.save_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H, output_dir)
+        if results['homography_found'] and self.wants_artifacts(output_dir):
+            print(f"💾 บันทึกผลลัพธ์ในโฟลเดอร์: {output_dir}")
+
+        return self.finish_stats(results)
+
+    def compare_arrays(self, eye_level_image: np.ndarray, top_down_image: np.ndarray,
+                       render: bool = False) -> dict:
+        """
+        เปรียบเทียบภาพที่อยู่ในหน่วยความจำแล้ว โดยไม่อ่านหรือเขียนไฟล์ใดๆ
+
+        Args:
+            eye_level_image (np.ndarray): ภาพ eye-level (uint8 grayscale, BGR หรือ BGRA)
+            top_down_image (np.ndarray): ภาพ top-down (uint8 grayscale, BGR หรือ BGRA)
+            render (bool): วาดภาพผลลัพธ์ตาม artifacts policy แล้วคืนเป็น arrays
+
+        Returns:
+            dict: ผลลัพธ์การเปรียบเทียบ พร้อม 'homography' (หรือ None), 'eye_level_points' และ
+                'top_down_points' ของ good matches (N x 2), 'inlier_mask' (bool, N)
+                และ 'artifacts' (ชื่อ -> ภาพ) เมื่อ render=True
+        """
+        self.begin_stats()
+        color = render and self.artifacts != 'none'
+        img1, gray1 = self.prepare_array_image(eye_level_image, color)
+        img2, gray2 = self.prepare_array_image(top_down_image, color)
+        return self._compare_in_memory(img1, gray1, img2, gray2, render)
+
+    def compare_buffers(self, eye_level_data: Union[bytes, bytearray, memoryview, np.ndarray],
+                        top_down_data: Union[bytes, bytearray, memoryview, np.ndarray],
+                        render: bool = False) -> dict:
+        """
+        เปรียบเทียบภาพจาก bytes ของไฟล์ภาพ (decode ด้วย cv2.imdecode ไม่ต้องเขียนไฟล์ชั่วคราว)
+
+        Args:
+            eye_level_data: bytes ของไฟล์ภาพ eye-level (JPEG, PNG, ...)
+            top_down_data: bytes ของไฟล์ภาพ top-down
+            render (bool): วาดภาพผลลัพธ์ตาม artifacts policy แล้วคืนเป็น arrays
+
+        Returns:
+            dict: ผลลัพธ์เหมือน compare_arrays
+        """
+        self.begin_stats()
+        color = render and self.artifacts != 'none'
+        img1, gray1 = self.decode_and_preprocess_buffer(eye_level_data, color)
+        img2, gray2 = self.decode_and_preprocess_buffer(top_down_data, color)
+        return self._compare_in_memory(img1, gray1, img2, gray2, render)
+
+    def _compare_in_memory(self, img1: Optional[np.ndarray], gray1: np.ndarray,
+                           img2: Optional[np.ndarray], gray2: np.ndarray, render: bool) -> dict:
+        results, H, kp1, kp2, matches, inlier_matches = self._match_loaded(gray1, gray2)
+
+        # mask ของ inliers เทียบกับ good matches (inlier_matches เป็นส่วนหนึ่งของ matches)
+        results['eye_level_points'] = kp1.pt[matches.query_idx]
+        results['top_down_points'] = kp2.pt[matches.train_idx]
+        pair_keys = matches.query_idx.astype(np.int64) * len(kp2) + matches.train_idx
+        inlier_keys = inlier_matches.query_idx.astype(np.int64) * len(kp2) + inlier_matches.train_idx
+        results['inlier_mask'] = np.isin(pair_keys, inlier_keys)
+
+        if render:
+            results['artifacts'] = (self.render_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H)
+                                    if img1 is not None else {})
+        return self.finish_stats(results)
+
+    def _match_loaded(self, gray1: np.ndarray, gray2: np.ndarray, eye_level_path: Optional[str] = None,
+                      top_down_path: Optional[str] = None) -> tuple:
+        """
+        หา features จับคู่ และหา Homography ของภาพ grayscale ที่โหลดและปรับแต่งแล้ว
+
+        Args:
+            gray1, gray2: ภาพ grayscale ของ eye-level และ top-down
+            eye_level_path, top_down_path: path ของภาพ (ใช้กับ feature cache, None = ไม่มีไฟล์)
+
+        Returns:
+            tuple: ผลลัพธ์, Homography, keypoints ทั้งสองภาพ, good matches และ inlier matches
+        """
+        print(f"📏 ขนาดภาพ Eye-Level: {gray1.shape}")
+        print(f"📏 ขนาดภาพ Top-Down: {gray2.shape}")
+
+        # หา features
+        print(f"🔎 กำลังหา features ด้วย {self.feature_detector}...")
+        with self.timer.stage('detect_eye'):
+            kp1, desc1, scale1 = self.get_pyramid_features(eye_level_path, gray1)
+        with self.timer.stage('detect_top'):
+            kp2, desc2, scale2 = self.get_pyramid_features(top_down_path, gray2)
+
+        print(f"✅ พบ keypoints ในภาพ Eye-Level: {len(kp1)}")
+        print(f"✅ พบ keypoints ในภาพ Top-Down: {len(kp2)}")
+
+        # จับคู่ features และหา Homography
+        print("🔗 กำลังจับคู่ features...")
+        results, H, kp1, kp2, matches, inlier_matches = self.estimate_pair(
+            kp1, desc1, scale1, gray1, kp2, desc2, scale2, gray2)
+        print(f"✅ พบ good matches: {len(matches)}")
+
+        if results['homography_found']:
+            print(f"✅ พบ Homography! Inlier matches: {len(inlier_matches)}/{len(matches)}")
+            print(f"📊 Confidence Score: {results['confidence_score']:.2f}")
+        elif len(matches) >= self.min_match_count:
+            print("❌ ไม่สามารถหา Homography ได้")
         else:
             print(f"❌ จำนวน matches ไม่เพียงพอสำหรับการหา Homography ({len(matches)}/{self.min_match_count})")
-            if len(matches) > 0:
-                img_matches = self.visualize_matches(img1, kp1, img2, kp2, matches)
-                cv2.imwrite(os.path.join(output_dir, "insufficient_matches.jpg"), img_matches)
 
-        return results
+        return results, H, kp1, kp2, matches, inlier_matches
+
+    def compare_row(self, eye_index: int, eye_level_path: str, top_down_paths: list,
+                    top_features: dict, output_dir: Optional[str] = None,
+                    image_cache: Optional[dict] = None, index_cache: Optional[dict] = None) -> list:
+        """
+        เปรียบเทียบภาพ Eye-Level หนึ่งภาพกับภาพ Top-Down ทุกภาพ โดยใช้ features ที่คำนวณไว้แล้ว
+
+        Args:
+            eye_index (int): ลำดับของภาพ eye-level (ใช้ตั้งชื่อโฟลเดอร์ pair_<i>_<j>)
+            eye_level_path (str): path ของภาพ eye-level
+            top_down_paths (list): paths ของภาพ top-down
+            top_features (dict): path -> (keypoints, descriptors, scale) ของภาพ top-down
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ หรือ None
+            image_cache (dict): path -> (ภาพสี, ภาพ grayscale) ของภาพ top-down ที่โหลดแล้ว
+                ใช้ร่วมกันระหว่างหลายแถวได้ (optional)
+            index_cache (dict): path -> matching index ของภาพ top-down ที่สร้างแล้ว
+                ใช้ร่วมกันระหว่างหลายแถวได้ (optional)
+
+        Returns:
+            list: ผลลัพธ์ของแต่ละคู่ เรียงตาม top_down_paths
+                (เวลาของขั้นตอนภาพ eye-level ที่ใช้ร่วมกันทั้งแถวรวมอยู่ในทุกคู่)
+        """
+        if image_cache is None:
+            image_cache = {}
+        if index_cache is None:
+            index_cache = {}
+
+        row_timer = self.begin_stats()
+        img1, gray1 = self.load_and_preprocess_image(eye_level_path, self.wants_artifacts(output_dir))
+        with self.timer.stage('detect_eye'):
+            kp1, desc1, scale1 = self.get_pyramid_features(eye_level_path, gray1)
+
+        row_results = []
+        for j, top_path in enumerate(top_down_paths):
+            self.begin_stats()
+            kp2, desc2, scale2 = top_features[top_path]
+            if top_path not in index_cache:
+                with self.timer.stage('index_build'):
+                    index_cache[top_path] = self.build_match_index(desc2)
+
+            # โหลดภาพ top-down เฉพาะเมื่อต้อง refine (pyramid) หรือบันทึกผลลัพธ์
+            img2, gray2 = None, None
+            if self.pyramid_max_dim or self.wants_artifacts(output_dir):
+                if top_path not in image_cache:
+                    image_cache[top_path] = self.load_and_preprocess_image(top_path,
+                                                                           self.wants_artifacts(output_dir))
+                img2, gray2 = image_cache[top_path]
+
+            results, H, kp1_full, kp2_full, matches, inlier_matches = self.estimate_pair(
+                kp1, desc1, scale1, gray1, kp2, desc2, scale2, gray2, index_cache[top_path])
+            results['eye_level_path'] = eye_level_path
+            results['top_down_path'] = top_path
+            row_results.append(results)
+
+            if self.wants_artifacts(output_dir):
+                pair_dir = os.path.join(output_dir, f"pair_{eye_index+1}_{j+1}")
+                self.save_artifacts(img1, kp1_full, img2, kp2_full,
+                                    matches, inlier_matches, H, pair_dir)
+
+            self.timer.merge(row_timer)
+            self.finish_stats(results)
+
+        return row_results
+
+    def extract_image_features(self, image_path: str) -> Tuple[KeypointArray, np.ndarray, float]:
+        """
+        โหลดภาพและหา features (ระดับหยาบถ้าใช้โหมด pyramid)
+
+        ในโหมด pyramid จะ decode เฉพาะภาพย่อ (ดู load_pyramid_image) เพราะไม่ต้องใช้ภาพความละเอียดเต็ม
+
+        Args:
+            image_path (str): path ของภาพ
+
+        Returns:
+            Tuple[KeypointArray, np.ndarray, float]: keypoints, descriptors และอัตราส่วนที่ย่อ
+        """
+        if not self.pyramid_max_dim:
+            _, gray = self.load_and_preprocess_image(image_path, color=False)
+            with self.timer.stage('detect_top'):
+                return self.get_pyramid_features(image_path, gray)
+
+        small, scale, factor = self.load_pyramid_image(image_path)
+        variant = {}
+        if scale < 1.0:
+            variant['pyramid_max_dim'] = self.pyramid_max_dim
+        if factor > 1:
+            variant['reduced_decode'] = factor
+        with self.timer.stage('detect_top'):
+            keypoints, descriptors = self.get_features(image_path, small, variant or None)
+        self.timer.record_array('descriptors', descriptors)
+        return keypoints, descriptors, scale
+
+    def compare_many(self, eye_level_paths: list, top_down_paths: list,
+                     output_dir: Optional[str] = None) -> list:
+        """
+        เปรียบเทียบภาพ Eye-Level ทุกภาพกับภาพ Top-Down ทุกภาพ (N×M คู่)
+
+        features ของแต่ละภาพถูกคำนวณเพียงครั้งเดียว จากนั้นแต่ละคู่จะทำเฉพาะ
+        การจับคู่ features และ RANSAC
+
+        Args:
+            eye_level_paths (list): paths ของภาพ eye-level
+            top_down_paths (list): paths ของภาพ top-down
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ของแต่ละคู่
+                (pair_<i>_<j>) หรือ None ถ้าไม่ต้องการบันทึกภาพ
+
+        Returns:
+            list: ผลลัพธ์ของแต่ละคู่ เรียงตาม eye-level แล้วตาม top-down
+                (แต่ละ dict มี 'eye_level_path' และ 'top_down_path' เพิ่มเติม)
+        """
+        # หา features ของภาพ top-down แต่ละภาพเพียงครั้งเดียว
+        top_features = {}
+        for path in top_down_paths:
+            if path not in top_features:
+                top_features[path] = self.extract_image_features(path)
+
+        print(f"✅ คำนวณ features ของภาพ Top-Down {len(top_features)} ภาพด้วย {self.feature_detector}")
+
+        all_results = []
+        image_cache = {}
+        index_cache = {}
+        for i, eye_path in enumerate(eye_level_paths):
+            all_results.extend(self.compare_row(i, eye_path, top_down_paths, top_features,
+                                                output_dir, image_cache, index_cache))
+
+        return all_results
+
+    def compare_with_reference(self, eye_level_path: str, reference,
+                               output_dir: Optional[str] = None) -> dict:
+        """
+        เปรียบเทียบภาพ Eye-Level กับแผนที่อ้างอิงที่สร้าง index ไว้แล้ว (ReferenceMap)
+
+        ไม่ต้องหา features หรือสร้าง FLANN index ของแผนที่ใหม่ ทำเฉพาะการค้นหาและ RANSAC
+
+        Args:
+            eye_level_path (str): path ของภาพ eye-level
+            reference (ReferenceMap): แผนที่อ้างอิง
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ หรือ None
+
+        Returns:
+            dict: ผลลัพธ์การเปรียบเทียบ
+        """
+        self.begin_stats()
+        color = self.wants_artifacts(output_dir)
+        img1, gray1 = self.load_and_preprocess_image(eye_level_path, color)
+        with self.timer.stage('detect_eye'):
+            kp1, desc1, scale1 = self.get_pyramid_features(eye_level_path, gray1)
+
+        # ภาพแผนที่ต้องใช้เฉพาะตอน refine (pyramid) หรือบันทึกผลลัพธ์
+        img2, gray2 = None, None
+        if self.pyramid_max_dim or color:
+            img2, gray2 = reference.load_image(self, color)
+
+        results, H, kp1, kp2, matches, inlier_matches = self.estimate_pair(
+            kp1, desc1, scale1, gray1, reference.keypoints, reference.descriptors,
+            reference.scale, gray2, reference.index)
+
+        self.save_artifacts(img1, kp1, img2, kp2, matches, inlier_matches, H, output_dir)
+
+        return self.finish_stats(results)
+
+    def compare_with_tiled_reference(self, eye_level_path: str, tiled_reference,
+                                     output_dir: Optional[str] = None, max_tiles: int = 3) -> dict:
+        """
+        เปรียบเทียบภาพ Eye-Level กับแผนที่อ้างอิงแบบ tiles (TiledReferenceMap)
+
+        เลือก tiles ที่น่าจะตรงด้วยการนับ votes ก่อน แล้วจับคู่และทำ RANSAC เฉพาะใน tiles เหล่านั้น
+        เลือก tile ที่มี inliers มากที่สุด
+
+        Args:
+            eye_level_path (str): path ของภาพ eye-level
+            tiled_reference (TiledReferenceMap): แผนที่อ้างอิงแบบ tiles
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ (เทียบกับภาพของ tile ที่เลือก) หรือ None
+            max_tiles (int): จำนวน tiles สูงสุดที่จับคู่แบบเต็ม
+
+        Returns:
+            dict: ผลลัพธ์การเปรียบเทียบ พร้อม 'homography' (พิกัดของแผนที่เต็ม หรือ None),
+                'tile' (ชื่อ tile ที่เลือก) และ 'candidate_tiles'
+        """
+        self.begin_stats()
+        img1, gray1 = self.load_and_preprocess_image(eye_level_path, self.wants_artifacts(output_dir))
+        with self.timer.stage('detect_eye'):
+            kp1, desc1, scale1 = self.get_pyramid_features(eye_level_path, gray1)
+
+        with self.timer.stage('tile_selection'):
+            candidates = tiled_reference.candidate_tiles(self, desc1, max_tiles=max_tiles)
+
+        best = None
+        for tile_id, _ in candidates:
+            tile = tiled_reference.tile(tile_id, self)
+            gray2 = tile.load_image(self, color=False)[1] if self.pyramid_max_dim else None
+
+            pair = self.estimate_pair(kp1, desc1, scale1, gray1, tile.keypoints, tile.descriptors,
+                                      tile.scale, gray2, tile.index)
+            if best is None or pair[0].get('inlier_matches', 0) > best[1][0].get('inlier_matches', 0):
+                best = (tile_id, pair)
+
+        if best is None:
+            results = {
+                'eye_level_keypoints': len(kp1),
+                'top_down_keypoints': 0,
+                'total_matches': 0,
+                'homography_found': False,
+                'confidence_score': 0.0,
+            }
+            H_map, tile_name = None, None
+        else:
+            tile_id, (results, H, kp1_full, kp2_full, matches, inlier_matches) = best
+            tile_name = tiled_reference.tiles[tile_id]['name']
+            # แปลง Homography จากพิกัดของ tile เป็นพิกัดของแผนที่เต็ม
+            H_map = tiled_reference.tile_to_map(tile_id) @ H if H is not None else None
+
+            if self.wants_artifacts(output_dir):
+                img2 = tiled_reference.tile(tile_id, self).load_image(self)[0]
+                self.save_artifacts(img1, kp1_full, img2, kp2_full, matches, inlier_matches, H, output_dir)
+
+        results['homography'] = H_map
+        results['tile'] = tile_name
+        results['candidate_tiles'] = [(tiled_reference.tiles[t]['name'], votes) for t, votes in candidates]
+        return self.finish_stats(results)
+
+    def compare_with_gallery(self, eye_level_path: str, retrieval, top_k: int = 5,
+                             output_dir: Optional[str] = None) -> list:
+        """
+        ค้นหาภาพ top-down ที่น่าจะตรงจากคลังภาพ (ImageRetrieval) แล้วยืนยันเฉพาะ top-K ภาพ
+
+        Args:
+            eye_level_path (str): path ของภาพ eye-level
+            retrieval (ImageRetrieval): ดัชนีของคลังภาพ top-down
+            top_k (int): จำนวนภาพที่นำมายืนยันด้วยการจับคู่และ RANSAC
+            output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ (rank_<k>) หรือ None
+
+        Returns:
+            list: ผลลัพธ์ของแต่ละภาพที่ยืนยัน พร้อม 'retrieval_score'
+                เรียงจาก inlier matches มากไปน้อย
+        """
+        query_timer = self.begin_stats()
+        img1, gray1 = self.load_and_preprocess_image(eye_level_path, self.wants_artifacts(output_dir))
+        with self.timer.stage('detect_eye'):
+            kp1, desc1, scale1 = self.get_pyramid_features(eye_level_path, gray1)
+        with self.timer.stage('retrieval'):
+            candidates = retrieval.search(desc1, top_k)
+
+        all_results = []
+        for rank, (top_path, score) in enumerate(candidates):
+            self.begin_stats()
+            # ภาพ top-down ต้องใช้เฉพาะตอน refine (pyramid) หรือบันทึกผลลัพธ์
+            img2, gray2 = None, None
+            if self.pyramid_max_dim or self.wants_artifacts(output_dir):
+                img2, gray2 = self.load_and_preprocess_image(top_path, self.wants_artifacts(output_dir))
+                with self.timer.stage('detect_top'):
+                    kp2, desc2, scale2 = self.get_pyramid_features(top_path, gray2)
+            else:
+                kp2, desc2, scale2 = self.extract_image_features(top_path)
+
+            results, H, kp1_full, kp2_full, matches, inlier_matches = self.estimate_pair(
+                kp1, desc1, scale1, gray1, kp2, desc2, scale2, gray2)
+            results['eye_level_path'] = eye_level_path
+            results['top_down_path'] = top_path
+            results['retrieval_score'] = score
+            all_results.append(results)
+
+            if self.wants_artifacts(output_dir):
+                self.save_artifacts(img1, kp1_full, img2, kp2_full, matches, inlier_matches, H,
+                                    os.path.join(output_dir, f"rank_{rank}"))
+
+            self.timer.merge(query_timer)
+            self.finish_stats(results)
+
+        all_results.sort(key=lambda r: r.get('inlier_matches', 0), reverse=True)
+        return all_results
 
 
 def main():
@@ -304,13 +1957,70 @@ def main():
     parser.add_argument('--min_matches', type=int, default=10,
                        help='Minimum number of matches required')
     parser.add_argument('--output', default='output', help='Output directory')
+    parser.add_argument('--cache_dir', default=None, help='Directory for the on-disk feature cache')
+    parser.add_argument('--pyramid_max_dim', type=int, default=None,
+                       help='Detect on a downscaled level with this longest side, then refine at full resolution')
+    parser.add_argument('--artifacts', default='full', choices=['none', 'minimal', 'full'],
+                       help='Which result images to write')
+    parser.add_argument('--decode_mode', default='grayscale', choices=list(DECODE_MODES),
+                       help='Decode grayscale directly (color only for result images) or decode color and convert '
+                            '(color reproduces results of earlier versions exactly)')
+    parser.add_argument('--max_keypoints', type=int, default=None,
+                       help='Keep at most this many spatially distributed keypoints per image')
+    parser.add_argument('--keypoint_selection', default='grid', choices=list(SELECTION_METHODS),
+                       help='How to choose keypoints when over --max_keypoints')
+    parser.add_argument('--estimator', default='RANSAC', choices=list(ESTIMATORS),
+                       help='Robust estimator for cv2.findHomography')
+    parser.add_argument('--ransac_threshold', type=float, default=5.0,
+                       help='Maximum reprojection error of an inlier (pixels)')
+    parser.add_argument('--ransac_confidence', type=float, default=RANSAC_CONFIDENCE,
+                       help='Confidence at which the estimator stops sampling')
+    parser.add_argument('--ransac_max_iters', type=int, default=RANSAC_MAX_ITERS,
+                       help='Maximum number of estimator iterations')
+    parser.add_argument('--guided_matching', action='store_true',
+                       help='Re-match inside a window around the first homography and re-estimate')
+    parser.add_argument('--guided_radius', type=float, default=10.0,
+                       help='Search radius of guided matching in top-down pixels')
+    parser.add_argument('--first_pass_keypoints', type=int, default=None,
+                       help='Eye-level keypoints used by the global first pass when guided matching is on')
+    parser.add_argument('--binary_matching', default='bruteforce', choices=list(BINARY_MATCHING_METHODS),
+                       help='Matching of ORB/AKAZE descriptors: exact brute force or approximate FLANN LSH')
+    parser.add_argument('--match_chunk_size', type=int, default=None,
+                       help='Match query descriptors in blocks of this size to bound memory')
+    parser.add_argument('--match_threads', type=int, default=1,
+                       help='Threads that match descriptor blocks concurrently')
+    parser.add_argument('--memory_cache_mb', type=float, default=0,
+                       help='Byte budget (MB) of the in-memory cache of images, features and results')
+    parser.add_argument('--warp_interpolation', default='linear', choices=list(INTERPOLATIONS),
+                       help='Interpolation of the warped eye-level image')
+    parser.add_argument('--remap_cache_mb', type=float, default=0,
+                       help='Byte budget (MB) of cached remap tables for repeated homographies')
 
     args = parser.parse_args()
 
     # สร้าง matcher
     matcher = HomographyMatcher(
         feature_detector=args.detector,
-        min_match_count=args.min_matches
+        min_match_count=args.min_matches,
+        cache_dir=args.cache_dir,
+        pyramid_max_dim=args.pyramid_max_dim,
+        artifacts=args.artifacts,
+        decode_mode=args.decode_mode,
+        max_keypoints=args.max_keypoints,
+        keypoint_selection=args.keypoint_selection,
+        estimator=args.estimator,
+        ransac_threshold=args.ransac_threshold,
+        ransac_confidence=args.ransac_confidence,
+        ransac_max_iters=args.ransac_max_iters,
+        guided_matching=args.guided_matching,
+        guided_radius=args.guided_radius,
+        first_pass_keypoints=args.first_pass_keypoints,
+        binary_matching=args.binary_matching,
+        match_chunk_size=args.match_chunk_size,
+        match_threads=args.match_threads,
+        memory_cache_bytes=int(args.memory_cache_mb * 1024 * 1024),
+        warp_interpolation=args.warp_interpolation,
+        remap_cache_bytes=int(args.remap_cache_mb * 1024 * 1024)
     )
 
     try:
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การรวบรวมไฟล์ภาพจาก path ที่ผู้ใช้ระบุ (ใช้ร่วมกันระหว่าง cli.py และ mosaic.py)
+ไม่ import OpenCV เพื่อให้ใช้ในโหมด client ของ cli.py ได้
+"""
+
+import glob
+import os
+
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png')
+
+
+def collect_images(path: str) -> list:
+    """
+    รวบรวมไฟล์ภาพจาก path (ไฟล์เดียวหรือโฟลเดอร์)
+
+    Args:
+        path (str): path ของไฟล์ภาพหรือโฟลเดอร์
+
+    Returns:
+        list: รายการไฟล์ภาพเรียงตามชื่อ
+    """
+    if os.path.isdir(path):
+        images = []
+        for pattern in IMAGE_EXTENSIONS:
+            images.extend(glob.glob(os.path.join(path, pattern)))
+        return sorted(images)
+    return [path]
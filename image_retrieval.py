@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การค้นหาภาพ top-down ที่น่าจะตรงกับภาพ eye-level ด้วย Bag-of-Visual-Words
+(visual vocabulary จาก k-means, inverted file และ TF-IDF scoring)
+ใช้คัดภาพ top-K จากคลังภาพขนาดใหญ่ก่อนยืนยันด้วย HomographyMatcher
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def descriptors_to_float(descriptors: np.ndarray) -> np.ndarray:
+    """
+    แปลง descriptors เป็น float32 สำหรับ k-means
+
+    descriptors แบบ binary (ORB/AKAZE, uint8) ถูกแยกเป็นบิต ทำให้ระยะ L2 ยกกำลังสอง
+    เท่ากับระยะ Hamming เดิม
+
+    Args:
+        descriptors (np.ndarray): descriptors ของภาพ
+
+    Returns:
+        np.ndarray: descriptors แบบ float32
+    """
+    if descriptors.dtype == np.uint8:
+        return np.unpackbits(descriptors, axis=1).astype(np.float32)
+    return np.ascontiguousarray(descriptors, dtype=np.float32)
+
+
+class VisualVocabulary:
+    """
+    Visual vocabulary (ศูนย์กลางของกลุ่ม descriptors จาก k-means)
+    """
+
+    def __init__(self, centers: np.ndarray):
+        """
+        Initialize the VisualVocabulary
+
+        Args:
+            centers (np.ndarray): ศูนย์กลางของแต่ละ visual word (num_words, dim) float32
+        """
+        self.centers = np.ascontiguousarray(centers, dtype=np.float32)
+
+    @classmethod
+    def train(cls, descriptors: np.ndarray, num_words: int = 1000, max_samples: int = 100000,
+              attempts: int = 1, seed: int = 0) -> 'VisualVocabulary':
+        """
+        สร้าง vocabulary ด้วย cv2.kmeans
+
+        Args:
+            descriptors (np.ndarray): descriptors ของคลังภาพ (float32 หรือ binary uint8)
+            num_words (int): จำนวน visual words
+            max_samples (int): จำนวน descriptors สูงสุดที่ใช้ train (สุ่มเลือก)
+            attempts (int): จำนวนครั้งที่รัน k-means
+            seed (int): seed ของการสุ่ม
+
+        Returns:
+            VisualVocabulary: vocabulary ที่ train แล้ว
+        """
+        data = descriptors_to_float(descriptors)
+        if len(data) > max_samples:
+            rng = np.random.default_rng(seed)
+            data = data[rng.choice(len(data), max_samples, replace=False)]
+
+        num_words = min(num_words, len(data))
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1e-3)
+        cv2.setRNGSeed(seed)
+        _, _, centers = cv2.kmeans(data, num_words, None, criteria, attempts, cv2.KMEANS_PP_CENTERS)
+        return cls(centers)
+
+    @property
+    def num_words(self) -> int:
+        return len(self.centers)
+
+    def quantize(self, descriptors: Optional[np.ndarray]) -> np.ndarray:
+        """
+        หา visual word ที่ใกล้ที่สุดของแต่ละ descriptor
+
+        Args:
+            descriptors (np.ndarray): descriptors ของภาพ
+
+        Returns:
+            np.ndarray: หมายเลข word (int32) ของแต่ละ descriptor
+        """
+        if descriptors is None or len(descriptors) == 0:
+            return np.empty(0, dtype=np.int32)
+        _, words = cv2.batchDistance(descriptors_to_float(descriptors), self.centers,
+                                     cv2.CV_32F, normType=cv2.NORM_L2, K=1)
+        return words.ravel().astype(np.int32)
+
+
+class ImageRetrieval:
+    """
+    ดัชนีของคลังภาพ top-down (inverted file + TF-IDF)
+
+    inverted file เก็บแบบ CSR: postings ของ word w อยู่ที่
+    posting_images[word_offsets[w]:word_offsets[w + 1]] พร้อมน้ำหนัก TF-IDF ที่ normalize แล้ว
+    """
+
+    INDEX_FILE = "retrieval.npz"
+    META_FILE = "retrieval_meta.json"
+
+    def __init__(self, image_paths: list, vocabulary: VisualVocabulary, idf: np.ndarray,
+                 word_offsets: np.ndarray, posting_images: np.ndarray, posting_weights: np.ndarray,
+                 feature_config: dict):
+        """
+        Initialize the ImageRetrieval (ปกติสร้างผ่าน build หรือ load)
+
+        Args:
+            image_paths (list): paths ของภาพในคลัง
+            vocabulary (VisualVocabulary): visual vocabulary
+            idf (np.ndarray): ค่า IDF ของแต่ละ word
+            word_offsets (np.ndarray): ตำแหน่งเริ่มต้นของ postings ของแต่ละ word
+            posting_images (np.ndarray): หมายเลขภาพของแต่ละ posting
+            posting_weights (np.ndarray): น้ำหนัก TF-IDF ของแต่ละ posting
+            feature_config (dict): การตั้งค่า features ที่ใช้สร้างดัชนี
+        """
+        self.image_paths = list(image_paths)
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.word_offsets = word_offsets
+        self.posting_images = posting_images
+        self.posting_weights = posting_weights
+        self.feature_config = feature_config
+
+    @classmethod
+    def build(cls, matcher, image_paths: list, num_words: int = 1000,
+              max_samples: int = 100000) -> 'ImageRetrieval':
+        """
+        หา features ของทุกภาพในคลัง train vocabulary และสร้าง inverted file
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้หา features (ใช้ feature cache ถ้ามี)
+            image_paths (list): paths ของภาพ top-down ในคลัง
+            num_words (int): จำนวน visual words
+            max_samples (int): จำนวน descriptors สูงสุดที่ใช้ train vocabulary
+
+        Returns:
+            ImageRetrieval: ดัชนีของคลังภาพ
+        """
+        all_descriptors = []
+        for path in image_paths:
+            _, descriptors, _ = matcher.extract_image_features(path)
+            if descriptors is None:
+                descriptors = np.empty((0, matcher.detector.descriptorSize()),
+                                       dtype=np.float32 if matcher.feature_detector == 'SIFT' else np.uint8)
+            all_descriptors.append(descriptors)
+
+        vocabulary = VisualVocabulary.train(np.concatenate(all_descriptors), num_words, max_samples)
+        word_lists = [vocabulary.quantize(d) for d in all_descriptors]
+
+        # IDF: log(จำนวนภาพ / จำนวนภาพที่มี word นั้น)
+        num_images = len(image_paths)
+        document_freq = np.zeros(vocabulary.num_words, dtype=np.int64)
+        for words in word_lists:
+            document_freq[np.unique(words)] += 1
+        idf = np.log(num_images / np.maximum(document_freq, 1)).astype(np.float32)
+
+        # postings ของแต่ละภาพ (word, น้ำหนัก TF-IDF ที่ normalize แล้ว)
+        posting_words, posting_images, posting_weights = [], [], []
+        for image_id, words in enumerate(word_lists):
+            unique_words, counts = np.unique(words, return_counts=True)
+            weights = (counts / max(len(words), 1)).astype(np.float32) * idf[unique_words]
+            norm = np.linalg.norm(weights)
+            if norm > 0:
+                weights /= norm
+            posting_words.append(unique_words)
+            posting_images.append(np.full(len(unique_words), image_id, dtype=np.int32))
+            posting_weights.append(weights)
+
+        posting_words = np.concatenate(posting_words)
+        order = np.argsort(posting_words, kind='stable')
+        word_offsets = np.zeros(vocabulary.num_words + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_words, minlength=vocabulary.num_words), out=word_offsets[1:])
+
+        return cls(image_paths, vocabulary, idf, word_offsets,
+                   np.concatenate(posting_images)[order], np.concatenate(posting_weights)[order],
+                   matcher.feature_config())
+
+    def query_vector(self, descriptors: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        TF-IDF ของภาพ query
+
+        Args:
+            descriptors (np.ndarray): descriptors ของภาพ query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: หมายเลข words และน้ำหนัก (normalize แล้ว)
+        """
+        words = self.vocabulary.quantize(descriptors)
+        unique_words, counts = np.unique(words, return_counts=True)
+        weights = (counts / max(len(words), 1)).astype(np.float32) * self.idf[unique_words]
+        norm = np.linalg.norm(weights)
+        if norm > 0:
+            weights /= norm
+        return unique_words, weights
+
+    def search(self, descriptors: Optional[np.ndarray], top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        ค้นหาภาพในคลังที่คล้ายกับภาพ query มากที่สุด (cosine similarity ของ TF-IDF)
+
+        Args:
+            descriptors (np.ndarray): descriptors ของภาพ query
+            top_k (int): จำนวนภาพที่ต้องการ
+
+        Returns:
+            List[Tuple[str, float]]: (path, คะแนน) เรียงจากคะแนนมากไปน้อย
+        """
+        words, weights = self.query_vector(descriptors)
+        scores = np.zeros(len(self.image_paths), dtype=np.float32)
+        if len(words) == 0:
+            return []
+
+        # รวม postings ของทุก word ใน query (เฉพาะภาพที่มี word ร่วมกัน)
+        starts = self.word_offsets[words]
+        lengths = self.word_offsets[words + 1] - starts
+        positions = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths) \
+            + np.arange(lengths.sum())
+        np.add.at(scores, self.posting_images[positions],
+                  self.posting_weights[positions] * np.repeat(weights, lengths))
+
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        return [(self.image_paths[i], float(scores[i])) for i in order if scores[i] > 0]
+
+    def save(self, directory: str):
+        """
+        บันทึก vocabulary และ inverted file ลงโฟลเดอร์
+
+        Args:
+            directory (str): โฟลเดอร์ปลายทาง
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.savez(os.path.join(directory, self.INDEX_FILE),
+                 centers=self.vocabulary.centers, idf=self.idf, word_offsets=self.word_offsets,
+                 posting_images=self.posting_images, posting_weights=self.posting_weights)
+
+        meta = {
+            'image_paths': [os.path.abspath(p) for p in self.image_paths],
+            'feature_config': self.feature_config,
+        }
+        with open(os.path.join(directory, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, matcher) -> 'ImageRetrieval':
+        """
+        โหลดดัชนีที่บันทึกไว้ด้วย save
+
+        Args:
+            directory (str): โฟลเดอร์ที่บันทึกไว้
+            matcher (HomographyMatcher): matcher ที่จะใช้ค้นหา
+
+        Returns:
+            ImageRetrieval: ดัชนีของคลังภาพ
+
+        Raises:
+            FileNotFoundError: เมื่อไม่พบไฟล์ในโฟลเดอร์
+            ValueError: เมื่อการตั้งค่าของ matcher ไม่ตรงกับตอนสร้าง
+        """
+        meta_path = os.path.join(directory, cls.META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"ไม่พบดัชนีของคลังภาพ: {directory}")
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta['feature_config'] != json.loads(json.dumps(matcher.feature_config())):
+            raise ValueError(f"การตั้งค่า matcher ไม่ตรงกับดัชนีของคลังภาพ: {directory}")
+
+        with np.load(os.path.join(directory, cls.INDEX_FILE)) as data:
+            return cls(meta['image_paths'], VisualVocabulary(data['centers']), data['idf'],
+                       data['word_offsets'], data['posting_images'], data['posting_weights'],
+                       meta['feature_config'])
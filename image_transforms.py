@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การ transform ภาพสำหรับสร้างภาพทดสอบ (หมุน, ย่อ/ขยาย, perspective, ความสว่าง และ noise)
+ใช้ร่วมกันระหว่าง advanced_test.py และ benchmark_suite.py
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def rotation_homography(center: Tuple[float, float], angle: float, scale: float = 1.0) -> np.ndarray:
+    """
+    Homography ของการหมุนและย่อ/ขยายรอบจุด center (แบบ cv2.getRotationMatrix2D)
+
+    Args:
+        center (Tuple[float, float]): จุดหมุน (x, y)
+        angle (float): มุมหมุน (องศา ค่าบวกคือทวนเข็มนาฬิกาในภาพที่แสดง)
+        scale (float): อัตราส่วนการย่อ/ขยาย
+
+    Returns:
+        np.ndarray: matrix 3x3
+    """
+    return np.vstack([cv2.getRotationMatrix2D(center, angle, scale), [0.0, 0.0, 1.0]])
+
+
+def corners_homography(size: Tuple[int, int], dst_corners: np.ndarray) -> np.ndarray:
+    """
+    Homography ที่ย้ายมุมทั้งสี่ของภาพไปยังตำแหน่งที่กำหนด (perspective)
+
+    Args:
+        size (Tuple[int, int]): (width, height) ของภาพต้นทาง
+        dst_corners (np.ndarray): ตำแหน่งใหม่ของมุม (บนซ้าย, บนขวา, ล่างขวา, ล่างซ้าย) ขนาด 4x2
+
+    Returns:
+        np.ndarray: matrix 3x3
+    """
+    w, h = size
+    src_corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    return cv2.getPerspectiveTransform(src_corners, np.asarray(dst_corners, dtype=np.float32))
+
+
+def warp_image(img: np.ndarray, H: np.ndarray, size: Tuple[int, int],
+               border_mode: int = cv2.BORDER_CONSTANT) -> np.ndarray:
+    """
+    warp ภาพด้วย Homography (bilinear)
+
+    Args:
+        img (np.ndarray): ภาพต้นทาง
+        H (np.ndarray): Homography จากภาพต้นทางไปยังภาพปลายทาง
+        size (Tuple[int, int]): (width, height) ของภาพปลายทาง
+        border_mode (int): วิธีเติมบริเวณนอกภาพต้นทาง (cv2.BORDER_*)
+
+    Returns:
+        np.ndarray: ภาพที่ warp แล้ว
+    """
+    return cv2.warpPerspective(img, H, size, flags=cv2.INTER_LINEAR, borderMode=border_mode)
+
+
+def adjust_photometric(img: np.ndarray, alpha: float = 1.0, beta: float = 0.0,
+                       noise_sigma: float = 0.0, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    ปรับ contrast/ความสว่าง และเพิ่ม Gaussian noise (img * alpha + beta + noise ตัดให้อยู่ใน 0-255)
+
+    Args:
+        img (np.ndarray): ภาพ uint8
+        alpha (float): อัตราส่วน contrast
+        beta (float): ค่าความสว่างที่บวกเพิ่ม
+        noise_sigma (float): ส่วนเบี่ยงเบนมาตรฐานของ noise (0 = ไม่เพิ่ม noise)
+        rng (np.random.Generator): ตัวสุ่มของ noise (default: สุ่มใหม่ทุกครั้ง)
+
+    Returns:
+        np.ndarray: ภาพ uint8 ใหม่
+    """
+    adjusted = img * alpha + beta
+    if noise_sigma > 0:
+        rng = rng if rng is not None else np.random.default_rng()
+        adjusted = adjusted + rng.normal(0, noise_sigma, img.shape)
+    return np.clip(adjusted, 0, 255).astype(np.uint8)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การวัดเวลาแต่ละขั้นตอนและตัวนับสำหรับ HomographyMatcher
+(load, preprocess, detect, match, ratio filter, RANSAC, warp, render, write)
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+
+# ค่า default ของ cv2.findHomography (confidence และจำนวนรอบสูงสุดของ RANSAC)
+RANSAC_CONFIDENCE = 0.995
+RANSAC_MAX_ITERS = 2000
+
+
+def estimated_ransac_iterations(inlier_ratio: float, confidence: float = RANSAC_CONFIDENCE,
+                                sample_size: int = 4, max_iters: int = RANSAC_MAX_ITERS) -> int:
+    """
+    จำนวนรอบของ RANSAC ที่ต้องใช้ตามสัดส่วน inliers
+    N = log(1 - confidence) / log(1 - w^sample_size)
+
+    Args:
+        inlier_ratio (float): สัดส่วน inliers (w)
+        confidence (float): ความน่าจะเป็นที่ต้องการให้สุ่มได้ชุดที่มีแต่ inliers
+        sample_size (int): จำนวนจุดต่อการสุ่มหนึ่งครั้ง (Homography = 4)
+        max_iters (int): จำนวนรอบสูงสุด
+
+    Returns:
+        int: จำนวนรอบโดยประมาณ
+    """
+    p_good = inlier_ratio ** sample_size
+    if p_good <= 0.0:
+        return max_iters
+    if p_good >= 1.0:
+        return 1
+    return int(min(max_iters, math.ceil(math.log(1.0 - confidence) / math.log(1.0 - p_good))))
+
+
+class StageTimer:
+    """
+    เก็บเวลาของแต่ละขั้นตอน ตัวนับ และขนาดสูงสุดของ arrays สำหรับการเปรียบเทียบหนึ่งครั้ง
+
+    ขั้นตอนที่ซ้อนกันนับเวลาแบบไม่ซ้ำซ้อน (เวลาของขั้นตอนด้านในไม่ถูกนับรวมในขั้นตอนด้านนอก)
+    ใช้ได้จากหลาย threads (เช่น ตอนเขียนภาพผลลัพธ์ใน background)
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        self.peak_array_bytes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        วัดเวลาของขั้นตอน (สะสมถ้าเรียกหลายครั้ง)
+
+        Args:
+            name (str): ชื่อขั้นตอน
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        now = time.perf_counter()
+        if stack:
+            # หยุดนับเวลาของขั้นตอนด้านนอกชั่วคราว
+            parent = stack[-1]
+            self.add_time(parent[0], now - parent[1])
+        frame = [name, now]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            stack.pop()
+            self.add_time(name, now - frame[1])
+            if stack:
+                stack[-1][1] = now
+
+    def add_time(self, name: str, seconds: float):
+        """เพิ่มเวลา (วินาที) ให้ขั้นตอน"""
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        """เพิ่มค่าตัวนับ"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_array(self, name: str, array: Optional[np.ndarray]):
+        """บันทึกขนาดของ array (เก็บค่าสูงสุดของแต่ละชื่อ)"""
+        if array is None:
+            return
+        with self._lock:
+            self.peak_array_bytes[name] = max(self.peak_array_bytes.get(name, 0), int(array.nbytes))
+
+    def merge(self, other: 'StageTimer'):
+        """รวมค่าจาก timer อื่น (เช่น ขั้นตอนของภาพ eye-level ที่ใช้ร่วมกันทั้งแถว)"""
+        for name, seconds in other.timings.items():
+            self.add_time(name, seconds)
+        for name, value in other.counters.items():
+            self.count(name, value)
+        for name, nbytes in other.peak_array_bytes.items():
+            with self._lock:
+                self.peak_array_bytes[name] = max(self.peak_array_bytes.get(name, 0), nbytes)
+
+    def attach(self, results: dict, hook: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        ใส่ค่าที่วัดได้ลงในผลลัพธ์ และส่งให้ hook (ถ้ามี)
+
+        ผลลัพธ์อ้างถึง dicts ของ timer นี้โดยตรง งานที่ยังทำอยู่ใน background
+        (render, write) จะเพิ่มค่าเข้ามาภายหลัง
+
+        Args:
+            results (dict): ผลลัพธ์การเปรียบเทียบ
+            hook (Callable): ฟังก์ชันที่รับผลลัพธ์ (optional)
+
+        Returns:
+            dict: ผลลัพธ์เดิม พร้อม 'timings', 'counters' และ 'peak_array_bytes'
+        """
+        results['timings'] = self.timings
+        results['counters'] = self.counters
+        results['peak_array_bytes'] = self.peak_array_bytes
+        if hook is not None:
+            hook(results)
+        return results
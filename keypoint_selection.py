@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การเลือก keypoints ให้ไม่เกินจำนวนที่กำหนด (keypoint budget) โดยกระจายทั่วภาพ
+- grid: แบ่งภาพเป็นช่อง แล้วเลือก keypoints ที่แรงที่สุดในแต่ละช่อง
+- anms: Adaptive Non-Maximal Suppression (Brown et al., 2005)
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+from keypoints import KeypointArray
+
+
+# วิธีเลือก keypoints ที่รองรับ
+SELECTION_METHODS = ('grid', 'anms')
+
+# หน่วยความจำสูงสุดของตารางระยะทางแต่ละช่วงใน select_anms (bytes)
+ANMS_BLOCK_BYTES = 32 * 1024 * 1024
+
+
+def select_grid(keypoints: KeypointArray, image_shape: Tuple[int, int], budget: int,
+                per_cell: int = 8) -> np.ndarray:
+    """
+    เลือก keypoints ด้วยการแบ่งภาพเป็นช่อง (grid bucketing) ตามความแรง (response)
+
+    แต่ละช่องได้โควตาเท่ากัน ถ้าบางช่องมี keypoints ไม่ครบโควตา จะเติมด้วย keypoints
+    ที่แรงที่สุดที่เหลือจากทั้งภาพ
+
+    Args:
+        keypoints (KeypointArray): keypoints ทั้งหมด
+        image_shape (Tuple[int, int]): (height, width) ของภาพ
+        budget (int): จำนวน keypoints สูงสุด
+        per_cell (int): จำนวน keypoints เฉลี่ยต่อช่อง (ใช้กำหนดจำนวนช่อง)
+
+    Returns:
+        np.ndarray: indices ของ keypoints ที่เลือก เรียงจากแรงไปอ่อน
+    """
+    n = len(keypoints)
+    order = np.argsort(-keypoints.response, kind='stable')
+    if n <= budget:
+        return order
+
+    # จำนวนช่องให้ได้ช่องเกือบเป็นสี่เหลี่ยมจัตุรัส
+    h, w = image_shape[:2]
+    num_cells = max(1, budget // per_cell)
+    cols = max(1, int(round(math.sqrt(num_cells * w / h))))
+    rows = max(1, int(round(num_cells / cols)))
+    quota = int(math.ceil(budget / (rows * cols)))
+
+    cx = np.clip((keypoints.pt[:, 0] * cols / w).astype(np.int64), 0, cols - 1)
+    cy = np.clip((keypoints.pt[:, 1] * rows / h).astype(np.int64), 0, rows - 1)
+    cell = (cy * cols + cx)[order]
+
+    # อันดับภายในช่อง (order เรียงตาม response อยู่แล้ว การเรียงแบบ stable ตามช่องจึงคงลำดับนั้นไว้)
+    by_cell = np.argsort(cell, kind='stable')
+    sorted_cells = cell[by_cell]
+    first = np.searchsorted(sorted_cells, sorted_cells, side='left')
+    rank = np.empty(n, dtype=np.int64)
+    rank[by_cell] = np.arange(n) - first
+
+    keep = rank < quota
+    if keep.sum() > budget:
+        # โควตาปัดขึ้น ตัดส่วนเกินโดยเก็บตัวที่แรงกว่า
+        keep[np.flatnonzero(keep)[budget:]] = False
+    elif keep.sum() < budget:
+        # เติมจากช่องที่มี keypoints เกินโควตา
+        extra = np.flatnonzero(~keep)[:budget - keep.sum()]
+        keep[extra] = True
+
+    return order[keep]
+
+
+def select_anms(keypoints: KeypointArray, budget: int, robustness: float = 0.9,
+                candidate_factor: int = 5, chunk_size: int = 1024) -> np.ndarray:
+    """
+    เลือก keypoints ด้วย Adaptive Non-Maximal Suppression
+
+    รัศมี suppression ของแต่ละจุดคือระยะถึงจุดที่ใกล้ที่สุดที่แรงกว่าอย่างชัดเจน
+    (response * robustness > response ของจุดนี้) แล้วเลือกจุดที่มีรัศมีมากที่สุด
+    เพื่อจำกัดเวลา O(N^2) จะพิจารณาเฉพาะ candidate_factor * budget จุดที่แรงที่สุด
+
+    Args:
+        keypoints (KeypointArray): keypoints ทั้งหมด
+        budget (int): จำนวน keypoints สูงสุด
+        robustness (float): ค่า c ของ ANMS
+        candidate_factor (int): จำนวน candidates เป็นกี่เท่าของ budget
+        chunk_size (int): จำนวนจุดสูงสุดที่คำนวณระยะพร้อมกัน (จำนวนจริงถูกลดลง
+            ให้ตารางระยะทางไม่เกิน ANMS_BLOCK_BYTES ตามจำนวนจุดที่แรงกว่า)
+
+    Returns:
+        np.ndarray: indices ของ keypoints ที่เลือก เรียงจากรัศมีมากไปน้อย
+    """
+    order = np.argsort(-keypoints.response, kind='stable')
+    if len(order) <= budget:
+        return order
+
+    candidates = order[:candidate_factor * budget]
+    pts = keypoints.pt[candidates].astype(np.float32)
+    response = keypoints.response[candidates]
+
+    # จุดที่แรงกว่าอย่างชัดเจนเป็นส่วนต้นของลำดับเสมอ (response เรียงจากมากไปน้อย)
+    num_stronger = np.searchsorted(-response * robustness, -response, side='left')
+
+    n = len(candidates)
+    radius2 = np.full(n, np.inf, dtype=np.float32)
+    start = 0
+    while start < n:
+        # num_stronger ไม่ลดลงตามลำดับ จึงใช้ค่าท้ายช่วงกำหนดขนาดช่วงได้
+        # (ระยะ dx, dy แบบ float32 และ mask ประมาณ 12 bytes ต่อคู่)
+        bound = max(1, int(num_stronger[min(start + chunk_size, n) - 1]))
+        stop = min(n, start + max(1, min(chunk_size, ANMS_BLOCK_BYTES // (12 * bound))))
+        limit = int(num_stronger[stop - 1])
+        if limit > 0:
+            dist2 = pts[start:stop, 0, None] - pts[None, :limit, 0]
+            dist2 *= dist2
+            dy = pts[start:stop, 1, None] - pts[None, :limit, 1]
+            dy *= dy
+            dist2 += dy
+            del dy
+            dist2[np.arange(limit)[None, :] >= num_stronger[start:stop, None]] = np.inf
+            radius2[start:stop] = dist2.min(axis=1)
+        start = stop
+
+    # รัศมีมากก่อน ถ้าเท่ากันเลือกตัวที่แรงกว่า (ลำดับเดิม)
+    selected = np.argsort(-radius2, kind='stable')[:budget]
+    return candidates[selected]
+
+
+def select_keypoints(keypoints: KeypointArray, image_shape: Tuple[int, int], budget: int,
+                     method: str = 'grid') -> np.ndarray:
+    """
+    เลือก keypoints ให้ไม่เกิน budget ด้วยวิธีที่กำหนด
+
+    Args:
+        keypoints (KeypointArray): keypoints ทั้งหมด
+        image_shape (Tuple[int, int]): (height, width) ของภาพ
+        budget (int): จำนวน keypoints สูงสุด
+        method (str): 'grid' หรือ 'anms'
+
+    Returns:
+        np.ndarray: indices ของ keypoints ที่เลือก
+
+    Raises:
+        ValueError: ถ้าไม่รู้จักวิธีที่กำหนด
+    """
+    if method == 'grid':
+        return select_grid(keypoints, image_shape, budget)
+    if method == 'anms':
+        return select_anms(keypoints, budget)
+    raise ValueError(f"Unsupported keypoint selection: {method}")
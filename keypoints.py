@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keypoints ในรูปแบบ struct-of-arrays
+ใช้แทน list ของ cv2.KeyPoint เพื่อลด overhead ของ Python objects
+และให้ serialize (cache, ส่งข้ามโปรเซส) ได้ง่าย
+"""
+
+from typing import Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class KeypointArray:
+    """
+    ชุดของ keypoints เก็บเป็น NumPy arrays
+
+    Attributes:
+        pt (np.ndarray): ตำแหน่ง (N, 2) float32
+        size (np.ndarray): ขนาดของ keypoint (float32)
+        angle (np.ndarray): มุม (float32)
+        response (np.ndarray): ความแรงของ keypoint (float32)
+        octave (np.ndarray): octave/layer ที่ detector เข้ารหัสไว้ (int32)
+        class_id (np.ndarray): class id (int32)
+    """
+
+    __slots__ = ('pt', 'size', 'angle', 'response', 'octave', 'class_id')
+
+    FIELDS = __slots__
+
+    def __init__(self, pt: np.ndarray, size: np.ndarray, angle: np.ndarray,
+                 response: np.ndarray, octave: np.ndarray, class_id: np.ndarray):
+        self.pt = np.asarray(pt, dtype=np.float32).reshape(-1, 2)
+        self.size = np.asarray(size, dtype=np.float32)
+        self.angle = np.asarray(angle, dtype=np.float32)
+        self.response = np.asarray(response, dtype=np.float32)
+        self.octave = np.asarray(octave, dtype=np.int32)
+        self.class_id = np.asarray(class_id, dtype=np.int32)
+
+    @classmethod
+    def empty(cls) -> 'KeypointArray':
+        """สร้างชุด keypoints ว่าง"""
+        f = np.empty(0, np.float32)
+        i = np.empty(0, np.int32)
+        return cls(np.empty((0, 2), np.float32), f, f, f, i, i)
+
+    @classmethod
+    def from_cv(cls, keypoints: Sequence) -> 'KeypointArray':
+        """
+        แปลงจาก list ของ cv2.KeyPoint
+
+        Args:
+            keypoints (Sequence): รายการ cv2.KeyPoint
+
+        Returns:
+            KeypointArray: keypoints ในรูปแบบ arrays
+        """
+        n = len(keypoints)
+        if n == 0:
+            return cls.empty()
+        return cls(cv2.KeyPoint_convert(keypoints),
+                   np.fromiter((kp.size for kp in keypoints), np.float32, n),
+                   np.fromiter((kp.angle for kp in keypoints), np.float32, n),
+                   np.fromiter((kp.response for kp in keypoints), np.float32, n),
+                   np.fromiter((kp.octave for kp in keypoints), np.int32, n),
+                   np.fromiter((kp.class_id for kp in keypoints), np.int32, n))
+
+    @classmethod
+    def from_dict(cls, arrays: dict) -> 'KeypointArray':
+        """สร้างจาก dict ของ arrays (เช่น จากไฟล์ .npz)"""
+        return cls(*(arrays[name] for name in cls.FIELDS))
+
+    @classmethod
+    def concatenate(cls, parts: Sequence['KeypointArray']) -> 'KeypointArray':
+        """รวมหลายชุด keypoints เข้าด้วยกันตามลำดับ"""
+        if not parts:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(p, name) for p in parts]) for name in cls.FIELDS))
+
+    def to_dict(self) -> dict:
+        """แปลงเป็น dict ของ arrays (สำหรับ np.savez)"""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def to_cv(self) -> list:
+        """
+        แปลงเป็น list ของ cv2.KeyPoint (ใช้เฉพาะตอนวาดภาพหรือเรียก API ของ OpenCV)
+
+        Returns:
+            list: รายการ cv2.KeyPoint
+        """
+        return [cv2.KeyPoint(x, y, size, angle, response, octave, class_id)
+                for (x, y), size, angle, response, octave, class_id
+                in zip(self.pt.tolist(), self.size.tolist(), self.angle.tolist(),
+                       self.response.tolist(), self.octave.tolist(), self.class_id.tolist())]
+
+    def transformed(self, scale: float = 1.0,
+                    offset: Tuple[float, float] = (0.0, 0.0)) -> 'KeypointArray':
+        """
+        ย่อ/ขยายและเลื่อนตำแหน่ง (ใช้แปลงจากภาพย่อหรือภาพที่ crop กลับเป็นพิกัดภาพเต็ม)
+
+        Args:
+            scale (float): ตัวคูณของตำแหน่งและขนาด
+            offset (Tuple[float, float]): ค่าที่บวกเพิ่มให้ตำแหน่ง (x, y) หลังคูณ scale
+
+        Returns:
+            KeypointArray: keypoints ชุดใหม่
+        """
+        pt = self.pt * np.float32(scale) + np.asarray(offset, dtype=np.float32)
+        return KeypointArray(pt, self.size * np.float32(scale), self.angle, self.response,
+                             self.octave, self.class_id)
+
+    @property
+    def nbytes(self) -> int:
+        """ขนาดหน่วยความจำรวมของ arrays (bytes)"""
+        return sum(getattr(self, name).nbytes for name in self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.pt)
+
+    def __getitem__(self, selection) -> 'KeypointArray':
+        """เลือกบางส่วนด้วย slice, boolean mask หรือ index array"""
+        return KeypointArray(*(getattr(self, name)[selection] for name in self.FIELDS))
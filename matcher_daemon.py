@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Daemon ที่ทำงานค้างไว้สำหรับ cli.py
+เก็บ detectors, matchers, feature caches และดัชนีของแผนที่อ้างอิงไว้ในหน่วยความจำ
+แล้วรับคำสั่งของ cli.py ผ่าน Unix domain socket (cli.py --daemon-socket <path>)
+ทำให้การเรียก cli.py ซ้ำหลายครั้งไม่ต้องเริ่ม Python, import OpenCV และสร้าง detector ใหม่
+
+โปรโตคอล (JSON หนึ่งบรรทัดต่อข้อความ):
+    client -> daemon: {"argv": [...], "cwd": "..."} หรือ {"command": "shutdown"}
+    daemon -> client: {"stream": "stdout" หรือ "stderr", "data": "..."} ระหว่างทำงาน
+                      แล้วปิดท้ายด้วย {"exit_code": <int>}
+                      คำสั่งที่ไม่ถูกต้องได้รับ {"exit_code": 2, "error": "..."} ทันที
+
+daemon ทำคำสั่งทีละคำสั่ง (คำสั่งที่เชื่อมต่อเข้ามาระหว่างนั้นจะรอในคิวของ socket)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+from typing import List, Optional, TextIO
+
+
+# Unix domain sockets ไม่มีในบาง platforms (เช่น Python บน Windows รุ่นเก่า)
+UNIX_SOCKETS_SUPPORTED = hasattr(socket, 'AF_UNIX')
+
+
+def send_message(stream, message: dict):
+    """
+    ส่งข้อความ JSON หนึ่งบรรทัด
+
+    Args:
+        stream: file object แบบ binary ของ socket
+        message (dict): ข้อความ
+    """
+    stream.write((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+    stream.flush()
+
+
+class _SocketTextStream(io.TextIOBase):
+    """stream ข้อความที่ส่งทุกการเขียนไปยัง client (ใช้แทน stdout/stderr ระหว่างทำคำสั่ง)"""
+
+    def __init__(self, stream, name: str):
+        self._stream = stream
+        self._name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            send_message(self._stream, {'stream': self._name, 'data': text})
+        return len(text)
+
+
+def connect(socket_path: str) -> socket.socket:
+    """
+    เชื่อมต่อกับ daemon
+
+    Args:
+        socket_path (str): path ของ Unix socket
+
+    Returns:
+        socket.socket: การเชื่อมต่อ
+
+    Raises:
+        OSError: ถ้า platform ไม่รองรับ Unix sockets หรือไม่มี daemon ทำงานอยู่
+    """
+    if not UNIX_SOCKETS_SUPPORTED:
+        raise OSError("Unix domain sockets are not supported on this platform")
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        raise
+    return connection
+
+
+def forward_command(connection: socket.socket, argv: List[str], cwd: Optional[str] = None,
+                    stdout: Optional[TextIO] = None, stderr: Optional[TextIO] = None) -> int:
+    """
+    ส่งคำสั่งของ cli.py ให้ daemon แล้วแสดงผลลัพธ์ตามที่ daemon ส่งกลับมา
+
+    Args:
+        connection (socket.socket): การเชื่อมต่อจาก connect
+        argv (List[str]): arguments ของ cli.py
+        cwd (str): โฟลเดอร์ที่ใช้แปลง path แบบ relative (default: โฟลเดอร์ปัจจุบัน)
+        stdout (TextIO): ที่แสดงผลลัพธ์ (default: sys.stdout)
+        stderr (TextIO): ที่แสดงข้อผิดพลาด (default: sys.stderr)
+
+    Returns:
+        int: exit code ของคำสั่ง
+    """
+    streams = {'stdout': stdout or sys.stdout, 'stderr': stderr or sys.stderr}
+
+    with connection.makefile('rwb') as stream:
+        send_message(stream, {'argv': list(argv), 'cwd': cwd or os.getcwd()})
+        for line in stream:
+            message = json.loads(line)
+            if 'exit_code' in message:
+                if message.get('error'):
+                    print(f"❌ daemon ปฏิเสธคำสั่ง: {message['error']}", file=streams['stderr'])
+                return message['exit_code']
+            target = streams[message['stream']]
+            target.write(message['data'])
+            target.flush()
+
+    print("❌ การเชื่อมต่อกับ daemon ถูกปิดก่อนคำสั่งเสร็จ", file=streams['stderr'])
+    return 1
+
+
+def request_error(request) -> Optional[str]:
+    """
+    ตรวจสอบคำสั่งที่ได้รับจาก client
+
+    Args:
+        request: ข้อความ JSON ที่ถอดรหัสแล้ว
+
+    Returns:
+        Optional[str]: ข้อความอธิบายข้อผิดพลาด หรือ None ถ้าคำสั่งถูกต้อง
+    """
+    if not isinstance(request, dict):
+        return f"request must be a JSON object, got {type(request).__name__}"
+    argv = request.get('argv')
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        return "request 'argv' must be a list of strings"
+    if not isinstance(request.get('cwd'), str):
+        return "request 'cwd' must be a string"
+    if not os.path.isdir(request['cwd']):
+        return f"request 'cwd' is not a directory: {request['cwd']}"
+    return None
+
+
+def shutdown(socket_path: str):
+    """
+    สั่งให้ daemon หยุดทำงาน
+
+    Args:
+        socket_path (str): path ของ Unix socket
+    """
+    with connect(socket_path) as connection, connection.makefile('rwb') as stream:
+        send_message(stream, {'command': 'shutdown'})
+        stream.readline()
+
+
+class MatcherDaemon:
+    """
+    Server ที่รันคำสั่งของ cli.py ในโปรเซสเดียวที่ทำงานค้างไว้
+
+    matchers และดัชนีที่ถูกสร้างจะถูกเก็บไว้ใช้ซ้ำ (ดู cli.keep_warm)
+    """
+
+    def __init__(self, socket_path: str):
+        """
+        Initialize the MatcherDaemon
+
+        Args:
+            socket_path (str): path ของ Unix socket ที่รอรับคำสั่ง
+
+        Raises:
+            OSError: ถ้า platform ไม่รองรับ Unix sockets
+        """
+        if not UNIX_SOCKETS_SUPPORTED:
+            raise OSError("Unix domain sockets are not supported on this platform")
+        self.socket_path = os.path.abspath(socket_path)
+        self.requests_served = 0
+
+        # import ครั้งเดียวตอนเริ่ม (รวม OpenCV และ modules ที่ cli ใช้)
+        import cli
+        self._cli = cli
+        cli.keep_warm()
+        cli.build_parser()
+
+    def _bind(self) -> socket.socket:
+        """สร้าง socket (ลบไฟล์ socket เก่าที่ไม่มี daemon ใช้งานแล้ว)"""
+        if os.path.exists(self.socket_path):
+            try:
+                connect(self.socket_path).close()
+            except OSError:
+                os.remove(self.socket_path)
+            else:
+                raise OSError(f"มี daemon ทำงานอยู่แล้วที่: {self.socket_path}")
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        # ให้เฉพาะเจ้าของเชื่อมต่อได้ (คำสั่งอ่านและเขียนไฟล์ในนามของ daemon)
+        os.chmod(self.socket_path, 0o600)
+        server.listen()
+        return server
+
+    def run_command(self, argv: List[str], cwd: str, stdout: TextIO, stderr: TextIO) -> int:
+        """
+        รันคำสั่งของ cli.py ในโปรเซสนี้
+
+        Args:
+            argv (List[str]): arguments ของ cli.py
+            cwd (str): โฟลเดอร์ของ client (ใช้แปลง path แบบ relative)
+            stdout (TextIO): ที่ส่งผลลัพธ์
+            stderr (TextIO): ที่ส่งข้อผิดพลาด
+
+        Returns:
+            int: exit code ของคำสั่ง
+        """
+        previous_cwd = os.getcwd()
+        os.chdir(cwd)
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    return self._cli.main(argv)
+                except SystemExit as e:
+                    # argparse ออกด้วย SystemExit (--help หรือ arguments ไม่ถูกต้อง)
+                    if e.code is None or isinstance(e.code, int):
+                        return e.code or 0
+                    print(e.code, file=sys.stderr)
+                    return 1
+        finally:
+            os.chdir(previous_cwd)
+
+    def handle(self, connection: socket.socket) -> bool:
+        """
+        รับและทำคำสั่งหนึ่งคำสั่งจาก client
+
+        Args:
+            connection (socket.socket): การเชื่อมต่อจาก client
+
+        Returns:
+            bool: False ถ้าได้รับคำสั่งให้หยุดทำงาน
+        """
+        with connection.makefile('rwb') as stream:
+            line = stream.readline()
+            if not line:
+                return True
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                send_message(stream, {'exit_code': 2, 'error': f"invalid JSON: {e}"})
+                return True
+
+            if isinstance(request, dict) and request.get('command') == 'shutdown':
+                send_message(stream, {'exit_code': 0})
+                return False
+
+            error = request_error(request)
+            if error:
+                send_message(stream, {'exit_code': 2, 'error': error})
+                return True
+
+            exit_code = self.run_command(request['argv'], request['cwd'],
+                                         _SocketTextStream(stream, 'stdout'),
+                                         _SocketTextStream(stream, 'stderr'))
+            self.requests_served += 1
+            send_message(stream, {'exit_code': exit_code})
+        return True
+
+    def serve_forever(self):
+        """รอรับคำสั่งจนกว่าจะได้รับคำสั่ง shutdown หรือ Ctrl+C"""
+        server = self._bind()
+        print(f"⚡ Matcher daemon พร้อมทำงานที่: {self.socket_path}")
+        try:
+            running = True
+            while running:
+                connection, _ = server.accept()
+                with connection:
+                    try:
+                        running = self.handle(connection)
+                    except Exception as e:
+                        # client ปิดการเชื่อมต่อระหว่างทำงาน หรือคำสั่งล้มเหลวโดยไม่คาดคิด
+                        # (daemon ยังทำงานต่อ หยุดได้ด้วย shutdown หรือ Ctrl+C เท่านั้น)
+                        print(f"⚠️  คำสั่งไม่สำเร็จ: {e}", file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        print(f"⏹️  Matcher daemon หยุดทำงาน (ทำคำสั่งไปทั้งหมด {self.requests_served} คำสั่ง)")
+
+
+def main():
+    """ฟังก์ชันหลักสำหรับเริ่มหรือหยุด daemon"""
+    parser = argparse.ArgumentParser(
+        description='⚡ Matcher daemon สำหรับ cli.py --daemon-socket',
+        epilog='ตัวอย่างการใช้งาน:\n'
+               '  python matcher_daemon.py --socket /tmp/homography.sock &\n'
+               '  python cli.py --daemon-socket /tmp/homography.sock --eye eye.jpg --top map.jpg\n'
+               '  python matcher_daemon.py --socket /tmp/homography.sock --stop',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--socket', required=True,
+                        help='🔌 path ของ Unix socket')
+    parser.add_argument('--stop', action='store_true',
+                        help='⏹️  สั่งให้ daemon ที่ทำงานอยู่หยุดทำงาน')
+    args = parser.parse_args()
+
+    try:
+        if args.stop:
+            shutdown(args.socket)
+            print(f"⏹️  ส่งคำสั่งหยุดให้ daemon ที่: {args.socket}")
+            return 0
+        MatcherDaemon(args.socket).serve_forever()
+        return 0
+    except OSError as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    exit(main())
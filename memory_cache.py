@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache ในหน่วยความจำสำหรับ HomographyMatcher (ภาพที่ decode แล้ว, features และผลการจับคู่)
+ลบ entries ที่ไม่ได้ใช้นานที่สุด (LRU) เมื่อขนาดรวมเกินจำนวน bytes ที่กำหนด
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+import numpy as np
+
+
+def estimate_nbytes(value) -> int:
+    """
+    ประมาณขนาดในหน่วยความจำของค่าที่เก็บใน cache
+
+    นับขนาดของ NumPy arrays ภายใน tuples, lists, dicts และ objects ที่ใช้ __slots__
+    (เช่น KeypointArray, FeatureMatches) ค่าอื่นใช้ sys.getsizeof
+
+    Args:
+        value: ค่าที่ต้องการประมาณขนาด
+
+    Returns:
+        int: ขนาดโดยประมาณ (bytes)
+    """
+    if value is None:
+        return 0
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+    slots = getattr(type(value), '__slots__', None)
+    if slots:
+        return sum(estimate_nbytes(getattr(value, name, None)) for name in slots)
+    return sys.getsizeof(value)
+
+
+def freeze_arrays(value):
+    """
+    ทำให้ NumPy arrays ทั้งหมดภายในค่าที่จะเก็บใน cache เป็นแบบอ่านได้อย่างเดียว (ในที่เดิม)
+
+    ค้นหา arrays แบบเดียวกับ estimate_nbytes (tuples, lists, dicts และ objects ที่ใช้ __slots__)
+    ผู้เรียกที่พยายามแก้ไขค่าจาก cache ในที่เดิมจะได้ ValueError แทนการทำให้ cache เสียหาย
+
+    Args:
+        value: ค่าที่จะเก็บใน cache
+
+    Returns:
+        ค่าเดิม (เพื่อใช้ต่อได้ทันที)
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for item in value.values():
+            freeze_arrays(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            freeze_arrays(item)
+    else:
+        for name in getattr(type(value), '__slots__', ()):
+            freeze_arrays(getattr(value, name, None))
+    return value
+
+
+class MemoryCache:
+    """
+    LRU cache ที่จำกัดขนาดรวมเป็น bytes (ใช้จากหลาย threads ได้)
+
+    ค่าที่เก็บถูกแชร์กับผู้เรียก (ไม่คัดลอก) ผู้เรียกต้องไม่แก้ไขค่าที่ได้จาก cache
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the MemoryCache
+
+        Args:
+            max_bytes (int): ขนาดรวมสูงสุดของ entries (bytes)
+        """
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        """ขนาดรวมของ entries ปัจจุบัน (bytes)"""
+        return self._bytes
+
+    def get(self, key: Hashable, default=None):
+        """
+        อ่านค่าจาก cache (entry ที่ถูกอ่านจะกลายเป็นตัวที่ใช้ล่าสุด)
+
+        Args:
+            key (Hashable): key ของ entry
+            default: ค่าที่คืนถ้าไม่มีใน cache
+
+        Returns:
+            ค่าใน cache หรือ default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: Hashable, default=None):
+        """อ่านค่าโดยไม่เปลี่ยนลำดับ LRU และสถิติ"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def keys(self) -> List[Hashable]:
+        """keys ทั้งหมด เรียงจากใช้นานที่สุดไปล่าสุด"""
+        with self._lock:
+            return list(self._entries)
+
+    def put(self, key: Hashable, value, nbytes: Optional[int] = None) -> bool:
+        """
+        เก็บค่าลง cache แล้วลบ entries ที่ใช้นานที่สุดจนขนาดรวมไม่เกิน max_bytes
+
+        Args:
+            key (Hashable): key ของ entry
+            value: ค่าที่เก็บ
+            nbytes (int): ขนาดของค่า (default: ประมาณด้วย estimate_nbytes)
+
+        Returns:
+            bool: False ถ้าค่าใหญ่เกิน max_bytes (ไม่ถูกเก็บ)
+        """
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+        with self._lock:
+            self._remove(key)
+            if nbytes > self.max_bytes:
+                return False
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        ลบ entry หนึ่งตัว
+
+        Args:
+            key (Hashable): key ของ entry
+
+        Returns:
+            bool: True ถ้ามี entry นั้นอยู่
+        """
+        with self._lock:
+            return self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        ลบทุก entries ที่ key ตรงกับเงื่อนไข
+
+        Args:
+            predicate (Callable[[Hashable], bool]): ฟังก์ชันที่รับ key แล้วคืน True ถ้าต้องลบ
+
+        Returns:
+            int: จำนวน entries ที่ถูกลบ
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """ลบทุก entries (สถิติไม่ถูกรีเซ็ต)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        สถิติของ cache
+
+        Returns:
+            dict: 'hits', 'misses', 'hit_rate', 'evictions', 'entries', 'bytes' และ 'max_bytes'
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mosaic ของภาพ eye-level หลายภาพบนแผนที่ top-down ภาพเดียว
+แต่ละภาพถูก warp ด้วย Homography เฉพาะบริเวณกรอบที่ภาพถูก project ไปตกบนแผนที่
+แล้วสะสมลงผลรวมถ่วงน้ำหนัก (running weighted sum) ใน buffers ที่จองไว้ครั้งเดียว
+buffers อาจเก็บใน np.memmap บนดิสก์ และบันทึกผลลัพธ์ทีละ tile ได้ เพื่อให้ใช้หน่วยความจำจำกัด
+แม้ canvas จะมีขนาดเท่าแผนที่ทั้งเมือง
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from artifact_writer import write_image
+from image_files import collect_images
+from homography_matcher import (INTERPOLATION_RADIUS, INTERPOLATIONS, HomographyMatcher, image_size,
+                                projected_bbox)
+from reference_map import ReferenceMap
+
+
+# วิธีผสมภาพที่ซ้อนทับกัน: 'feather' = น้ำหนักลดลงเข้าหาขอบภาพ (รอยต่อนุ่มนวล)
+# 'average' = ทุก pixel ของทุกภาพมีน้ำหนักเท่ากัน
+BLEND_MODES = ('feather', 'average')
+
+
+class MosaicBuilder:
+    """
+    สะสมภาพที่ถูก warp ด้วย Homography หลายภาพลงบน canvas เดียว
+
+    canvas เก็บผลรวมของสีคูณน้ำหนัก (float32, 3 channels) และผลรวมของน้ำหนัก (float32)
+    ภาพผลลัพธ์คือผลรวมของสีหารด้วยผลรวมของน้ำหนัก คำนวณตอน render เท่านั้น
+    """
+
+    SUM_FILE = "mosaic_sum.f32"
+    WEIGHT_FILE = "mosaic_weight.f32"
+
+    def __init__(self, canvas_size: Tuple[int, int], blend: str = 'feather',
+                 interpolation: str = 'linear', storage_dir: Optional[str] = None):
+        """
+        Initialize the MosaicBuilder
+
+        Args:
+            canvas_size (Tuple[int, int]): ขนาดของ canvas (width, height) ปกติเท่ากับภาพ top-down
+            blend (str): วิธีผสมภาพที่ซ้อนทับกัน ('feather' หรือ 'average')
+            interpolation (str): วิธี interpolate ตอน warp ('nearest', 'linear', 'cubic', 'lanczos')
+            storage_dir (str): ถ้ากำหนด จะเก็บ buffers ของ canvas เป็น np.memmap ในโฟลเดอร์นี้
+                แทนหน่วยความจำ (optional)
+        """
+        if blend not in BLEND_MODES:
+            raise ValueError(f"Unsupported blend mode: {blend}")
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unsupported interpolation: {interpolation}")
+
+        width, height = canvas_size
+        self.canvas_size = (int(width), int(height))
+        self.blend = blend
+        self.interpolation = interpolation
+        self.storage_dir = storage_dir
+        self.images_added = 0
+
+        if storage_dir:
+            os.makedirs(storage_dir, exist_ok=True)
+            self._sum = np.memmap(os.path.join(storage_dir, self.SUM_FILE), dtype=np.float32,
+                                  mode='w+', shape=(height, width, 3))
+            self._weight = np.memmap(os.path.join(storage_dir, self.WEIGHT_FILE), dtype=np.float32,
+                                     mode='w+', shape=(height, width))
+        else:
+            self._sum = np.zeros((height, width, 3), dtype=np.float32)
+            self._weight = np.zeros((height, width), dtype=np.float32)
+
+        # buffers ชั่วคราวของการ warp (ขยายเมื่อเจอกรอบที่ใหญ่กว่าเดิมเท่านั้น)
+        self._scratch: Dict[str, np.ndarray] = {}
+        # น้ำหนักของภาพต้นทางแยกตามขนาดภาพ (ภาพจากกล้องเดียวกันใช้ร่วมกันได้)
+        self._source_weights: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __enter__(self) -> 'MosaicBuilder':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _buffer(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        """array ที่ต่อเนื่องในหน่วยความจำขนาด shape จาก buffer ชั่วคราวที่ใช้ซ้ำ"""
+        size = int(np.prod(shape))
+        buffer = self._scratch.get(name)
+        if buffer is None or buffer.size < size:
+            buffer = self._scratch[name] = np.empty(size, dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+    def source_weights(self, shape: tuple) -> np.ndarray:
+        """
+        น้ำหนักของแต่ละ pixel ในภาพต้นทาง
+
+        Args:
+            shape (tuple): shape ของภาพต้นทาง
+
+        Returns:
+            np.ndarray: น้ำหนัก float32 ขนาด (height, width) มีค่าระหว่าง 0 ถึง 1
+        """
+        h, w = shape[:2]
+        weights = self._source_weights.get((h, w))
+        if weights is None:
+            if self.blend == 'feather':
+                # ระยะถึงขอบภาพที่ใกล้ที่สุด (นับ pixel ขอบเป็น 1) ปรับให้กลางภาพมีค่า 1
+                ramp_y = np.minimum(np.arange(1, h + 1), np.arange(h, 0, -1)) / ((h + 1) // 2)
+                ramp_x = np.minimum(np.arange(1, w + 1), np.arange(w, 0, -1)) / ((w + 1) // 2)
+                weights = np.minimum.outer(ramp_y, ramp_x).astype(np.float32)
+            else:
+                weights = np.ones((h, w), dtype=np.float32)
+            self._source_weights[(h, w)] = weights
+        return weights
+
+    def add(self, image: np.ndarray, H: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        warp ภาพด้วย Homography แล้วสะสมลง canvas (warp เฉพาะกรอบที่ภาพถูก project ไปตก)
+
+        Args:
+            image (np.ndarray): ภาพสี BGR หรือภาพ grayscale (uint8)
+            H (np.ndarray): Homography จากภาพนี้ไปยัง canvas
+
+        Returns:
+            Optional[Tuple[int, int, int, int]]: กรอบ (x0, y0, x1, y1) บน canvas ที่ถูกปรับ
+                หรือ None ถ้าภาพไม่ตกบน canvas
+        """
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+        width, height = self.canvas_size
+        bbox = projected_bbox(image.shape, H, (height, width),
+                              padding=INTERPOLATION_RADIUS[self.interpolation])
+        if bbox is None:
+            return None
+
+        x0, y0, x1, y1 = bbox
+        roi_size = (x1 - x0, y1 - y0)
+        # เลื่อนจุดเริ่มต้นของ canvas มาที่มุมของกรอบ
+        H_roi = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64) @ H
+
+        # ขอบภาพใช้ BORDER_REPLICATE เพื่อไม่ให้สีดำปนเข้ามา สัดส่วนที่ภาพครอบคลุม pixel ขอบ
+        # ถูกนับไว้ในน้ำหนักแทน (pixel นอกภาพมีน้ำหนักเป็น 0)
+        warped = cv2.warpPerspective(image, H_roi, roi_size,
+                                     dst=self._buffer('warped', (roi_size[1], roi_size[0], 3), np.uint8),
+                                     flags=INTERPOLATIONS[self.interpolation],
+                                     borderMode=cv2.BORDER_REPLICATE)
+        weights = cv2.warpPerspective(self.source_weights(image.shape), H_roi, roi_size,
+                                      dst=self._buffer('weights', (roi_size[1], roi_size[0]), np.float32),
+                                      flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+        weighted = self._buffer('weighted', warped.shape, np.float32)
+        np.multiply(warped, weights[:, :, None], out=weighted)
+        self._sum[y0:y1, x0:x1] += weighted
+        self._weight[y0:y1, x0:x1] += weights
+        self.images_added += 1
+        return bbox
+
+    def render(self, region: Optional[Tuple[int, int, int, int]] = None,
+               background: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        สร้างภาพ mosaic ของบริเวณหนึ่งบน canvas
+
+        Args:
+            region (Tuple[int, int, int, int]): กรอบ (x0, y0, x1, y1) (default: ทั้ง canvas)
+            background (np.ndarray): ภาพขนาดเท่า canvas ที่ใช้กับ pixel ที่ไม่มีภาพใดครอบคลุม
+                (เช่นภาพ top-down) หรือ None เพื่อใช้สีดำ
+
+        Returns:
+            np.ndarray: ภาพ BGR (uint8) ของบริเวณนั้น
+        """
+        x0, y0, x1, y1 = region if region is not None else (0, 0, *self.canvas_size)
+        weights = self._weight[y0:y1, x0:x1]
+        covered = weights > 1e-6
+
+        mosaic = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        color = self._sum[y0:y1, x0:x1][covered] / weights[covered][:, None]
+        mosaic[covered] = np.clip(color + 0.5, 0, 255).astype(np.uint8)
+
+        if background is not None:
+            patch = background[y0:y1, x0:x1]
+            if patch.ndim == 2:
+                patch = cv2.cvtColor(patch, cv2.COLOR_GRAY2BGR)
+            mosaic[~covered] = patch[~covered]
+        return mosaic
+
+    def write(self, path: str, background: Optional[np.ndarray] = None):
+        """
+        บันทึก mosaic ทั้ง canvas เป็นภาพเดียว
+
+        Args:
+            path (str): path ของไฟล์ภาพ
+            background (np.ndarray): ภาพพื้นหลัง (ดู render)
+        """
+        write_image(path, self.render(background=background))
+
+    def write_tiles(self, directory: str, tile_size: int = 2048,
+                    background: Optional[np.ndarray] = None, extension: str = 'png',
+                    skip_empty: bool = True) -> List[str]:
+        """
+        บันทึก mosaic ทีละ tile (หน่วยความจำที่ใช้ขึ้นกับขนาด tile ไม่ใช่ขนาด canvas)
+
+        ไฟล์ชื่อ tile_<row>_<col>.<extension> โดย tile แถว row คอลัมน์ col
+        เริ่มที่พิกัด (col * tile_size, row * tile_size) บน canvas
+
+        Args:
+            directory (str): โฟลเดอร์ที่บันทึก tiles
+            tile_size (int): ความกว้างและความสูงของแต่ละ tile
+            background (np.ndarray): ภาพพื้นหลัง (ดู render)
+            extension (str): นามสกุลไฟล์ภาพ
+            skip_empty (bool): ไม่บันทึก tiles ที่ไม่มีภาพใดครอบคลุม (เมื่อไม่มีภาพพื้นหลัง)
+
+        Returns:
+            List[str]: paths ของ tiles ที่บันทึก
+        """
+        if tile_size < 1:
+            raise ValueError(f"Unsupported tile size: {tile_size}")
+
+        os.makedirs(directory, exist_ok=True)
+        width, height = self.canvas_size
+        paths = []
+        for row, y0 in enumerate(range(0, height, tile_size)):
+            for col, x0 in enumerate(range(0, width, tile_size)):
+                region = (x0, y0, min(width, x0 + tile_size), min(height, y0 + tile_size))
+                if skip_empty and background is None and not np.any(self._weight[y0:region[3], x0:region[2]]):
+                    continue
+                path = os.path.join(directory, f"tile_{row:03d}_{col:03d}.{extension}")
+                write_image(path, self.render(region, background))
+                paths.append(path)
+        return paths
+
+    def coverage(self) -> float:
+        """
+        สัดส่วนของ canvas ที่มีภาพอย่างน้อยหนึ่งภาพครอบคลุม
+
+        Returns:
+            float: สัดส่วนระหว่าง 0 ถึง 1
+        """
+        width, height = self.canvas_size
+        covered = sum(int(np.count_nonzero(self._weight[y0:y0 + 1024] > 1e-6))
+                      for y0 in range(0, height, 1024))
+        return covered / max(1, width * height)
+
+    def close(self):
+        """ปล่อย buffers ของ canvas (ลบไฟล์ np.memmap ถ้าใช้ storage_dir)"""
+        self._sum = self._weight = None
+        self._scratch = {}
+        if self.storage_dir:
+            for name in (self.SUM_FILE, self.WEIGHT_FILE):
+                path = os.path.join(self.storage_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def main():
+    """ฟังก์ชันหลักสำหรับสร้าง mosaic"""
+    parser = argparse.ArgumentParser(
+        description='🧩 Mosaic - warp ภาพ Eye-Level หลายภาพลงบนแผนที่ Top-Down ภาพเดียว',
+        epilog='ตัวอย่างการใช้งาน:\n'
+               '  python mosaic.py --eye shots/ --top map.jpg -o mosaic.jpg --background\n'
+               '  python mosaic.py --eye shots/ --reference map_index --top map.jpg '
+               '-o mosaic_tiles --tile-size 2048 --storage-dir /tmp/mosaic',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--eye', '--eye-level', dest='eye_level', required=True,
+                        help='📷 ภาพ Eye-Level หรือโฟลเดอร์ของภาพ')
+    parser.add_argument('--top', '--top-down', dest='top_down', default=None,
+                        help='🗺️  ไฟล์ภาพแผนที่ Top-Down')
+    parser.add_argument('--reference', default=None,
+                        help='🧭 โฟลเดอร์ของแผนที่อ้างอิง (ถ้ายังไม่มีจะสร้างจาก --top และบันทึกไว้)')
+    parser.add_argument('--detector', choices=['SIFT', 'ORB', 'AKAZE'], default='SIFT',
+                        help='🔎 Feature detector (default: SIFT)')
+    parser.add_argument('--min-matches', type=int, default=10,
+                        help='🔢 จำนวนการจับคู่ขั้นต่ำ (default: 10)')
+    parser.add_argument('--pyramid-max-dim', type=int, default=None,
+                        help='🔭 หา features บนภาพย่อ แล้ว refine ที่ความละเอียดเต็ม')
+    parser.add_argument('--blend', choices=list(BLEND_MODES), default='feather',
+                        help='🎨 วิธีผสมภาพที่ซ้อนทับกัน (default: feather)')
+    parser.add_argument('--interpolation', choices=list(INTERPOLATIONS), default='linear',
+                        help='🖼️  วิธี interpolate ตอน warp (default: linear)')
+    parser.add_argument('--background', action='store_true',
+                        help='🗺️  ใช้ภาพ Top-Down เป็นพื้นหลังของบริเวณที่ไม่มีภาพครอบคลุม')
+    parser.add_argument('--tile-size', type=int, default=None,
+                        help='🧱 บันทึกผลลัพธ์ทีละ tile ขนาดนี้ลงโฟลเดอร์ --output (default: ภาพเดียว)')
+    parser.add_argument('--storage-dir', default=None,
+                        help='💽 เก็บ buffers ของ canvas เป็น memory-mapped files ในโฟลเดอร์นี้')
+    parser.add_argument('--output', '-o', default='mosaic.jpg',
+                        help='📁 ไฟล์ผลลัพธ์ (หรือโฟลเดอร์เมื่อใช้ --tile-size)')
+    args = parser.parse_args()
+
+    has_saved_reference = bool(args.reference) and os.path.exists(
+        os.path.join(args.reference, ReferenceMap.META_FILE))
+    if not args.top_down and not has_saved_reference:
+        if args.reference:
+            print(f"❌ ไม่พบแผนที่อ้างอิงที่บันทึกไว้ใน: {args.reference} (ระบุ --top เพื่อสร้างใหม่)")
+        else:
+            print("❌ ต้องระบุ --top หรือ --reference")
+        return 1
+
+    eye_images = collect_images(args.eye_level)
+    if not eye_images:
+        print(f"❌ ไม่พบไฟล์ภาพ Eye-Level: {args.eye_level}")
+        return 1
+
+    matcher = HomographyMatcher(feature_detector=args.detector, min_match_count=args.min_matches,
+                                pyramid_max_dim=args.pyramid_max_dim, artifacts='none')
+
+    if has_saved_reference:
+        print(f"🗺️  โหลดแผนที่อ้างอิงจาก: {args.reference}")
+        reference = ReferenceMap.load(args.reference, matcher)
+    else:
+        print(f"🗺️  หา features ของแผนที่: {args.top_down}")
+        reference = ReferenceMap.build(matcher, args.top_down)
+        if args.reference:
+            reference.save(args.reference)
+
+    background = None
+    canvas_size = image_size(reference.image_path)
+    if args.background or canvas_size is None:
+        background, gray_map = reference.load_image(matcher, color=args.background)
+        canvas_size = (gray_map.shape[1], gray_map.shape[0])
+    print(f"🧩 Canvas: {canvas_size[0]}x{canvas_size[1]}, ภาพ Eye-Level {len(eye_images)} ภาพ")
+
+    start_time = time.perf_counter()
+    with MosaicBuilder(canvas_size, blend=args.blend, interpolation=args.interpolation,
+                       storage_dir=args.storage_dir) as builder:
+        for eye_path in eye_images:
+            results = matcher.compare_with_reference(eye_path, reference)
+            H = results['homography']
+            name = os.path.basename(eye_path)
+            if H is None or builder.add(matcher.load_color_image(eye_path), H) is None:
+                print(f"   ❌ {name}")
+                continue
+            print(f"   ✅ {name} (inliers: {results.get('inlier_matches', 0)})")
+
+        if args.tile_size:
+            paths = builder.write_tiles(args.output, args.tile_size, background)
+            print(f"💾 บันทึก {len(paths)} tiles ใน: {args.output}")
+        else:
+            builder.write(args.output, background)
+            print(f"💾 บันทึก mosaic ใน: {args.output}")
+
+        print(f"✅ รวม {builder.images_added}/{len(eye_images)} ภาพ "
+              f"ครอบคลุม {builder.coverage() * 100:.1f}% ของแผนที่ "
+              f"ใน {time.perf_counter() - start_time:.2f} วินาที")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
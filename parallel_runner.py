@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การประมวลผลแบบขนานด้วย process pool สำหรับ HomographyMatcher
+กระจายคู่ภาพหรือ detectors ไปยังหลาย CPU cores และส่งผลลัพธ์กลับตามลำดับที่เสร็จ
+"""
+
+import contextlib
+import inspect
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Optional, Tuple
+
+import cv2
+
+from homography_matcher import HomographyMatcher
+from shared_features import SharedFeatureStore, attach_array, attach_features, detach_all
+
+
+# matchers ที่สร้างไว้แล้วในแต่ละ worker process (ไม่ต้องสร้าง detector ใหม่ทุกงาน)
+_worker_matchers = {}
+
+# features ของภาพ top-down ที่ worker เปิดใช้จาก shared memory ตอนเริ่ม process
+_worker_top_features = {}
+
+# ภาพ top-down ที่ worker โหลดไว้แล้ว (ใช้ตอน refine แบบ pyramid หรือบันทึกผลลัพธ์)
+_worker_image_cache = {}
+
+# matching index ของภาพ top-down ที่ worker สร้างไว้แล้ว (สร้างครั้งเดียวต่อ worker)
+_worker_index_cache = {}
+
+
+def default_threads_per_worker(workers: int) -> int:
+    """
+    จำนวน OpenCV threads ต่อ worker เพื่อไม่ให้ใช้ cores เกินจำนวนที่มี
+
+    Args:
+        workers (int): จำนวน worker processes
+
+    Returns:
+        int: จำนวน threads ต่อ worker (อย่างน้อย 1)
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def matcher_setting(matcher_kwargs: dict, name: str):
+    """
+    ค่าของ argument หนึ่งของ HomographyMatcher จาก matcher_kwargs (หรือค่า default ถ้าไม่ได้ระบุ)
+
+    Args:
+        matcher_kwargs (dict): arguments สำหรับสร้าง HomographyMatcher
+        name (str): ชื่อ argument
+
+    Returns:
+        ค่าของ argument
+    """
+    if name in matcher_kwargs:
+        return matcher_kwargs[name]
+    return inspect.signature(HomographyMatcher).parameters[name].default
+
+
+def init_worker(num_threads: int = 1, shared_top: Optional[dict] = None):
+    """
+    ตั้งค่า worker process (เรียกครั้งเดียวตอนเริ่ม process)
+
+    Args:
+        num_threads (int): จำนวน threads ที่ OpenCV ใช้ใน worker นี้
+        shared_top (dict): path -> handles ใน shared memory ของภาพ top-down (optional)
+            {'features': handles ของ features, 'images': (handle ภาพสีหรือ None, handle ภาพ grayscale) หรือ None}
+    """
+    cv2.setNumThreads(num_threads)
+    _worker_top_features.clear()
+    _worker_image_cache.clear()
+    _worker_index_cache.clear()
+    detach_all()
+
+    # เปิดใช้ features และภาพที่ process หลักเตรียมไว้ (ไม่คัดลอก)
+    for path, handles in (shared_top or {}).items():
+        _worker_top_features[path] = attach_features(handles['features'])
+        if handles['images'] is not None:
+            color_handle, gray_handle = handles['images']
+            _worker_image_cache[path] = (attach_array(color_handle) if color_handle is not None else None,
+                                         attach_array(gray_handle))
+
+
+def _get_matcher(matcher_kwargs: dict) -> HomographyMatcher:
+    key = json.dumps(matcher_kwargs, sort_keys=True, default=str)
+    if key not in _worker_matchers:
+        _worker_matchers[key] = HomographyMatcher(**matcher_kwargs)
+    return _worker_matchers[key]
+
+
+def compare_task(matcher_kwargs: dict, eye_level_path: str,
+                 top_down_path: str, output_dir: str) -> dict:
+    """
+    งานเปรียบเทียบภาพหนึ่งคู่ (รันใน worker process)
+
+    Args:
+        matcher_kwargs (dict): arguments สำหรับสร้าง HomographyMatcher
+        eye_level_path (str): path ของภาพ eye-level
+        top_down_path (str): path ของภาพ top-down
+        output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์
+
+    Returns:
+        dict: ผลลัพธ์การเปรียบเทียบ พร้อม 'processing_time' (วินาที)
+    """
+    matcher = _get_matcher(matcher_kwargs)
+
+    start_time = time.perf_counter()
+    # ซ่อนข้อความระหว่างทำงานของแต่ละ worker ไม่ให้ปนกัน
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = matcher.compare_images(eye_level_path, top_down_path, output_dir)
+        matcher.flush_artifacts()
+    result['processing_time'] = time.perf_counter() - start_time
+
+    return result
+
+
+def extract_task(matcher_kwargs: dict, image_path: str) -> tuple:
+    """
+    งานหา features ของภาพหนึ่งภาพ (รันใน worker process)
+
+    Returns:
+        tuple: keypoints (KeypointArray), descriptors และอัตราส่วนที่ย่อ
+    """
+    matcher = _get_matcher(matcher_kwargs)
+    return matcher.extract_image_features(image_path)
+
+
+def load_task(matcher_kwargs: dict, image_path: str, color: bool) -> tuple:
+    """
+    งานโหลดและปรับแต่งภาพหนึ่งภาพ (รันใน worker process)
+
+    Returns:
+        tuple: ภาพสี (หรือ None) และภาพ grayscale ที่ปรับแต่งแล้ว
+    """
+    matcher = _get_matcher(matcher_kwargs)
+    return matcher.load_and_preprocess_image(image_path, color)
+
+
+def match_row_task(matcher_kwargs: dict, eye_index: int, eye_level_path: str,
+                   top_down_paths: list, output_dir: Optional[str]) -> list:
+    """
+    เปรียบเทียบภาพ eye-level หนึ่งภาพกับภาพ top-down ทุกภาพ (รันใน worker process)
+
+    features ของภาพ top-down ถูกเปิดใช้จาก shared memory ครั้งเดียวใน init_worker
+
+    Returns:
+        list: ผลลัพธ์ของแต่ละคู่ เรียงตาม top_down_paths
+    """
+    matcher = _get_matcher(matcher_kwargs)
+    results = matcher.compare_row(eye_index, eye_level_path, top_down_paths,
+                                  _worker_top_features, output_dir, _worker_image_cache,
+                                  _worker_index_cache)
+    # ภาพผลลัพธ์ต้องถูกเขียนเสร็จก่อนส่งผลลัพธ์กลับ
+    matcher.flush_artifacts()
+    return results
+
+
+def run_parallel(tasks: dict, workers: int,
+                 threads_per_worker: Optional[int] = None) -> Iterator[Tuple[object, Optional[dict], Optional[str]]]:
+    """
+    รัน compare_task หลายงานพร้อมกันใน process pool
+
+    Args:
+        tasks (dict): key -> tuple ของ arguments สำหรับ compare_task
+        workers (int): จำนวน worker processes
+        threads_per_worker (int): จำนวน OpenCV threads ต่อ worker
+            (default: จำนวน cores หารด้วยจำนวน workers)
+
+    Yields:
+        Tuple[object, Optional[dict], Optional[str]]: key, ผลลัพธ์ (หรือ None) และข้อความ error (หรือ None)
+            ตามลำดับที่งานเสร็จ
+    """
+    if threads_per_worker is None:
+        threads_per_worker = default_threads_per_worker(workers)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(compare_task, *task_args): key
+                   for key, task_args in tasks.items()}
+
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, str(e)
+
+
+def compare_many_parallel(matcher_kwargs: dict, eye_level_paths: list,
+                          top_down_paths: list, output_dir: Optional[str] = None,
+                          workers: int = 2, threads_per_worker: Optional[int] = None) -> Iterator[dict]:
+    """
+    HomographyMatcher.compare_many แบบขนาน
+
+    ขั้นที่ 1 หา features ของภาพ top-down ทุกภาพพร้อมกัน (และโหลดภาพถ้าต้อง refine หรือบันทึกผลลัพธ์)
+    แล้วคัดลอกลง shared memory ครั้งเดียว
+    ขั้นที่ 2 workers เปิดใช้ features และภาพเหล่านั้นโดยไม่คัดลอก แล้วกระจายภาพ eye-level
+    ให้ workers (หนึ่งงานต่อภาพ eye-level เทียบกับ top-down ทุกภาพ)
+
+    Args:
+        matcher_kwargs (dict): arguments สำหรับสร้าง HomographyMatcher
+        eye_level_paths (list): paths ของภาพ eye-level
+        top_down_paths (list): paths ของภาพ top-down
+        output_dir (str): โฟลเดอร์สำหรับบันทึกผลลัพธ์ (pair_<i>_<j>) หรือ None
+        workers (int): จำนวน worker processes
+        threads_per_worker (int): จำนวน OpenCV threads ต่อ worker
+
+    Yields:
+        dict: ผลลัพธ์ของแต่ละคู่ ตามลำดับที่งานเสร็จ
+    """
+    if threads_per_worker is None:
+        threads_per_worker = default_threads_per_worker(workers)
+
+    # ภาพ top-down ความละเอียดเต็มต้องใช้เฉพาะตอน refine (pyramid) หรือบันทึกผลลัพธ์
+    # (อ่านจาก matcher_kwargs โดยตรง ไม่ต้องสร้าง matcher ในโปรเซสหลัก)
+    color = HomographyMatcher.artifacts_wanted(matcher_setting(matcher_kwargs, 'artifacts'), output_dir)
+    needs_images = bool(matcher_setting(matcher_kwargs, 'pyramid_max_dim')) or color
+
+    with SharedFeatureStore() as store:
+        # ขั้นที่ 1: features (และภาพ) ของภาพ top-down แล้วคัดลอกลง shared memory
+        shared_top = {path: {'features': None, 'images': None}
+                      for path in dict.fromkeys(top_down_paths)}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(threads_per_worker,)) as executor:
+            futures = {executor.submit(extract_task, matcher_kwargs, path): (path, 'features')
+                       for path in shared_top}
+            if needs_images:
+                futures.update({executor.submit(load_task, matcher_kwargs, path, color): (path, 'images')
+                                for path in shared_top})
+            for future in as_completed(futures):
+                path, kind = futures[future]
+                if kind == 'features':
+                    shared_top[path]['features'] = store.share_features(*future.result())
+                else:
+                    img, gray = future.result()
+                    shared_top[path]['images'] = (store.share_array(img) if img is not None else None,
+                                                  store.share_array(gray))
+
+        # ขั้นที่ 2: จับคู่ทีละภาพ eye-level
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(threads_per_worker, shared_top)) as executor:
+            futures = [executor.submit(match_row_task, matcher_kwargs, i, eye_path,
+                                       top_down_paths, output_dir)
+                       for i, eye_path in enumerate(eye_level_paths)]
+            for future in as_completed(futures):
+                for result in future.result():
+                    yield result
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+แผนที่อ้างอิง (Reference Map) สำหรับ HomographyMatcher
+หา features และสร้าง FLANN index ของภาพ top-down ครั้งเดียว
+แล้วใช้ซ้ำกับภาพ eye-level หลายภาพ (บันทึกลงดิสก์และโหลดกลับมาได้)
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from keypoints import KeypointArray
+
+
+class ReferenceMap:
+    """
+    features และ matching index ของภาพ top-down หนึ่งภาพ
+    """
+
+    FEATURES_FILE = "features.npz"
+    INDEX_FILE = "index.flann"
+    META_FILE = "meta.json"
+
+    def __init__(self, matcher, image_path: str, keypoints: KeypointArray,
+                 descriptors: Optional[np.ndarray], scale: float = 1.0, index=None):
+        """
+        Initialize the ReferenceMap (ปกติสร้างผ่าน ReferenceMap.build หรือ ReferenceMap.load)
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้หา features
+            image_path (str): path ของภาพ top-down
+            keypoints (KeypointArray): keypoints ของภาพ (พิกัดตามระดับ pyramid ที่ใช้)
+            descriptors (np.ndarray): descriptors ของภาพ
+            scale (float): อัตราส่วนของภาพที่ใช้หา features เทียบกับภาพเต็ม
+            index: matching index ที่สร้างไว้แล้ว (optional, ถ้าไม่ระบุจะสร้างใหม่)
+        """
+        self.image_path = image_path
+        self.keypoints = keypoints
+        self.descriptors = descriptors
+        self.scale = scale
+        self.feature_config = matcher.feature_config()
+        self.index_params = matcher.flann_index_params
+        self.index = index if index is not None else matcher.build_match_index(descriptors)
+        self._image = None
+
+    @classmethod
+    def build(cls, matcher, image_path: str) -> 'ReferenceMap':
+        """
+        หา features และสร้าง index ของภาพ top-down
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้หา features
+            image_path (str): path ของภาพ top-down
+
+        Returns:
+            ReferenceMap: แผนที่อ้างอิง
+        """
+        keypoints, descriptors, scale = matcher.extract_image_features(image_path)
+        return cls(matcher, image_path, keypoints, descriptors, scale)
+
+    def load_image(self, matcher, color: bool = True) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        โหลดภาพสีและภาพ grayscale ของแผนที่ (โหลดครั้งแรกที่ต้องใช้เท่านั้น)
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้ preprocess ภาพ
+            color (bool): ต้องการภาพสีด้วยหรือไม่ (ถ้าไม่ต้องการจะ decode เฉพาะภาพ grayscale)
+
+        Returns:
+            Tuple[Optional[np.ndarray], np.ndarray]: ภาพสี (None ถ้ายังไม่เคยโหลดและ color=False)
+                และภาพ grayscale
+        """
+        if self._image is None:
+            self._image = matcher.load_and_preprocess_image(self.image_path, color)
+        elif color and self._image[0] is None:
+            self._image = (matcher.load_color_image(self.image_path), self._image[1])
+        return self._image
+
+    def save(self, directory: str):
+        """
+        บันทึก features, index และข้อมูลประกอบลงโฟลเดอร์
+
+        Args:
+            directory (str): โฟลเดอร์ปลายทาง
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        descriptors = self.descriptors
+        if descriptors is None:
+            descriptors = np.empty((0, 0), dtype=np.uint8)
+        kp_arrays = {f'kp_{name}': array for name, array in self.keypoints.to_dict().items()}
+        np.savez(os.path.join(directory, self.FEATURES_FILE), descriptors=descriptors, **kp_arrays)
+
+        if self.index is not None:
+            self.index.save(os.path.join(directory, self.INDEX_FILE))
+
+        meta = {
+            'image_path': os.path.abspath(self.image_path),
+            'scale': self.scale,
+            'feature_config': self.feature_config,
+            'has_index': self.index is not None,
+            'index_params': self.index_params,
+        }
+        with open(os.path.join(directory, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, matcher) -> 'ReferenceMap':
+        """
+        โหลดแผนที่อ้างอิงที่บันทึกไว้ด้วย save
+
+        Args:
+            directory (str): โฟลเดอร์ที่บันทึกไว้
+            matcher (HomographyMatcher): matcher ที่จะใช้กับแผนที่นี้
+                (ต้องตั้งค่า detector และ preprocessing เหมือนตอนสร้าง)
+
+        Returns:
+            ReferenceMap: แผนที่อ้างอิง
+
+        Raises:
+            FileNotFoundError: เมื่อไม่พบไฟล์ในโฟลเดอร์
+            ValueError: เมื่อการตั้งค่าของ matcher ไม่ตรงกับตอนสร้าง
+        """
+        meta_path = os.path.join(directory, cls.META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"ไม่พบแผนที่อ้างอิง: {directory}")
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta['feature_config'] != json.loads(json.dumps(matcher.feature_config())):
+            raise ValueError(f"การตั้งค่า matcher ไม่ตรงกับแผนที่อ้างอิง: {directory}")
+
+        with np.load(os.path.join(directory, cls.FEATURES_FILE)) as data:
+            keypoints = KeypointArray.from_dict(
+                {name: data[f'kp_{name}'] for name in KeypointArray.FIELDS})
+            descriptors = data['descriptors'] if data['descriptors'].size else None
+
+        # ใช้ index ที่บันทึกไว้เฉพาะเมื่อสร้างด้วยพารามิเตอร์เดียวกัน (ไม่เช่นนั้นสร้างใหม่)
+        index = None
+        if meta['has_index'] and meta.get('index_params') == json.loads(json.dumps(matcher.flann_index_params)):
+            index = cv2.flann_Index()
+            if not index.load(descriptors, os.path.join(directory, cls.INDEX_FILE)):
+                raise ValueError(f"ไม่สามารถโหลด index ได้: {directory}")
+
+        return cls(matcher, meta['image_path'], keypoints, descriptors, meta['scale'], index)
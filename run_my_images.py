@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import argparse
 import os
 import glob
-from pathlib import Path
-import subprocess
+from homography_matcher import HomographyMatcher
+from parallel_runner import compare_many_parallel
 
 def find_user_images():
     """หาภาพในโฟลเดอร์ของผู้ใช้"""
@@ -23,6 +24,11 @@ def find_user_images():
     return eye_level_images, top_down_images
 
 def main():
+    parser = argparse.ArgumentParser(description='รัน HomographyMatcher กับภาพใน my_images/')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='จำนวน processes ที่ใช้ประมวลผลคู่ภาพพร้อมกัน (default: 1)')
+    args = parser.parse_args()
+
     print("🔍 OpenCV Homography Matcher - รันกับภาพของคุณ")
     print("=" * 60)
 
@@ -42,34 +48,33 @@ def main():
     print(f"📷 พบภาพ Eye-Level: {len(eye_images)} ไฟล์")
     print(f"🗺️ พบภาพ Top-Down: {len(top_images)} ไฟล์")
 
-    # ทดสอบภาพแต่ละคู่
-    for i, eye_img in enumerate(eye_images):
-        for j, top_img in enumerate(top_images):
-            print(f"\n🔍 ทดสอบคู่ที่ {i+1}-{j+1}")
-            print(f"   Eye-Level: {os.path.basename(eye_img)}")
-            print(f"   Top-Down:  {os.path.basename(top_img)}")
-
-            output_dir = f"my_results/pair_{i+1}_{j+1}"
-
-            try:
-                # รัน CLI
-                cmd = [
-                    "C:/Python313/python.exe", "cli.py",
-                    "--eye", eye_img,
-                    "--top", top_img,
-                    "--benchmark",
-                    "--output", output_dir
-                ]
-
-                result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-
-                if result.returncode == 0:
-                    print("   ✅ สำเร็จ")
+    # ทดสอบทุกคู่ภาพในโปรเซสเดียว (features ของแต่ละภาพคำนวณครั้งเดียวต่อ detector)
+    for detector in ['SIFT', 'ORB', 'AKAZE']:
+        print(f"\n🔍 ทดสอบด้วย {detector}")
+
+        output_dir = f"my_results/{detector.lower()}_results"
+        try:
+            if args.workers > 1:
+                results = list(compare_many_parallel({'feature_detector': detector}, eye_images, top_images,
+                                                     output_dir, workers=args.workers))
+                order = {(eye, top): k for k, (eye, top) in
+                         enumerate((eye, top) for eye in eye_images for top in top_images)}
+                results.sort(key=lambda r: order[(r['eye_level_path'], r['top_down_path'])])
+            else:
+                matcher = HomographyMatcher(feature_detector=detector)
+                results = matcher.compare_many(eye_images, top_images, output_dir=output_dir)
+        except Exception as e:
+            print(f"   ❌ ข้อผิดพลาด: {e}")
+            continue
+
+        for i, eye_img in enumerate(eye_images):
+            for j, top_img in enumerate(top_images):
+                result = results[i * len(top_images) + j]
+                print(f"   คู่ที่ {i+1}-{j+1}: {os.path.basename(eye_img)} ↔ {os.path.basename(top_img)}", end="")
+                if result['homography_found']:
+                    print(f" ✅ Score: {result['confidence_score']:.2f}")
                 else:
-                    print("   ❌ ล้มเหลว")
-
-            except Exception as e:
-                print(f"   ❌ ข้อผิดพลาด: {e}")
+                    print(f" ❌ Matches: {result['total_matches']}")
 
     print(f"\n🎉 เสร็จสิ้น! ดูผลลัพธ์ในโฟลเดอร์ my_results/")
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+การแชร์ภาพ grayscale, keypoints และ descriptors ระหว่าง processes ผ่าน shared memory
+process หลักคัดลอก arrays ลง shared memory ครั้งเดียว แล้วส่งเฉพาะ handles ขนาดเล็ก
+(name, shape, dtype) ให้ workers ซึ่งเปิดใช้ arrays เหล่านั้นได้โดยไม่ต้องคัดลอก
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from keypoints import KeypointArray
+
+
+# handle ของ array ใน shared memory: (ชื่อของ block, shape, dtype)
+# ชื่อเป็น None สำหรับ array ที่ว่าง (shared memory ขนาด 0 สร้างไม่ได้)
+ArrayHandle = Tuple[Optional[str], Tuple[int, ...], str]
+
+# blocks ที่ process นี้เปิดใช้อยู่ (ต้องเก็บไว้ไม่ให้ถูกปิดขณะที่ arrays ยังถูกใช้)
+_attached_blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedFeatureStore:
+    """
+    เจ้าของ shared memory blocks ของภาพและ features (สร้างใน process หลัก)
+
+    blocks ทั้งหมดถูกลบเมื่อเรียก close หรือออกจาก with block
+    ต้องไม่ปิด store ก่อนที่ workers จะเลิกใช้ arrays
+    """
+
+    def __init__(self):
+        """Initialize the SharedFeatureStore"""
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+    def __enter__(self) -> 'SharedFeatureStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def nbytes(self) -> int:
+        """ขนาดรวมของ shared memory ที่จองไว้ (bytes)"""
+        return sum(block.size for block in self._blocks)
+
+    def share_array(self, array: np.ndarray) -> ArrayHandle:
+        """
+        คัดลอก array ลง shared memory block ใหม่
+
+        Args:
+            array (np.ndarray): array ที่ต้องการแชร์
+
+        Returns:
+            ArrayHandle: handle สำหรับ attach_array
+        """
+        array = np.ascontiguousarray(array)
+        if array.nbytes == 0:
+            return None, array.shape, array.dtype.str
+
+        block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        self._blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def share_features(self, keypoints: KeypointArray, descriptors: Optional[np.ndarray],
+                       scale: float = 1.0) -> dict:
+        """
+        แชร์ keypoints และ descriptors ของภาพหนึ่งภาพ
+
+        Args:
+            keypoints (KeypointArray): keypoints
+            descriptors (np.ndarray): descriptors (หรือ None ถ้าไม่พบ keypoints)
+            scale (float): อัตราส่วนที่ย่อ (โหมด pyramid)
+
+        Returns:
+            dict: handles สำหรับ attach_features
+        """
+        return {
+            'keypoints': {name: self.share_array(getattr(keypoints, name)) for name in KeypointArray.FIELDS},
+            'descriptors': self.share_array(descriptors) if descriptors is not None else None,
+            'scale': scale,
+        }
+
+    def close(self):
+        """ปิดและลบ shared memory blocks ทั้งหมดของ store นี้"""
+        for block in self._blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+
+def attach_array(handle: ArrayHandle) -> np.ndarray:
+    """
+    เปิดใช้ array จาก shared memory โดยไม่คัดลอก (อ่านได้อย่างเดียว)
+
+    Args:
+        handle (ArrayHandle): handle จาก SharedFeatureStore.share_array
+
+    Returns:
+        np.ndarray: array ที่ใช้หน่วยความจำร่วมกับ process อื่น
+    """
+    name, shape, dtype = handle
+    if name is None:
+        return np.empty(shape, dtype=dtype)
+
+    block = _attached_blocks.get(name)
+    if block is None:
+        block = _attached_blocks[name] = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    # ป้องกันการแก้ไขข้อมูลที่ processes อื่นใช้อยู่
+    array.flags.writeable = False
+    return array
+
+
+def attach_features(handles: dict) -> Tuple[KeypointArray, Optional[np.ndarray], float]:
+    """
+    เปิดใช้ keypoints และ descriptors จาก shared memory โดยไม่คัดลอก
+
+    Args:
+        handles (dict): handles จาก SharedFeatureStore.share_features
+
+    Returns:
+        Tuple[KeypointArray, Optional[np.ndarray], float]: keypoints, descriptors และอัตราส่วนที่ย่อ
+    """
+    keypoints = KeypointArray(*(attach_array(handles['keypoints'][name]) for name in KeypointArray.FIELDS))
+    descriptors = attach_array(handles['descriptors']) if handles['descriptors'] is not None else None
+    return keypoints, descriptors, handles['scale']
+
+
+def detach_all():
+    """
+    ปิด blocks ทั้งหมดที่ process นี้เปิดใช้ (arrays จาก attach_array ต้องไม่ถูกใช้อีก)
+    """
+    for block in _attached_blocks.values():
+        try:
+            block.close()
+        except BufferError:
+            # ยังมี array ที่อ้างถึง block นี้อยู่ ระบบจะปิดให้เมื่อ process จบ
+            pass
+    _attached_blocks.clear()
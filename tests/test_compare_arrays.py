@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบว่า compare_arrays และ compare_buffers ให้ผลลัพธ์เดียวกับ compare_images เมื่อพิกเซลเหมือนกัน
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark_suite import generate_pair
+from homography_matcher import HomographyMatcher
+
+# AKAZE + brute-force matching ให้ผลลัพธ์คงที่ (FLANN ของ SIFT สุ่มต่างกันระหว่าง matchers)
+MATCHER_OPTIONS = {'feature_detector': 'AKAZE', 'min_match_count': 10, 'artifacts': 'none'}
+RESULT_KEYS = ['eye_level_keypoints', 'top_down_keypoints', 'total_matches',
+               'homography_found', 'inlier_matches', 'confidence_score']
+
+
+@pytest.fixture(scope='module')
+def pair():
+    eye_img, top_img, _ = generate_pair(640, 480, 'medium', seed=7)
+    return eye_img, top_img
+
+
+def assert_same_result(expected: dict, actual: dict):
+    for key in RESULT_KEYS:
+        assert actual.get(key) == expected.get(key), key
+    assert expected['homography_found']
+    np.testing.assert_allclose(actual['homography'], expected['homography'], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('decode_mode, grayscale', [('color', False), ('grayscale', True)])
+def test_compare_arrays_matches_compare_images(pair, tmp_path, decode_mode, grayscale):
+    # compare_arrays แปลงภาพสีด้วย cvtColor จึงเทียบกับ decode_mode='color'
+    # ส่วนโหมด grayscale เทียบด้วยภาพ grayscale (PNG ไม่มีการสูญเสียข้อมูล)
+    eye_img, top_img = pair
+    if grayscale:
+        eye_img = cv2.cvtColor(eye_img, cv2.COLOR_BGR2GRAY)
+        top_img = cv2.cvtColor(top_img, cv2.COLOR_BGR2GRAY)
+    eye_path, top_path = str(tmp_path / 'eye.png'), str(tmp_path / 'top.png')
+    cv2.imwrite(eye_path, eye_img)
+    cv2.imwrite(top_path, top_img)
+
+    expected = HomographyMatcher(decode_mode=decode_mode, **MATCHER_OPTIONS).compare_images(
+        eye_path, top_path, None)
+    actual = HomographyMatcher(decode_mode=decode_mode, **MATCHER_OPTIONS).compare_arrays(eye_img, top_img)
+
+    assert_same_result(expected, actual)
+    assert actual['inlier_mask'].sum() == expected['inlier_matches']
+    assert len(actual['eye_level_points']) == len(actual['top_down_points']) == expected['total_matches']
+
+
+@pytest.mark.parametrize('decode_mode', ['color', 'grayscale'])
+def test_compare_buffers_matches_compare_images(pair, tmp_path, decode_mode):
+    eye_img, top_img = pair
+    eye_data = cv2.imencode('.png', eye_img)[1].tobytes()
+    top_data = cv2.imencode('.png', top_img)[1].tobytes()
+    eye_path, top_path = tmp_path / 'eye.png', tmp_path / 'top.png'
+    eye_path.write_bytes(eye_data)
+    top_path.write_bytes(top_data)
+
+    expected = HomographyMatcher(decode_mode=decode_mode, **MATCHER_OPTIONS).compare_images(
+        str(eye_path), str(top_path), None)
+    actual = HomographyMatcher(decode_mode=decode_mode, **MATCHER_OPTIONS).compare_buffers(eye_data, top_data)
+
+    assert_same_result(expected, actual)
+
+
+def test_compare_arrays_does_not_modify_inputs(pair):
+    eye_img, top_img = pair
+    eye_before, top_before = eye_img.copy(), top_img.copy()
+
+    HomographyMatcher(**MATCHER_OPTIONS).compare_arrays(eye_img, top_img)
+
+    np.testing.assert_array_equal(eye_img, eye_before)
+    np.testing.assert_array_equal(top_img, top_before)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ matcher_daemon: ส่งคำสั่งไปกลับ, คำสั่งที่ไม่ถูกต้อง และการหยุดทำงาน
+"""
+
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import matcher_daemon
+from matcher_daemon import MatcherDaemon, connect, forward_command, send_message, shutdown
+
+pytestmark = pytest.mark.skipif(not matcher_daemon.UNIX_SOCKETS_SUPPORTED,
+                                reason="Unix domain sockets are not supported")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """daemon ที่ทำงานใน thread แยก (หยุดด้วย shutdown หลังจบการทดสอบถ้ายังทำงานอยู่)"""
+    server = MatcherDaemon(str(tmp_path / "matcher.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    # รอจน socket พร้อมรับการเชื่อมต่อ
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            connect(server.socket_path).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+    yield server, thread
+
+    if thread.is_alive():
+        shutdown(server.socket_path)
+        thread.join(10)
+
+
+def send_raw(socket_path: str, line: bytes) -> dict:
+    """ส่งข้อความดิบหนึ่งบรรทัดแล้วอ่านคำตอบบรรทัดแรก"""
+    with connect(socket_path) as connection, connection.makefile('rwb') as stream:
+        stream.write(line)
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+def test_round_trip_streams_output_and_exit_code(daemon, tmp_path):
+    server, _ = daemon
+    stdout, stderr = io.StringIO(), io.StringIO()
+    argv = ['--eye', 'sample_images/eye_level_view.jpg', '--top', 'sample_images/top_down_view.jpg',
+            '--detector', 'AKAZE', '--min-matches', '5', '--artifacts', 'none',
+            '--output', str(tmp_path / 'out')]
+
+    exit_code = forward_command(connect(server.socket_path), argv, REPO_DIR, stdout, stderr)
+
+    assert exit_code == 0
+    assert "OpenCV Homography Matcher" in stdout.getvalue()
+    assert server.requests_served == 1
+
+
+def test_relative_paths_resolve_against_client_cwd(daemon, tmp_path):
+    server, _ = daemon
+    stdout = io.StringIO()
+    argv = ['--eye', 'sample_images/eye_level_view.jpg', '--top', 'sample_images/top_down_view.jpg']
+
+    exit_code = forward_command(connect(server.socket_path), argv, str(tmp_path), stdout, io.StringIO())
+
+    assert exit_code == 1
+    assert "sample_images/eye_level_view.jpg" in stdout.getvalue()
+    assert os.getcwd() != str(tmp_path)
+
+
+@pytest.mark.parametrize('line', [
+    b'{"cwd": "/tmp"}\n',
+    b'{"argv": "--help", "cwd": "/tmp"}\n',
+    b'{"argv": [], "cwd": 1}\n',
+    b'[1]\n',
+    b'not json\n',
+])
+def test_malformed_request_is_rejected_and_daemon_keeps_serving(daemon, line):
+    server, thread = daemon
+
+    reply = send_raw(server.socket_path, line)
+
+    assert reply['exit_code'] == 2
+    assert reply['error']
+    assert thread.is_alive()
+    assert forward_command(connect(server.socket_path), ['--help'], REPO_DIR,
+                           io.StringIO(), io.StringIO()) == 0
+
+
+def test_client_disconnect_does_not_stop_daemon(daemon):
+    server, thread = daemon
+
+    with connect(server.socket_path) as connection, connection.makefile('rwb') as stream:
+        send_message(stream, {'argv': ['--help'], 'cwd': REPO_DIR})
+
+    assert forward_command(connect(server.socket_path), ['--help'], REPO_DIR,
+                           io.StringIO(), io.StringIO()) == 0
+    assert thread.is_alive()
+
+
+def test_shutdown_stops_loop_and_removes_socket(daemon):
+    server, thread = daemon
+
+    shutdown(server.socket_path)
+    thread.join(10)
+
+    assert not thread.is_alive()
+    assert not os.path.exists(server.socket_path)
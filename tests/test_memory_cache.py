@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ MemoryCache: การลบ entries ตามขนาดรวม (LRU) และการป้องกันไม่ให้ผู้เรียกแก้ไขค่าใน cache
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark_suite import generate_pair
+from homography_matcher import HomographyMatcher
+from memory_cache import MemoryCache, estimate_nbytes, freeze_arrays
+
+
+def block(nbytes: int) -> np.ndarray:
+    return np.zeros(nbytes, dtype=np.uint8)
+
+
+def test_evicts_least_recently_used_entries_over_budget():
+    cache = MemoryCache(max_bytes=300)
+    cache.put('a', block(100))
+    cache.put('b', block(100))
+    cache.put('c', block(100))
+    assert cache.get('a') is not None  # 'a' กลายเป็นตัวที่ใช้ล่าสุด
+
+    cache.put('d', block(100))
+
+    assert cache.keys() == ['c', 'a', 'd']
+    assert cache.nbytes == 300
+    assert cache.stats()['evictions'] == 1
+
+
+def test_large_entry_evicts_several_and_oversized_entry_is_rejected():
+    cache = MemoryCache(max_bytes=300)
+    for key in 'abc':
+        cache.put(key, block(100))
+
+    assert cache.put('big', block(250))
+    assert cache.keys() == ['big']
+    assert cache.nbytes == 250
+
+    assert not cache.put('huge', block(301))
+    assert 'huge' not in cache
+    assert cache.keys() == ['big']
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = MemoryCache(max_bytes=300)
+    cache.put('a', block(200))
+    cache.put('a', block(50))
+
+    assert len(cache) == 1
+    assert cache.nbytes == 50
+
+
+def test_estimate_nbytes_and_freeze_arrays_cover_nested_values():
+    value = (block(10), [block(20)], {'x': block(30)})
+
+    assert estimate_nbytes(value) >= 60
+    freeze_arrays(value)
+    with pytest.raises(ValueError):
+        value[2]['x'][0] = 1
+
+
+@pytest.fixture(scope='module')
+def image_paths(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('images')
+    eye_img, top_img, _ = generate_pair(640, 480, 'medium', seed=7)
+    eye_path, top_path = str(directory / 'eye.png'), str(directory / 'top.png')
+    cv2.imwrite(eye_path, eye_img)
+    cv2.imwrite(top_path, top_img)
+    return eye_path, top_path
+
+
+@pytest.fixture
+def matcher():
+    return HomographyMatcher(feature_detector='AKAZE', artifacts='none', memory_cache_bytes=64 * 1024 * 1024)
+
+
+def test_cached_results_are_returned_as_copies(matcher, image_paths):
+    first = matcher.compare_images(*image_paths, None)
+    assert first['homography_found']
+    expected_H = first['homography'].copy()
+    expected_matches = first['total_matches']
+
+    # ผู้เรียกแก้ไขผลลัพธ์ของตัวเอง
+    first['homography'][:] = 0
+    first['total_matches'] = -1
+
+    second = matcher.compare_images(*image_paths, None)
+    assert matcher.memory_cache.stats()['hits'] > 0
+    np.testing.assert_array_equal(second['homography'], expected_H)
+    assert second['total_matches'] == expected_matches
+    assert second['homography'] is not first['homography']
+
+
+def test_cached_features_and_images_are_read_only(matcher, image_paths):
+    eye_path, _ = image_paths
+    _, gray = matcher.load_and_preprocess_image(eye_path, color=False)
+    keypoints, descriptors = matcher.get_features(eye_path, gray)
+
+    cached_gray = matcher.load_and_preprocess_image(eye_path, color=False)[1]
+    cached_keypoints, cached_descriptors = matcher.get_features(eye_path, cached_gray)
+
+    assert cached_descriptors is descriptors
+    for array in (cached_gray, cached_descriptors, cached_keypoints.pt):
+        with pytest.raises(ValueError):
+            array[0] = 0
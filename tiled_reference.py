@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+แผนที่อ้างอิงแบบแบ่ง tiles สำหรับภาพ top-down ขนาดใหญ่มาก
+แบ่งแผนที่เป็น tiles ที่ซ้อนทับกัน แต่ละ tile มี features และ index ของตัวเอง (ReferenceMap)
+ตอนค้นหาจะเลือก tiles ที่น่าจะตรงด้วยการนับ votes จาก index หยาบของทั้งแผนที่
+แล้วจับคู่และทำ RANSAC เฉพาะใน tiles เหล่านั้น
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from reference_map import ReferenceMap
+
+
+class TiledReferenceMap:
+    """
+    แผนที่อ้างอิงที่แบ่งเป็น tiles (บันทึกลงโฟลเดอร์ และโหลดเฉพาะ tiles ที่ต้องใช้)
+
+    โครงสร้างโฟลเดอร์:
+        tiled_meta.json          ขนาดแผนที่, ตำแหน่งของแต่ละ tile และการตั้งค่า
+        coarse.npz               descriptors ที่แรงที่สุดของแต่ละ tile พร้อมหมายเลข tile
+        coarse.flann             FLANN index ของ descriptors หยาบ (SIFT หรือ LSH)
+        tiles/<name>/            ReferenceMap ของแต่ละ tile และภาพ tile.png
+                                 (grayscale ถ้าสร้างด้วยโหมด decode 'grayscale')
+    """
+
+    META_FILE = "tiled_meta.json"
+    COARSE_FILE = "coarse.npz"
+    COARSE_INDEX_FILE = "coarse.flann"
+    TILES_DIR = "tiles"
+    TILE_IMAGE = "tile.png"
+
+    def __init__(self, directory: str, matcher, meta: dict,
+                 coarse_descriptors: Optional[np.ndarray], coarse_tiles: np.ndarray, coarse_index=None):
+        """
+        Initialize the TiledReferenceMap (ปกติสร้างผ่าน build หรือ load)
+
+        Args:
+            directory (str): โฟลเดอร์ของแผนที่
+            matcher (HomographyMatcher): matcher ที่ใช้หา features
+            meta (dict): ข้อมูลของแผนที่และ tiles
+            coarse_descriptors (np.ndarray): descriptors หยาบของทั้งแผนที่
+            coarse_tiles (np.ndarray): หมายเลข tile ของ descriptor หยาบแต่ละตัว
+            coarse_index: FLANN index ของ descriptors หยาบ (optional)
+        """
+        self.directory = directory
+        self.meta = meta
+        self.tiles = meta['tiles']
+        self.map_shape = tuple(meta['map_shape'])
+        self.coarse_descriptors = coarse_descriptors
+        self.coarse_tiles = coarse_tiles
+        self.coarse_index_params = matcher.flann_index_params
+        self.coarse_index = (coarse_index if coarse_index is not None
+                             else matcher.build_match_index(coarse_descriptors))
+        # tiles ที่โหลดแล้ว (หมายเลข tile -> ReferenceMap)
+        self._loaded_tiles = {}
+
+    @staticmethod
+    def tile_grid(map_shape: Tuple[int, int], tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+        """
+        คำนวณกรอบ (x0, y0, x1, y1) ของ tiles ที่ซ้อนทับกันครอบคลุมทั้งแผนที่
+
+        Args:
+            map_shape (Tuple[int, int]): ขนาดแผนที่ (height, width)
+            tile_size (int): ขนาดด้านของ tile (pixels)
+            overlap (int): ระยะที่ tiles ติดกันซ้อนทับกัน (pixels)
+
+        Returns:
+            List[Tuple[int, int, int, int]]: กรอบของแต่ละ tile เรียงตามแถว
+        """
+        if overlap >= tile_size:
+            raise ValueError("overlap ต้องน้อยกว่า tile_size")
+
+        def starts(length: int) -> list:
+            if length <= tile_size:
+                return [0]
+            step = tile_size - overlap
+            positions = list(range(0, length - tile_size, step))
+            # tile สุดท้ายชิดขอบแผนที่พอดี
+            positions.append(length - tile_size)
+            return positions
+
+        h, w = map_shape
+        return [(x0, y0, min(x0 + tile_size, w), min(y0 + tile_size, h))
+                for y0 in starts(h) for x0 in starts(w)]
+
+    @classmethod
+    def build(cls, matcher, image_path: str, directory: str, tile_size: int = 2048,
+              overlap: int = 256, coarse_per_tile: int = 500) -> 'TiledReferenceMap':
+        """
+        แบ่งแผนที่เป็น tiles หา features ของแต่ละ tile และบันทึกลงโฟลเดอร์
+
+        ภาพแผนที่ทั้งภาพถูกโหลดเฉพาะตอนสร้างเท่านั้น ตอนค้นหาจะโหลดเฉพาะ tiles ที่เลือก
+        ในโหมด decode 'grayscale' แผนที่ถูก decode เป็นภาพ grayscale (หน่วยความจำ 1/3 ของภาพสี)
+        และภาพ tiles ที่บันทึกไว้ก็เป็นภาพ grayscale ด้วย features ของแต่ละ tile
+        หาจากภาพที่ตัดไว้ในหน่วยความจำโดยตรง (ไม่อ่านไฟล์ tile กลับมา decode ซ้ำ)
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้หา features
+            image_path (str): path ของภาพแผนที่
+            directory (str): โฟลเดอร์ปลายทาง
+            tile_size (int): ขนาดด้านของ tile (pixels)
+            overlap (int): ระยะที่ tiles ติดกันซ้อนทับกัน (pixels)
+            coarse_per_tile (int): จำนวน descriptors ที่แรงที่สุดต่อ tile ที่ใช้ใน index หยาบ
+
+        Returns:
+            TiledReferenceMap: แผนที่อ้างอิงแบบ tiles
+        """
+        flags = cv2.IMREAD_COLOR if matcher.decode_mode == 'color' else cv2.IMREAD_GRAYSCALE
+        img = cv2.imread(image_path, flags)
+        if img is None:
+            raise ValueError(f"ไม่สามารถโหลดภาพได้: {image_path}")
+
+        tiles = []
+        coarse_parts, coarse_labels = [], []
+        for tile_id, (x0, y0, x1, y1) in enumerate(cls.tile_grid(img.shape[:2], tile_size, overlap)):
+            name = f"tile_{tile_id:04d}"
+            tile_dir = os.path.join(directory, cls.TILES_DIR, name)
+            os.makedirs(tile_dir, exist_ok=True)
+
+            tile_img = img[y0:y1, x0:x1]
+            tile_path = os.path.join(tile_dir, cls.TILE_IMAGE)
+            cv2.imwrite(tile_path, tile_img)
+
+            # ปรับแต่งสำเนาของ tile (ภาพแผนที่ที่โหลดไว้ยังเป็นภาพดิบสำหรับ tiles ถัดไป)
+            _, tile_gray = matcher.prepare_array_image(tile_img, color=False)
+            keypoints, descriptors, scale = matcher.get_pyramid_features(None, tile_gray)
+            reference = ReferenceMap(matcher, tile_path, keypoints, descriptors, scale)
+            reference.save(tile_dir)
+            tiles.append({'name': name, 'bbox': [x0, y0, x1, y1], 'keypoints': len(reference.keypoints)})
+
+            if reference.descriptors is not None and len(reference.descriptors):
+                strongest = np.argsort(-reference.keypoints.response, kind='stable')[:coarse_per_tile]
+                coarse_parts.append(reference.descriptors[strongest])
+                coarse_labels.append(np.full(len(strongest), tile_id, dtype=np.int32))
+
+        coarse_descriptors = np.concatenate(coarse_parts) if coarse_parts else None
+        coarse_tiles = (np.concatenate(coarse_labels) if coarse_labels
+                        else np.empty(0, dtype=np.int32))
+
+        meta = {
+            'image_path': os.path.abspath(image_path),
+            'map_shape': list(img.shape[:2]),
+            'tile_size': tile_size,
+            'overlap': overlap,
+            'coarse_per_tile': coarse_per_tile,
+            'feature_config': matcher.feature_config(),
+            'tiles': tiles,
+        }
+        tiled = cls(directory, matcher, meta, coarse_descriptors, coarse_tiles)
+        tiled.save()
+        return tiled
+
+    def save(self):
+        """บันทึกข้อมูลของแผนที่และ index หยาบ (features ของ tiles ถูกบันทึกไว้แล้วตอน build)"""
+        os.makedirs(self.directory, exist_ok=True)
+
+        descriptors = self.coarse_descriptors
+        if descriptors is None:
+            descriptors = np.empty((0, 0), dtype=np.uint8)
+        np.savez(os.path.join(self.directory, self.COARSE_FILE),
+                 descriptors=descriptors, tiles=self.coarse_tiles)
+
+        if self.coarse_index is not None:
+            self.coarse_index.save(os.path.join(self.directory, self.COARSE_INDEX_FILE))
+
+        meta = dict(self.meta, has_coarse_index=self.coarse_index is not None,
+                    coarse_index_params=self.coarse_index_params)
+        with open(os.path.join(self.directory, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, matcher) -> 'TiledReferenceMap':
+        """
+        โหลดแผนที่อ้างอิงแบบ tiles (โหลดเฉพาะ index หยาบ ส่วน tiles โหลดเมื่อถูกเลือก)
+
+        Args:
+            directory (str): โฟลเดอร์ที่บันทึกไว้
+            matcher (HomographyMatcher): matcher ที่จะใช้กับแผนที่นี้
+
+        Returns:
+            TiledReferenceMap: แผนที่อ้างอิงแบบ tiles
+
+        Raises:
+            FileNotFoundError: เมื่อไม่พบไฟล์ในโฟลเดอร์
+            ValueError: เมื่อการตั้งค่าของ matcher ไม่ตรงกับตอนสร้าง
+        """
+        meta_path = os.path.join(directory, cls.META_FILE)
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"ไม่พบแผนที่อ้างอิงแบบ tiles: {directory}")
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta['feature_config'] != json.loads(json.dumps(matcher.feature_config())):
+            raise ValueError(f"การตั้งค่า matcher ไม่ตรงกับแผนที่อ้างอิง: {directory}")
+
+        with np.load(os.path.join(directory, cls.COARSE_FILE)) as data:
+            coarse_descriptors = data['descriptors'] if data['descriptors'].size else None
+            coarse_tiles = data['tiles']
+
+        # ใช้ index ที่บันทึกไว้เฉพาะเมื่อสร้างด้วยพารามิเตอร์เดียวกัน (ไม่เช่นนั้นสร้างใหม่)
+        coarse_index = None
+        if (meta.get('has_coarse_index')
+                and meta.get('coarse_index_params') == json.loads(json.dumps(matcher.flann_index_params))):
+            coarse_index = cv2.flann_Index()
+            if not coarse_index.load(coarse_descriptors, os.path.join(directory, cls.COARSE_INDEX_FILE)):
+                raise ValueError(f"ไม่สามารถโหลด index ได้: {directory}")
+
+        return cls(directory, matcher, meta, coarse_descriptors, coarse_tiles, coarse_index)
+
+    def candidate_tiles(self, matcher, descriptors: Optional[np.ndarray],
+                        max_tiles: int = 3, min_votes: int = 3) -> List[Tuple[int, int]]:
+        """
+        เลือก tiles ที่น่าจะตรงกับภาพ query ด้วยการนับ votes จาก index หยาบ
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้จับคู่
+            descriptors (np.ndarray): descriptors ของภาพ query
+            max_tiles (int): จำนวน tiles สูงสุดที่เลือก
+            min_votes (int): จำนวน votes ขั้นต่ำของ tile ที่ถูกเลือก
+
+        Returns:
+            List[Tuple[int, int]]: (หมายเลข tile, จำนวน votes) เรียงจาก votes มากไปน้อย
+        """
+        if descriptors is None or self.coarse_descriptors is None:
+            return []
+
+        matches = matcher.match_features(descriptors, self.coarse_descriptors, self.coarse_index)
+        if len(matches) == 0:
+            return []
+
+        votes = np.bincount(self.coarse_tiles[matches.train_idx], minlength=len(self.tiles))
+        order = np.argsort(-votes, kind='stable')[:max_tiles]
+        return [(int(t), int(votes[t])) for t in order if votes[t] >= min_votes]
+
+    def tile(self, tile_id: int, matcher) -> ReferenceMap:
+        """
+        โหลด ReferenceMap ของ tile (โหลดจากดิสก์ครั้งแรกที่ต้องใช้)
+
+        Args:
+            tile_id (int): หมายเลข tile
+            matcher (HomographyMatcher): matcher ที่ใช้กับแผนที่นี้
+
+        Returns:
+            ReferenceMap: features และ index ของ tile
+        """
+        if tile_id not in self._loaded_tiles:
+            tile_dir = os.path.join(self.directory, self.TILES_DIR, self.tiles[tile_id]['name'])
+            reference = ReferenceMap.load(tile_dir, matcher)
+            # path ของภาพ tile อิงตามโฟลเดอร์ปัจจุบัน (ย้ายโฟลเดอร์ได้)
+            reference.image_path = os.path.join(tile_dir, self.TILE_IMAGE)
+            self._loaded_tiles[tile_id] = reference
+        return self._loaded_tiles[tile_id]
+
+    def tile_to_map(self, tile_id: int) -> np.ndarray:
+        """
+        Homography ที่แปลงพิกัดใน tile เป็นพิกัดของแผนที่เต็ม (การเลื่อนตำแหน่ง)
+
+        Args:
+            tile_id (int): หมายเลข tile
+
+        Returns:
+            np.ndarray: matrix 3x3
+        """
+        x0, y0 = self.tiles[tile_id]['bbox'][:2]
+        return np.array([[1.0, 0.0, x0], [0.0, 1.0, y0], [0.0, 0.0, 1.0]])
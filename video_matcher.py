@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+โหมดวิดีโอสำหรับ HomographyMatcher
+หา Homography ของทุก frame เทียบกับแผนที่ top-down โดยจับคู่ features เต็มรูปแบบเฉพาะ keyframes
+ระหว่าง keyframes จะติดตามจุดด้วย pyramidal Lucas-Kanade optical flow แล้วต่อ Homography
+H_cur = H_key @ H(cur -> key)
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from homography_matcher import HomographyMatcher
+from reference_map import ReferenceMap
+
+
+class VideoMatcher:
+    """
+    หา Homography ของ frames ในวิดีโอเทียบกับแผนที่อ้างอิง (ReferenceMap)
+    """
+
+    def __init__(self, matcher: HomographyMatcher, reference: ReferenceMap,
+                 max_keyframe_interval: int = 30, min_tracked_fraction: float = 0.5,
+                 min_tracked_points: int = 30, min_inlier_ratio: float = 0.6,
+                 max_corners: int = 400):
+        """
+        Initialize the VideoMatcher
+
+        Args:
+            matcher (HomographyMatcher): matcher ที่ใช้กับ keyframes
+            reference (ReferenceMap): แผนที่ top-down ที่สร้าง index ไว้แล้ว
+            max_keyframe_interval (int): จำนวน frames สูงสุดระหว่าง keyframes
+            min_tracked_fraction (float): สัดส่วนขั้นต่ำของจุดที่ยังติดตามได้เทียบกับตอนเริ่ม keyframe
+            min_tracked_points (int): จำนวนจุดขั้นต่ำที่ยังติดตามได้
+            min_inlier_ratio (float): สัดส่วน inliers ขั้นต่ำของ H(cur -> key)
+            max_corners (int): จำนวนจุดสูงสุดที่ติดตามจาก keyframe
+        """
+        self.matcher = matcher
+        self.reference = reference
+        self.max_keyframe_interval = max_keyframe_interval
+        self.min_tracked_fraction = min_tracked_fraction
+        self.min_tracked_points = min_tracked_points
+        self.min_inlier_ratio = min_inlier_ratio
+
+        # การตั้งค่าของ goodFeaturesToTrack และ calcOpticalFlowPyrLK
+        self.corner_params = dict(maxCorners=max_corners, qualityLevel=0.01, minDistance=10, blockSize=7)
+        self.flow_params = dict(winSize=(21, 21), maxLevel=3,
+                                criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.ransac_threshold = 3.0
+
+        self.reset()
+
+    def reset(self):
+        """ล้างสถานะการติดตาม (frame ถัดไปจะเป็น keyframe)"""
+        self.frame_index = -1
+        self.keyframe_index = None
+        self.H_key = None
+        self.prev_gray = None
+        self.prev_points = None
+        self.key_points = None
+        self.initial_points = 0
+
+    def _process_keyframe(self, gray: np.ndarray) -> dict:
+        """
+        จับคู่ features ของ keyframe กับแผนที่ และเลือกจุดสำหรับติดตาม
+
+        Args:
+            gray (np.ndarray): frame grayscale ที่ preprocess แล้ว
+
+        Returns:
+            dict: ผลลัพธ์ของ frame
+        """
+        kp1, desc1, scale1 = self.matcher.get_pyramid_features(None, gray)
+
+        gray2 = self.reference.load_image(self.matcher, color=False)[1] if self.matcher.pyramid_max_dim else None
+        results, H, *_ = self.matcher.estimate_pair(
+            kp1, desc1, scale1, gray, self.reference.keypoints, self.reference.descriptors,
+            self.reference.scale, gray2, self.reference.index)
+
+        self.keyframe_index = self.frame_index
+        self.H_key = H
+        self.prev_gray = gray
+        self.prev_points = None
+        self.key_points = None
+        self.initial_points = 0
+
+        if H is not None:
+            points = cv2.goodFeaturesToTrack(gray, **self.corner_params)
+            if points is not None:
+                self.prev_points = points
+                self.key_points = points.reshape(-1, 2).copy()
+                self.initial_points = len(points)
+
+        results['keyframe'] = True
+        results['tracked_points'] = self.initial_points
+        return results
+
+    def _track(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """
+        ติดตามจุดจาก frame ก่อนหน้าและหา Homography จาก frame ปัจจุบันไปยัง keyframe
+
+        Args:
+            gray (np.ndarray): frame grayscale ที่ preprocess แล้ว
+
+        Returns:
+            Optional[np.ndarray]: H(cur -> key) หรือ None ถ้าคุณภาพการติดตามต่ำเกินไป
+        """
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.prev_points, None,
+                                                     **self.flow_params)
+        tracked = status.ravel().astype(bool)
+        count = int(tracked.sum())
+        if count < max(self.min_tracked_points, self.min_tracked_fraction * self.initial_points):
+            return None
+
+        cur_points = points[tracked]
+        key_points = self.key_points[tracked]
+        H_cur_key, mask = cv2.findHomography(cur_points, key_points, cv2.RANSAC, self.ransac_threshold)
+        if H_cur_key is None:
+            return None
+
+        inliers = mask.ravel().astype(bool)
+        if inliers.mean() < self.min_inlier_ratio:
+            return None
+
+        # เก็บเฉพาะจุดที่เป็น inliers ไว้ติดตามต่อ (ป้องกัน drift จากจุดที่หลุด)
+        self.prev_gray = gray
+        self.prev_points = cur_points[inliers]
+        self.key_points = key_points[inliers]
+        return H_cur_key
+
+    def process_frame(self, frame: np.ndarray) -> dict:
+        """
+        หา Homography ของ frame ถัดไปเทียบกับแผนที่
+
+        Args:
+            frame (np.ndarray): frame สี BGR
+
+        Returns:
+            dict: 'frame_index', 'keyframe', 'homography' (frame -> แผนที่ หรือ None)
+                และ 'tracked_points'
+        """
+        self.frame_index += 1
+        gray = self.matcher.preprocess_image(frame)
+
+        H_cur_key = None
+        if (self.H_key is not None and self.prev_points is not None
+                and self.frame_index - self.keyframe_index < self.max_keyframe_interval):
+            H_cur_key = self._track(gray)
+
+        if H_cur_key is None:
+            results = self._process_keyframe(gray)
+            H = self.H_key
+        else:
+            results = {'keyframe': False, 'tracked_points': len(self.prev_points)}
+            H = self.H_key @ H_cur_key
+            H /= H[2, 2]
+
+        results['frame_index'] = self.frame_index
+        results['homography'] = H
+        return results
+
+
+def main():
+    """ฟังก์ชันหลักสำหรับโหมดวิดีโอ"""
+    parser = argparse.ArgumentParser(
+        description='🎬 Video Homography Matcher - หา Homography ของทุก frame เทียบกับแผนที่ Top-Down')
+    parser.add_argument('--video', required=True, help='🎬 ไฟล์วิดีโอ')
+    parser.add_argument('--top', '--top-down', dest='top_down', default=None,
+                        help='🗺️  ไฟล์ภาพแผนที่ Top-Down')
+    parser.add_argument('--reference', default=None,
+                        help='🧭 โฟลเดอร์ของแผนที่อ้างอิง (ถ้ายังไม่มีจะสร้างจาก --top และบันทึกไว้)')
+    parser.add_argument('--detector', choices=['SIFT', 'ORB', 'AKAZE'], default='SIFT',
+                        help='🔎 Feature detector ที่ใช้กับ keyframes (default: SIFT)')
+    parser.add_argument('--min-matches', type=int, default=10,
+                        help='🔢 จำนวนการจับคู่ขั้นต่ำ (default: 10)')
+    parser.add_argument('--pyramid-max-dim', type=int, default=None,
+                        help='🔭 หา features ของ keyframes บนภาพย่อ แล้ว refine ที่ความละเอียดเต็ม')
+    parser.add_argument('--max-interval', type=int, default=30,
+                        help='⏱️  จำนวน frames สูงสุดระหว่าง keyframes (default: 30)')
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help='🔢 จำนวน frames สูงสุดที่ประมวลผล')
+    parser.add_argument('--output', '-o', default='video_homographies.jsonl',
+                        help='📁 ไฟล์ผลลัพธ์ (JSON หนึ่งบรรทัดต่อ frame)')
+    args = parser.parse_args()
+
+    if not args.top_down and not args.reference:
+        print("❌ ต้องระบุ --top หรือ --reference")
+        return 1
+
+    matcher = HomographyMatcher(feature_detector=args.detector, min_match_count=args.min_matches,
+                                pyramid_max_dim=args.pyramid_max_dim)
+
+    if args.reference and os.path.exists(os.path.join(args.reference, ReferenceMap.META_FILE)):
+        print(f"🗺️  โหลดแผนที่อ้างอิงจาก: {args.reference}")
+        reference = ReferenceMap.load(args.reference, matcher)
+    else:
+        print(f"🗺️  หา features ของแผนที่: {args.top_down}")
+        reference = ReferenceMap.build(matcher, args.top_down)
+        if args.reference:
+            reference.save(args.reference)
+
+    capture = cv2.VideoCapture(args.video)
+    if not capture.isOpened():
+        print(f"❌ ไม่สามารถเปิดวิดีโอได้: {args.video}")
+        return 1
+
+    video_matcher = VideoMatcher(matcher, reference, max_keyframe_interval=args.max_interval)
+
+    print(f"🎬 กำลังประมวลผล: {args.video}")
+    frame_count = keyframe_count = found_count = 0
+    start_time = time.perf_counter()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        while args.max_frames is None or frame_count < args.max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+
+            result = video_matcher.process_frame(frame)
+            frame_count += 1
+            keyframe_count += result['keyframe']
+            H = result['homography']
+            found_count += H is not None
+
+            f.write(json.dumps({
+                'frame': result['frame_index'],
+                'keyframe': result['keyframe'],
+                'tracked_points': result['tracked_points'],
+                'homography': H.tolist() if H is not None else None,
+            }) + '\n')
+
+    capture.release()
+    elapsed = time.perf_counter() - start_time
+
+    print(f"✅ ประมวลผล {frame_count} frames ใน {elapsed:.2f} วินาที "
+          f"({frame_count / max(elapsed, 1e-9):.1f} fps)")
+    print(f"🔑 Keyframes: {keyframe_count}")
+    print(f"🎯 พบ Homography: {found_count}/{frame_count} frames")
+    print(f"💾 บันทึกผลลัพธ์ใน: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())